@@ -0,0 +1,193 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import numpy as np
+
+# ===============================
+# COHORT ANALYTICS
+# ===============================
+# Loads a cohort's marks in one streamed query into compact NumPy arrays
+# (18 bytes per mark row) and computes credit-weighted GPAs, dense
+# ranks, percentiles, per-subject statistics and grade distributions without
+# per-student Python loops.
+
+CHUNK_ROWS = 100000
+MARK_DTYPE = np.dtype([("student_id", np.int32), ("subject_id", np.int32), ("semester", np.int16),
+                       ("marks", np.int16), ("credits", np.int16), ("grade_point", np.float32)])
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def _filters(batch=None, semester=None, teacher_id=None):
+    """FROM/JOIN and WHERE clauses selecting the cohort's mark rows, with their parameters."""
+    where = []
+    params = []
+    if batch:
+        where.append("st.batch = ?")
+        params.append(batch)
+    if semester is not None:
+        where.append("m.semester = ?")
+        params.append(semester)
+    if teacher_id is not None:
+        where.append("subj.teacher_id = ?")
+        params.append(teacher_id)
+    sql = " FROM marks m JOIN subjects subj ON m.subject_id = subj.id"
+    if batch:
+        sql += " JOIN students st ON m.student_id = st.id"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return sql, params
+
+
+def load_marks(conn, batch=None, semester=None, teacher_id=None):
+    """Streams the matching mark rows into a MARK_DTYPE array, CHUNK_ROWS at a time."""
+    sql, params = _filters(batch, semester, teacher_id)
+    sql = ("SELECT m.student_id, m.subject_id, m.semester, m.marks, subj.credits, COALESCE(m.grade_point, 0)"
+           + sql)
+    c = conn.cursor()
+    c.execute(sql, params)
+    chunks = []
+    while True:
+        rows = c.fetchmany(CHUNK_ROWS)
+        if not rows:
+            break
+        chunks.append(np.array(rows, dtype=MARK_DTYPE))
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=MARK_DTYPE)
+
+
+def grade_distribution(conn, batch=None, semester=None, teacher_id=None):
+    """Counts the stored letter grades, best first.
+
+    Counting m.grade rather than mapping grade points back to letters keeps
+    the labels right under custom grading schemes and curves.
+    """
+    sql, params = _filters(batch, semester, teacher_id)
+    sql = ("SELECT COALESCE(m.grade, '-'), COUNT(*)" + sql
+           + " GROUP BY m.grade ORDER BY MAX(COALESCE(m.grade_point, 0)) DESC, m.grade")
+    return dict(conn.execute(sql, params).fetchall())
+
+
+def _group_stats(keys, values):
+    """Returns (unique keys, count, mean, median, std, min, max) of values grouped by keys."""
+    order = np.lexsort((values, keys))
+    keys = keys[order]
+    values = values[order].astype(np.float64)
+    unique, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    sums = np.add.reduceat(values, starts)
+    means = sums / counts
+    sq = np.add.reduceat(values * values, starts)
+    stds = np.sqrt(np.maximum(sq / counts - means * means, 0))
+    lower = values[starts + (counts - 1) // 2]
+    upper = values[starts + counts // 2]
+    medians = (lower + upper) / 2
+    mins = values[starts]
+    maxs = values[starts + counts - 1]
+    return unique, counts, means, medians, stds, mins, maxs
+
+
+def cohort_report(conn, batch=None, semester=None, teacher_id=None):
+    """Computes the cohort's GPAs, ranks, percentiles and distributions.
+
+    With a semester the GPA is that semester's SGPA, otherwise the CGPA over
+    the selected marks. Per-student results are arrays ordered by rank.
+    """
+    marks = load_marks(conn, batch, semester, teacher_id)
+    report = {"filters": {"batch": batch, "semester": semester, "teacher_id": teacher_id},
+              "mark_rows": int(len(marks)), "students": 0}
+    if not len(marks):
+        return report
+
+    # Credit-weighted GPA per student.
+    student_ids, idx = np.unique(marks["student_id"], return_inverse=True)
+    credits = marks["credits"].astype(np.float64)
+    total_credits = np.bincount(idx, weights=credits)
+    total_points = np.bincount(idx, weights=credits * marks["grade_point"])
+    gpa = np.round(np.divide(total_points, total_credits, out=np.zeros_like(total_points),
+                             where=total_credits > 0), 2)
+
+    # Dense rank (1 = best, ties share a rank) and percentile (share of the
+    # cohort at or below the student's GPA).
+    _, dense = np.unique(-gpa, return_inverse=True)
+    rank = dense + 1
+    percentile = np.searchsorted(np.sort(gpa), gpa, side="right") / len(gpa) * 100
+    order = np.lexsort((student_ids, rank))
+
+    subjects, n, mean, median, std, lo, hi = _group_stats(marks["subject_id"], marks["marks"])
+    codes = dict(conn.execute(f"SELECT id, code FROM subjects WHERE id IN ({','.join('?' * len(subjects))})",
+                              [int(s) for s in subjects]).fetchall())
+
+    gpa_hist, edges = np.histogram(gpa, bins=np.arange(0, 11, 1.0))
+
+    report.update({
+        "students": int(len(student_ids)),
+        "gpa": {"mean": round(float(gpa.mean()), 2), "median": round(float(np.median(gpa)), 2),
+                "std": round(float(gpa.std()), 2), "min": float(gpa.min()), "max": float(gpa.max()),
+                "percentiles": {str(p): round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(gpa, PERCENTILES))}},
+        "gpa_histogram": {f"{int(edges[i])}-{int(edges[i + 1])}": int(count) for i, count in enumerate(gpa_hist)},
+        "grade_distribution": grade_distribution(conn, batch, semester, teacher_id),
+        "subjects": [{"code": codes.get(int(s), str(s)), "n": int(n[i]), "mean": round(float(mean[i]), 2),
+                      "median": float(median[i]), "std": round(float(std[i]), 2),
+                      "min": int(lo[i]), "max": int(hi[i])} for i, s in enumerate(subjects)],
+        "ranking": {"student_id": student_ids[order], "gpa": gpa[order], "credits": total_credits[order],
+                    "rank": rank[order], "percentile": np.round(percentile[order], 1)},
+    })
+    return report
+
+
+def student_details(conn, student_ids, chunk=500):
+    """Yields (id, username, roll_no, name) for student_ids in the given order, querying in chunks."""
+    for start in range(0, len(student_ids), chunk):
+        ids = [int(i) for i in student_ids[start:start + chunk]]
+        rows = conn.execute(f"SELECT id, username, roll_no, name FROM students WHERE id IN ({','.join('?' * len(ids))})",
+                            ids).fetchall()
+        by_id = {row[0]: row for row in rows}
+        for i in ids:
+            yield by_id.get(i, (i, None, None, None))
+
+
+def ranked_rows(conn, report, limit=None):
+    """Yields (rank, percentile, username, roll_no, name, credits, gpa) in rank order."""
+    ranking = report.get("ranking")
+    if not ranking:
+        return
+    count = len(ranking["student_id"]) if limit is None else min(limit, len(ranking["student_id"]))
+    for i, (_, username, roll_no, name) in enumerate(student_details(conn, ranking["student_id"][:count])):
+        yield (int(ranking["rank"][i]), float(ranking["percentile"][i]), username, roll_no, name,
+               int(ranking["credits"][i]), float(ranking["gpa"][i]))
+
+
+def export_report(conn, report, path):
+    """Writes the rank list to path (CSV) and the summary and subject statistics to <path>.summary.json."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["rank", "percentile", "username", "roll_no", "name", "credits", "gpa"])
+        writer.writerows(ranked_rows(conn, report))
+    summary_path = os.path.splitext(path)[0] + ".summary.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in report.items() if k != "ranking"}, f, indent=2)
+    return path, summary_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cohort GPA ranks, percentiles and grade distributions.")
+    parser.add_argument("--batch")
+    parser.add_argument("--semester", type=int)
+    parser.add_argument("--teacher", help="only marks in this teacher's subjects")
+    parser.add_argument("--export", metavar="CSV", help="write the rank list here (summary goes next to it)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect("userdetails.db")
+    teacher_id = None
+    if args.teacher:
+        row = conn.execute("SELECT id FROM teachers WHERE username=?", (args.teacher,)).fetchone()
+        if not row:
+            raise SystemExit("Teacher not found.")
+        teacher_id = row[0]
+    report = cohort_report(conn, args.batch, args.semester, teacher_id)
+    if args.export:
+        print("Exported", *export_report(conn, report, args.export))
+    else:
+        print(json.dumps({k: v for k, v in report.items() if k != "ranking"}, indent=2))
+    conn.close()
@@ -0,0 +1,207 @@
+import atexit
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import tempfile
+from datetime import datetime
+
+# ===============================
+# TIME-PARTITIONED AUDIT STORAGE
+# ===============================
+# Audit events are written to one SQLite segment per month
+# (logs/segments/audit_YYYY_MM.db). Once a month is over its segment is sealed:
+# compressed to a read-only audit_YYYY_MM.db.gz archive and described in
+# index.json (time range, users, row count) so readers can skip it entirely
+# when it cannot match a query. The pre-segmentation audit_logs.db is still
+# read as a legacy segment.
+
+SEGMENT_DIR = os.path.join("logs", "segments")
+INDEX_FILE = "index.json"
+LEGACY_DB = "audit_logs.db"
+
+SEGMENT_VERSION = 1
+SEGMENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    username TEXT,
+    role TEXT,
+    action TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_username ON logs(username);
+"""
+
+
+def segment_name(when=None):
+    return (when or datetime.now()).strftime("audit_%Y_%m")
+
+
+def segment_path(name, segment_dir=SEGMENT_DIR):
+    return os.path.join(segment_dir, name + ".db")
+
+
+def open_segment(name, segment_dir=SEGMENT_DIR):
+    """Opens (creating if needed) the writable segment called name."""
+    os.makedirs(segment_dir, exist_ok=True)
+    conn = sqlite3.connect(segment_path(name, segment_dir), check_same_thread=False)
+    # The schema is applied once per segment file, not on every open.
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SEGMENT_VERSION:
+        conn.executescript(SEGMENT_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SEGMENT_VERSION}")
+    return conn
+
+
+def load_index(segment_dir=SEGMENT_DIR):
+    path = os.path.join(segment_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_index(index, segment_dir):
+    path = os.path.join(segment_dir, INDEX_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def seal_segment(name, segment_dir=SEGMENT_DIR):
+    """Compresses a closed segment into a read-only archive and records it in the index."""
+    db_path = segment_path(name, segment_dir)
+    archive = db_path + ".gz"
+    work_path = db_path + ".sealing"
+    if os.path.exists(archive):
+        # Rows written after an earlier seal are appended to the existing archive.
+        with gzip.open(archive, "rb") as src, open(work_path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        shutil.copyfile(db_path, work_path)
+    try:
+        conn = sqlite3.connect(work_path)
+        try:
+            if os.path.exists(archive):
+                conn.execute("ATTACH DATABASE ? AS late", (db_path,))
+                conn.execute("""INSERT INTO logs (timestamp, username, role, action)
+                                SELECT timestamp, username, role, action FROM late.logs ORDER BY id""")
+                conn.commit()
+                conn.execute("DETACH DATABASE late")
+            rows, first, last = conn.execute("SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM logs").fetchone()
+            users = [u for (u,) in conn.execute("SELECT DISTINCT username FROM logs ORDER BY username")]
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+        with open(work_path, "rb") as src, gzip.open(archive + ".part", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        if os.path.exists(archive):
+            os.chmod(archive, stat.S_IRUSR | stat.S_IWUSR)
+        os.replace(archive + ".part", archive)
+        os.chmod(archive, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    finally:
+        if os.path.exists(work_path):
+            os.remove(work_path)
+
+    index = load_index(segment_dir)
+    index[name] = {"archive": os.path.basename(archive), "rows": rows,
+                   "first": first, "last": last, "users": users}
+    _save_index(index, segment_dir)
+    os.remove(db_path)
+    return index[name]
+
+
+def seal_closed_segments(current=None, segment_dir=SEGMENT_DIR):
+    """Seals every writable segment older than the current month. Returns the sealed names."""
+    if not os.path.isdir(segment_dir):
+        return []
+    current = current or segment_name()
+    sealed = []
+    for f in sorted(os.listdir(segment_dir)):
+        if f.startswith("audit_") and f.endswith(".db") and f[:-3] < current:
+            seal_segment(f[:-3], segment_dir)
+            sealed.append(f[:-3])
+    return sealed
+
+
+def until_bound(until):
+    """The inclusive upper timestamp for an --until filter; a bare date means the whole day."""
+    if until and len(until) <= 10:
+        return until + " 23:59:59"
+    return until
+
+
+def _may_match(entry, username=None, since=None, until=None):
+    if entry["rows"] == 0:
+        return False
+    if since and entry["last"] < since:
+        return False
+    if until and entry["first"] > until_bound(until):
+        return False
+    if username and username not in entry["users"]:
+        return False
+    return True
+
+
+_extracted = {}
+_extract_dir = None
+
+
+def _extract(name, segment_dir):
+    """Decompresses an archive once per process into a temporary read-only file."""
+    global _extract_dir
+    if name not in _extracted:
+        if _extract_dir is None:
+            _extract_dir = tempfile.mkdtemp(prefix="rms_audit_")
+            atexit.register(shutil.rmtree, _extract_dir, True)
+        path = os.path.join(_extract_dir, name + ".db")
+        with gzip.open(os.path.join(segment_dir, name + ".db.gz"), "rb") as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        _extracted[name] = path
+    return _extracted[name]
+
+
+def segments_for_query(username=None, since=None, until=None, segment_dir=SEGMENT_DIR, legacy_db=LEGACY_DB):
+    """Yields (name, db_path) for every segment that can hold matching rows, newest first.
+
+    Sealed archives are pruned using the index and only decompressed when the
+    caller actually reaches them; writable segments and the legacy database
+    are always included.
+    """
+    candidates = []
+    index = load_index(segment_dir)
+    for name, entry in index.items():
+        if _may_match(entry, username, since, until):
+            candidates.append((name, None))
+    if os.path.isdir(segment_dir):
+        for f in os.listdir(segment_dir):
+            if f.startswith("audit_") and f.endswith(".db"):
+                candidates.append((f[:-3], segment_path(f[:-3], segment_dir)))
+    candidates.sort(key=lambda item: item[0], reverse=True)
+
+    for name, path in candidates:
+        yield name, path or _extract(name, segment_dir)
+    if os.path.exists(legacy_db):
+        yield "legacy", legacy_db
+
+
+def connect_readonly(db_path):
+    return sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["seal"]:
+        sealed = seal_closed_segments()
+        print(f"Sealed segments: {', '.join(sealed)}" if sealed else "No closed segments to seal.")
+    elif sys.argv[1:] == ["status"]:
+        for name, entry in sorted(load_index().items()):
+            print(f"{name}: {entry['rows']} rows, {entry['first']} .. {entry['last']}, {len(entry['users'])} users")
+        current = segment_path(segment_name())
+        print(f"Current segment: {current}" + ("" if os.path.exists(current) else " (not created yet)"))
+    else:
+        print("Usage: python audit_store.py [seal|status]")
+        sys.exit(1)
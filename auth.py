@@ -0,0 +1,88 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+# bcrypt cost factor for new hashes. Stored hashes with a different cost are
+# rehashed on the next successful login.
+BCRYPT_ROUNDS = int(os.environ.get("RMS_BCRYPT_ROUNDS", "12"))
+# Maximum number of hashes computed at once.
+AUTH_WORKERS = int(os.environ.get("RMS_AUTH_WORKERS", str(os.cpu_count() or 2)))
+
+
+def hash_rounds(hashed):
+    """Returns the cost factor encoded in a bcrypt hash ($2b$<rounds>$...)."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode()
+    try:
+        return int(hashed.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class AuthService:
+    """Runs bcrypt hashing and verification on a bounded worker pool.
+
+    bcrypt releases the GIL while hashing, so a thread pool lets several
+    sessions authenticate in parallel while max_workers caps CPU use.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=AUTH_WORKERS):
+        self.rounds = rounds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        # Verifying against a dummy hash keeps unknown usernames as slow as wrong passwords.
+        self._dummy_hash = self._pool.submit(bcrypt.hashpw, b"dummy-password", bcrypt.gensalt(rounds))
+
+    def hash_password_async(self, password):
+        return self._pool.submit(lambda: bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)))
+
+    def hash_password(self, password):
+        return self.hash_password_async(password).result()
+
+    def verify_async(self, password, hashed):
+        if isinstance(hashed, str):
+            hashed = hashed.encode()
+        return self._pool.submit(bcrypt.checkpw, password.encode(), hashed)
+
+    def verify(self, password, hashed):
+        return self.verify_async(password, hashed).result()
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def authenticate(self, conn, table, username, password):
+        """Checks a login against students/teachers and returns the user id, or None.
+
+        A successful login with a hash made at a different cost is rehashed
+        at the current cost.
+        """
+        c = conn.cursor()
+        c.execute(f"SELECT id, password FROM {table} WHERE username = ?", (username,))
+        result = c.fetchone()
+        if not result:
+            self.verify(password, self._dummy_hash.result())
+            return None
+        user_id, hashed = result
+        if not self.verify(password, hashed):
+            return None
+        if self.needs_rehash(hashed):
+            c.execute(f"UPDATE {table} SET password=? WHERE id=?", (self.hash_password(password), user_id))
+            conn.commit()
+        return user_id
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_auth_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AuthService()
+            atexit.register(_service.shutdown)
+        return _service
@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from marksheet_cache import get_marksheet_cache
+from result_cache import get_result_cache
+
+BACKUP_DIR = "backups"
+MANIFEST = "manifest.json"
+# Number of compressed backups kept by the retention policy.
+KEEP_BACKUPS = int(os.environ.get("RMS_BACKUP_KEEP", "10"))
+# Pages copied per backup step; writers on other connections can proceed in between.
+PAGES_PER_STEP = 256
+CHUNK = 1024 * 1024
+
+
+def _load_manifest(backup_dir):
+    path = os.path.join(backup_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(backup_dir, manifest):
+    path = os.path.join(backup_dir, MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _sha256_file(path, opener=open):
+    digest = hashlib.sha256()
+    with opener(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def integrity_ok(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    finally:
+        conn.close()
+
+
+def _journal_seq(db_path):
+    """Last change_journal sequence number contained in a database file, or None."""
+    conn = sqlite3.connect(db_path)
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name='change_journal'").fetchone()
+        has_journal = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='change_journal'").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    if not has_journal:
+        return None
+    return row[0] if row else 0
+
+
+def create_backup(conn, backup_dir=BACKUP_DIR, keep=KEEP_BACKUPS, progress=None):
+    """Takes an online backup of conn into a verified, gzip-compressed file.
+
+    Pages are copied in steps through the SQLite backup API, the copy is
+    integrity-checked, compressed, re-read to confirm its checksum and only
+    then renamed into place and recorded in the manifest.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    name = f"userdetails_backup_{timestamp}.db.gz"
+    final_path = os.path.join(backup_dir, name)
+    raw_path = os.path.join(backup_dir, f".{name}.raw")
+    part_path = final_path + ".part"
+
+    try:
+        target = sqlite3.connect(raw_path)
+        try:
+            conn.backup(target, pages=PAGES_PER_STEP, progress=progress, sleep=0.001)
+        finally:
+            target.close()
+        if not integrity_ok(raw_path):
+            raise RuntimeError("integrity check failed on the backup copy")
+
+        raw_sha = hashlib.sha256()
+        with open(raw_path, "rb") as src, gzip.open(part_path, "wb") as dst:
+            for block in iter(lambda: src.read(CHUNK), b""):
+                raw_sha.update(block)
+                dst.write(block)
+        raw_sha = raw_sha.hexdigest()
+        if _sha256_file(part_path, gzip.open) != raw_sha:
+            raise RuntimeError("compressed backup does not match the source copy")
+
+        entry = {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "sha256": _sha256_file(part_path),
+            "raw_sha256": raw_sha,
+            "raw_size": os.path.getsize(raw_path),
+            "size": os.path.getsize(part_path),
+            # Point-in-time restores replay the change journal from here (see journal.py).
+            "journal_seq": _journal_seq(raw_path),
+        }
+        os.replace(part_path, final_path)
+    finally:
+        for path in (raw_path, part_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    manifest = _load_manifest(backup_dir)
+    manifest[name] = entry
+    _save_manifest(backup_dir, manifest)
+    apply_retention(backup_dir, keep)
+    return final_path
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Returns (name, manifest entry or None) pairs, oldest first.
+
+    Plain .db copies made by older versions have no manifest entry.
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    manifest = _load_manifest(backup_dir)
+    names = [f for f in os.listdir(backup_dir)
+             if f.startswith("userdetails_backup_") and f.endswith((".db.gz", ".db"))]
+    return [(n, manifest.get(n)) for n in sorted(names)]
+
+
+def verify_backup(name, backup_dir=BACKUP_DIR):
+    """Checks a backup file against the checksum recorded in the manifest."""
+    entry = _load_manifest(backup_dir).get(name)
+    if entry is None:
+        return False
+    return _sha256_file(os.path.join(backup_dir, name)) == entry["sha256"]
+
+
+def extract_backup(name, backup_dir=BACKUP_DIR):
+    """Verifies a backup and returns the path of a plain database copy of it.
+
+    Compressed backups are decompressed next to the original; the caller
+    removes the returned file unless it is the backup itself (legacy .db).
+    """
+    path = os.path.join(backup_dir, name)
+    if not name.endswith(".gz"):
+        return path
+    if not verify_backup(name, backup_dir):
+        raise RuntimeError(f"checksum mismatch for {name}")
+    raw_path = os.path.join(backup_dir, f".{name}.restore")
+    with gzip.open(path, "rb") as src, open(raw_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK)
+    return raw_path
+
+
+def copy_into(conn, db_path):
+    """Overwrites the database behind conn with the database file at db_path."""
+    conn.commit()
+    source = sqlite3.connect(db_path)
+    try:
+        source.backup(conn, pages=PAGES_PER_STEP, sleep=0.001)
+    finally:
+        source.close()
+
+
+def restore_backup(conn, name, backup_dir=BACKUP_DIR):
+    """Verifies a backup and copies it into the live database through conn.
+
+    Pending journal entries are exported to a delta first, and the restore is
+    recorded in the journal (journal.mark_restore), so changes made afterwards
+    are numbered after everything already exported. A fresh full backup is
+    taken afterwards so point-in-time restores start from the restored state.
+    """
+    from journal import mark_restore, save_pending
+    path = os.path.join(backup_dir, name)
+    raw_path = extract_backup(name, backup_dir)
+    try:
+        if not integrity_ok(raw_path):
+            raise RuntimeError(f"integrity check failed for {name}")
+        position = save_pending(conn, backup_dir)
+        copy_into(conn, raw_path)
+    finally:
+        if raw_path != path and os.path.exists(raw_path):
+            os.remove(raw_path)
+    if mark_restore(conn, position, backup_dir) is not None:
+        create_backup(conn, backup_dir)
+    # Every cached result and marksheet may describe data the restore replaced.
+    get_result_cache().invalidate()
+    get_marksheet_cache().invalidate()
+
+
+def apply_retention(backup_dir=BACKUP_DIR, keep=KEEP_BACKUPS):
+    """Deletes the oldest compressed backups beyond the newest `keep`."""
+    manifest = _load_manifest(backup_dir)
+    compressed = [n for n, _ in list_backups(backup_dir) if n.endswith(".gz")]
+    removed = compressed[:-keep] if keep > 0 else []
+    for name in removed:
+        os.remove(os.path.join(backup_dir, name))
+        manifest.pop(name, None)
+    if removed:
+        _save_manifest(backup_dir, manifest)
+    return removed
@@ -0,0 +1,119 @@
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from gpa_aggregates import gpa_from_totals
+from utils import log_event
+
+OUTPUT_DIR = "marksheets"
+
+
+def _render_partition(jobs):
+    """Worker: renders a list of marksheet jobs, returning (rendered, failures)."""
+    from service import render_marksheet
+    rendered = 0
+    failures = []
+    for username, filename, info, semester, rows, sgpa, cgpa in jobs:
+        try:
+            render_marksheet(filename, info, semester, rows, sgpa, cgpa)
+            rendered += 1
+        except Exception as e:
+            failures.append((username, str(e)))
+    return rendered, failures
+
+
+def collect_jobs(conn, semester, batch=None, output_dir=OUTPUT_DIR):
+    """Loads everything needed for a semester's marksheets in bulk queries."""
+    c = conn.cursor()
+    params = [semester]
+    batch_filter = ""
+    if batch:
+        batch_filter = " AND st.batch = ?"
+        params.append(batch)
+
+    c.execute(f"""
+        SELECT st.id, st.username, st.roll_no, st.name, st.batch,
+               sg.total_credits, sg.total_points, g.total_credits, g.total_points
+        FROM student_semester_gpa sg
+        JOIN students st ON st.id = sg.student_id
+        LEFT JOIN student_gpa g ON g.student_id = st.id
+        WHERE sg.semester = ?{batch_filter}
+        ORDER BY st.id
+    """, params)
+    students = c.fetchall()
+
+    c.execute(f"""
+        SELECT m.student_id, subj.code, subj.name, subj.credits, m.marks, m.grade
+        FROM marks m
+        JOIN subjects subj ON m.subject_id = subj.id
+        JOIN students st ON st.id = m.student_id
+        WHERE m.semester = ?{batch_filter}
+        ORDER BY m.student_id, m.subject_id
+    """, params)
+    rows_by_student = {}
+    for student_id, *row in c:
+        rows_by_student.setdefault(student_id, []).append(tuple(row))
+
+    jobs = []
+    for sid, username, roll_no, name, student_batch, sem_cr, sem_pts, cr, pts in students:
+        rows = rows_by_student.get(sid)
+        if not rows:
+            continue
+        folder = os.path.join(output_dir, str(student_batch or "unassigned"), f"sem{semester}")
+        os.makedirs(folder, exist_ok=True)
+        filename = os.path.join(folder, f"{username}_sem{semester}_marksheet.pdf")
+        jobs.append((username, filename, (roll_no, name, student_batch), semester, rows,
+                     gpa_from_totals(sem_cr, sem_pts), gpa_from_totals(cr or 0, pts or 0)))
+    return jobs
+
+
+def generate_batch_marksheets(conn, semester, batch=None, output_dir=OUTPUT_DIR, workers=None, partition_size=200):
+    """Renders every marksheet for a semester across a process pool and reports throughput."""
+    start = time.perf_counter()
+    jobs = collect_jobs(conn, semester, batch=batch, output_dir=output_dir)
+    partitions = [jobs[i:i + partition_size] for i in range(0, len(jobs), partition_size)]
+
+    rendered = 0
+    failures = []
+    if partitions:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render_partition, p) for p in partitions]
+            for future in as_completed(futures):
+                ok, failed = future.result()
+                rendered += ok
+                failures.extend(failed)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "semester": semester,
+        "batch": batch,
+        "rendered": rendered,
+        "failed": len(failures),
+        "failures": failures,
+        "seconds": elapsed,
+        "pdfs_per_sec": rendered / elapsed if elapsed else 0.0,
+        "output_dir": output_dir,
+    }
+    log_event("SYSTEM", "admin", f"Batch marksheets for semester {semester}"
+                                 f"{f' batch {batch}' if batch else ''}: {rendered} rendered, "
+                                 f"{len(failures)} failed in {elapsed:.2f}s.")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate marksheet PDFs for a whole semester.")
+    parser.add_argument("semester", type=int)
+    parser.add_argument("--batch", help="only students of this batch")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, help="process pool size (default: CPU count)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect("userdetails.db")
+    summary = generate_batch_marksheets(conn, args.semester, batch=args.batch,
+                                        output_dir=args.output_dir, workers=args.workers)
+    conn.close()
+    print(f"📄 {summary['rendered']} marksheets written to {summary['output_dir']} "
+          f"in {summary['seconds']:.2f}s ({summary['pdfs_per_sec']:.1f} PDFs/sec).")
+    for username, error in summary["failures"]:
+        print(f"❌ {username}: {error}")
@@ -0,0 +1 @@
+"""Benchmarks for the Result Management System. Run each module with python -m from the project root."""
@@ -0,0 +1,62 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from auth import AuthService
+
+# ===============================
+# LOGIN THROUGHPUT BENCHMARK
+# ===============================
+# Simulates many sessions logging in at once against AuthService and reports
+# logins/sec for each pool size:
+#     python -m benchmarks.auth_bench --rounds 10 --logins 64 --pool-sizes 1 2 4 8
+
+
+def _make_db(path, users, rounds):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("CREATE TABLE students(id INTEGER PRIMARY KEY, username TEXT UNIQUE, password TEXT)")
+    hashed = bcrypt.hashpw(b"Passw0rd@", bcrypt.gensalt(rounds))
+    conn.executemany("INSERT INTO students (username, password) VALUES (?, ?)",
+                     [(f"user{i}", hashed) for i in range(users)])
+    conn.commit()
+    return conn
+
+
+def run(rounds=10, logins=64, pool_sizes=(1, 2, 4, 8), sessions=16):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "auth_bench.db")
+        _make_db(db_path, sessions, rounds).close()
+        for size in pool_sizes:
+            service = AuthService(rounds=rounds, workers=size)
+            local = threading.local()
+
+            def login(i):
+                if not hasattr(local, "conn"):
+                    local.conn = sqlite3.connect(db_path)
+                return service.authenticate(local.conn, "students", f"user{i % sessions}", "Passw0rd@")
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as clients:
+                ok = sum(1 for user_id in clients.map(login, range(logins)) if user_id is not None)
+            elapsed = time.perf_counter() - start
+            service.shutdown()
+            results.append({"pool_size": size, "logins": ok, "seconds": round(elapsed, 3),
+                            "logins_per_sec": round(ok / elapsed, 2)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure logins/sec at different bcrypt pool sizes.")
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--sessions", type=int, default=16, help="concurrent client sessions")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    print(f"bcrypt cost {args.rounds}, {args.logins} logins from {args.sessions} sessions")
+    for r in run(args.rounds, args.logins, args.pool_sizes, args.sessions):
+        print(f"pool={r['pool_size']:>3}  {r['logins_per_sec']:>8.2f} logins/sec  ({r['seconds']}s)")
@@ -0,0 +1,78 @@
+import argparse
+import json
+import random
+import sqlite3
+import time
+import bcrypt
+from migrations import migrate
+from service import calculate_grade
+
+# ===============================
+# SYNTHETIC DATA GENERATOR
+# ===============================
+# Builds a database with the real schema (migrations, aggregate triggers and
+# search index included) and fills it with a realistic spread of marks:
+#     python -m benchmarks.datagen bench.db --students 5000 --teachers 40 --semesters 8
+#
+# Every account's password is PASSWORD. Usernames are teacher<N> and
+# student<N>; subject codes are SUB<NNN>.
+
+PASSWORD = "Passw0rd@"
+FIRST = ["Aarav", "Vivaan", "Aditya", "Diya", "Ananya", "Ishaan", "Kavya", "Rohan", "Meera", "Arjun",
+         "Saanvi", "Kabir", "Nisha", "Dev", "Priya", "Rahul", "Sneha", "Vikram", "Pooja", "Karan"]
+LAST = ["Sharma", "Patel", "Shah", "Mehta", "Iyer", "Reddy", "Nair", "Gupta", "Desai", "Joshi",
+        "Kulkarni", "Chopra", "Bose", "Menon", "Trivedi", "Pandya", "Rao", "Verma", "Kapoor", "Das"]
+DEPARTMENTS = ["CSE", "ECE", "MECH", "CIVIL"]
+BATCHES = ["2022", "2023", "2024", "2025"]
+
+
+def _marks(rng):
+    # Roughly bell-shaped around 68 with a tail of failures.
+    return max(0, min(100, int(rng.gauss(68, 15))))
+
+
+def generate(conn, students=1000, teachers=20, subjects=60, semesters=4, per_semester=5, seed=1):
+    """Fills conn (migrated first) with synthetic data and returns a summary dict."""
+    rng = random.Random(seed)
+    migrate(conn)
+    start = time.perf_counter()
+    # One cheap hash shared by every account keeps generation fast.
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(4))
+    with conn:
+        conn.executemany("INSERT INTO teachers (username, password, name, department) VALUES (?, ?, ?, ?)",
+                         [(f"teacher{i}", hashed, f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+                           DEPARTMENTS[i % len(DEPARTMENTS)]) for i in range(teachers)])
+        conn.executemany("INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, ?, ?)",
+                         [(f"SUB{i:03d}", f"Subject {i}", rng.choice([2, 3, 3, 4]), 1 + i % teachers)
+                          for i in range(subjects)])
+        conn.executemany("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, ?, ?, ?, ?)",
+                         [(f"student{i}", hashed, f"R{i:06d}", f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+                           BATCHES[i % len(BATCHES)]) for i in range(students)])
+        rows = []
+        per_semester = min(per_semester, subjects)
+        for student_id in range(1, students + 1):
+            for semester in range(1, semesters + 1):
+                for subject_id in rng.sample(range(1, subjects + 1), per_semester):
+                    marks = _marks(rng)
+                    rows.append((student_id, subject_id, semester, marks) + calculate_grade(marks))
+        conn.executemany("INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.execute("ANALYZE")
+    return {"students": students, "teachers": teachers, "subjects": subjects, "semesters": semesters,
+            "marks": len(rows), "seconds": round(time.perf_counter() - start, 3)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic result database.")
+    parser.add_argument("path", help="new database file to create")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--subjects", type=int, default=60)
+    parser.add_argument("--semesters", type=int, default=4)
+    parser.add_argument("--per-semester", type=int, default=5, help="subjects each student takes per semester")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    conn = sqlite3.connect(args.path)
+    print(json.dumps(generate(conn, args.students, args.teachers, args.subjects, args.semesters,
+                              args.per_semester, args.seed), indent=2))
+    conn.close()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import service
+import utils
+import view_audit_logs
+from benchmarks.datagen import generate
+from service import Session
+from utils import KEY_FILE, log_event
+
+# ===============================
+# HOT PATH BENCHMARKS
+# ===============================
+# Generates a synthetic database in a temporary directory and times the
+# operations users wait on. Prints (or writes) one JSON report; pass an older
+# report with --compare to see the change per operation:
+#     python -m benchmarks.hot_paths --students 2000 --output bench.json
+#     python -m benchmarks.hot_paths --students 2000 --compare bench.json
+
+
+def _timed(fn, items):
+    """Calls fn(item) for every item and returns count, total seconds, ops/sec and latency percentiles."""
+    timings = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    total = sum(timings)
+    pct = lambda p: round(timings[min(len(timings) - 1, int(p * len(timings)))] * 1000, 3)
+    return {"count": len(timings), "seconds": round(total, 4),
+            "per_sec": round(len(timings) / total, 1) if total else None,
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95)}
+
+
+def _bulk(fn):
+    """Times one call of fn(), which returns the number of items it processed."""
+    start = time.perf_counter()
+    count = fn()
+    total = time.perf_counter() - start
+    return {"count": count, "seconds": round(total, 4), "per_sec": round(count / total, 1) if total else None}
+
+
+def run(students=1000, teachers=20, subjects=60, semesters=4, pdfs=50, events=20000, workers=None):
+    workers = workers or os.cpu_count() or 1
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # Audit segments, keys and marksheets are written relative to cwd.
+        os.chdir(tmp)
+        try:
+            conn = sqlite3.connect("bench.db")
+            scale = generate(conn, students, teachers, subjects, semesters)
+            student_ids = [row[0] for row in conn.execute("SELECT id FROM students ORDER BY id")]
+            batch = conn.execute("SELECT batch FROM students WHERE id = 1").fetchone()[0]
+            class_ids = [row[0] for row in conn.execute("SELECT id FROM students WHERE batch = ?", (batch,))]
+            teacher_ids = [row[0] for row in conn.execute("SELECT id FROM teachers ORDER BY id")]
+            results = {}
+
+            results["compute_cgpa_for_student (one class)"] = _timed(
+                lambda sid: service.compute_cgpa_for_student(conn, sid), class_ids)
+            results["class_list (one batch, sorted)"] = _timed(
+                lambda _: service.fetch_class_list(conn, batch=batch, order="desc"), range(20))
+            results["calculate_sgpa"] = _timed(
+                lambda sid: service.calculate_sgpa(conn, sid, 1 + sid % semesters), student_ids)
+            results["calculate_cgpa"] = _timed(lambda sid: service.calculate_cgpa(conn, sid), student_ids)
+            results["teacher_results (full listing)"] = _timed(
+                lambda tid: service.teacher_results(conn, Session(tid, f"teacher{tid - 1}", "teacher")), teacher_ids)
+            results["teacher_results_page (first page)"] = _timed(
+                lambda tid: service.teacher_results_page(conn, Session(tid, f"teacher{tid - 1}", "teacher")), teacher_ids)
+
+            os.makedirs("marksheets", exist_ok=True)
+            results["generate_marksheet_pdf"] = _timed(
+                lambda sid: service.marksheet(conn, Session(sid, f"student{sid - 1}", "student"), 1,
+                                              output_dir="marksheets"),
+                student_ids[:pdfs])
+            # The same marksheets again: nothing changed, so they come from the marksheet cache.
+            results["generate_marksheet_pdf (cached)"] = _timed(
+                lambda sid: service.marksheet(conn, Session(sid, f"student{sid - 1}", "student"), 1,
+                                              output_dir="marksheets"),
+                student_ids[:pdfs])
+
+            writer = utils.get_audit_writer()
+            writer.flush()
+
+            def log_many():
+                for i in range(events):
+                    log_event(f"student{i % students}", "student", f"Viewed results for semester {1 + i % semesters}.")
+                writer.flush()
+                return events
+            results["log_event (buffered, incl. flush)"] = _bulk(log_many)
+
+            with open(KEY_FILE, "rb") as f:
+                key = f.read()
+
+            def decrypt_all():
+                decrypted = 0
+                with ProcessPoolExecutor(max_workers=workers, initializer=view_audit_logs._init_worker,
+                                         initargs=(key,)) as pool:
+                    for _, page in view_audit_logs.iter_pages(page_size=500):
+                        decrypted += len(view_audit_logs.decrypt_page(pool, page, workers))
+                return decrypted
+            results["audit log decryption"] = _bulk(decrypt_all)
+            conn.close()
+        finally:
+            os.chdir(cwd)
+
+    return {"created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+            "cpus": os.cpu_count(), "scale": scale, "results": results}
+
+
+def compare(current, previous):
+    """Returns {operation: per_sec change in percent} for operations present in both reports."""
+    changes = {}
+    for name, stats in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if old and old.get("per_sec") and stats.get("per_sec"):
+            changes[name] = round((stats["per_sec"] - old["per_sec"]) / old["per_sec"] * 100, 1)
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the hot paths on a synthetic database.")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--teachers", type=int, default=20)
+    parser.add_argument("--subjects", type=int, default=60)
+    parser.add_argument("--semesters", type=int, default=4)
+    parser.add_argument("--pdfs", type=int, default=50, help="marksheets to render")
+    parser.add_argument("--events", type=int, default=20000, help="audit events to log and decrypt")
+    parser.add_argument("--workers", type=int, default=None, help="decryption processes")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", metavar="REPORT", help="earlier JSON report to compare throughput against")
+    args = parser.parse_args()
+
+    report = run(args.students, args.teachers, args.subjects, args.semesters, args.pdfs, args.events, args.workers)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["change_per_sec_pct"] = compare(report, json.load(f))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import publish
+import service
+from benchmarks.datagen import generate
+from result_cache import get_result_cache
+from service import Session
+from storage import ThreadLocalPool
+from utils import get_audit_writer
+
+# ===============================
+# RESULTS-DAY READ BENCHMARK
+# ===============================
+# Many students reading their semester results at once while one teacher
+# keeps correcting marks, served from the live database and then from the
+# published snapshot. Every student reads once, so the result cache does not
+# hide the cost of the live queries.
+#     python -m benchmarks.results_day --students 20000 --readers 8
+
+
+def _read_all(pool, student_ids, semester, latencies):
+    conn = pool.connection()
+    for sid in student_ids:
+        start = time.perf_counter()
+        service.student_results(conn, Session(sid, f"student{sid - 1}", "student"), semester)
+        latencies.append(time.perf_counter() - start)
+    pool.close()
+
+
+def _corrections(db_path, semester, stop, counter):
+    """Keeps updating marks of the semester until stop is set, like a teacher fixing entries."""
+    conn = sqlite3.connect(db_path, timeout=10)
+    rows = conn.execute("SELECT m.student_id, m.subject_id, s.teacher_id, t.username FROM marks m "
+                        "JOIN subjects s ON s.id = m.subject_id JOIN teachers t ON t.id = s.teacher_id "
+                        "WHERE m.semester = ? LIMIT 5000", (semester,)).fetchall()
+    rng = random.Random(3)
+    while not stop.is_set():
+        student_id, subject_id, teacher_id, teacher = rng.choice(rows)
+        service.update_result(conn, Session(teacher_id, teacher, "teacher"), student_id, subject_id, semester,
+                              rng.randint(35, 100))
+        counter[0] += 1
+    conn.close()
+
+
+def run_mode(db_path, mode, student_ids, semester, readers):
+    if mode == "published":
+        conn = sqlite3.connect(db_path)
+        publish.publish_semester(conn, semester)
+        conn.close()
+    else:
+        publish.withdraw()
+    get_result_cache().invalidate()
+    pool = ThreadLocalPool(db_path)
+    parts = [student_ids[i::readers] for i in range(readers)]
+    latencies = [[] for _ in range(readers)]
+    stop = threading.Event()
+    writes = [0]
+    writer = threading.Thread(target=_corrections, args=(db_path, semester, stop, writes))
+    threads = [threading.Thread(target=_read_all, args=(pool, parts[i], semester, latencies[i]))
+               for i in range(readers)]
+    writer.start()
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    writer.join()
+    timings = sorted(lat for part in latencies for lat in part)
+    pct = lambda p: round(timings[min(len(timings) - 1, int(p * len(timings)))] * 1000, 3)
+    return {"mode": mode, "reads": len(timings), "seconds": round(elapsed, 3),
+            "reads_per_sec": round(len(timings) / elapsed, 1), "p50_ms": pct(0.50), "p95_ms": pct(0.95),
+            "p99_ms": pct(0.99), "teacher_updates": writes[0]}
+
+
+def run(students=20000, readers=8, semester=1):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # The audit log and published/ are written relative to the working directory.
+        os.chdir(tmp)
+        try:
+            db_path = os.path.join(tmp, "bench.db")
+            conn = sqlite3.connect(db_path)
+            generate(conn, students=students, teachers=20, subjects=60, semesters=2, per_semester=6)
+            conn.close()
+            # Switch to WAL once, as the application does.
+            ThreadLocalPool(db_path).connection().close()
+            student_ids = list(range(1, students + 1))
+            random.Random(5).shuffle(student_ids)
+            results = [run_mode(db_path, mode, student_ids, semester, readers) for mode in ("live", "published")]
+            publish.get_published_results().close()
+            get_audit_writer().close()
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student result reads: live database vs published snapshot.")
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    args = parser.parse_args()
+    print(json.dumps(run(args.students, args.readers), indent=2))
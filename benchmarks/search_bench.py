@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from migrations import migrate
+from student_search import search_students
+
+# ===============================
+# STUDENT SEARCH BENCHMARK
+# ===============================
+# Registers synthetic students through the real schema (so the search index is
+# filled by its triggers) and times prefix, substring and misspelt lookups:
+#     python -m benchmarks.search_bench --students 100000
+
+FIRST = ["Aarav", "Vivaan", "Aditya", "Diya", "Ananya", "Ishaan", "Kavya", "Rohan", "Meera", "Arjun",
+         "Saanvi", "Kabir", "Nisha", "Dev", "Priya", "Rahul", "Sneha", "Vikram", "Pooja", "Karan"]
+LAST = ["Sharma", "Patel", "Shah", "Mehta", "Iyer", "Reddy", "Nair", "Gupta", "Desai", "Joshi",
+        "Kulkarni", "Chopra", "Bose", "Menon", "Trivedi", "Pandya", "Rao", "Verma", "Kapoor", "Das"]
+
+
+def _username(i, name):
+    return f"{name.split()[0].lower()}{i}"
+
+
+def _misspell(rng, word):
+    i = rng.randrange(1, len(word) - 1)
+    return word[:i] + rng.choice("aeiou") + word[i + 1:]
+
+
+def run(students=100000, lookups=200):
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "search.db"))
+        migrate(conn)
+        names = [f"{rng.choice(FIRST)} {rng.choice(LAST)}" for _ in range(students)]
+        start = time.perf_counter()
+        with conn:
+            conn.executemany("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, 'x', ?, ?, ?)",
+                             [(_username(i, name), f"R{i:06d}", name, str(2022 + i % 4))
+                              for i, name in enumerate(names)])
+        load_seconds = time.perf_counter() - start
+
+        queries = {
+            "exact username": lambda: _username(*rng.choice(list(enumerate(names[:1000])))),
+            "roll prefix": lambda: f"R{rng.randrange(students):06d}"[:5],
+            "short prefix": lambda: rng.choice(FIRST)[:2].lower(),
+            "name substring": lambda: rng.choice(LAST)[1:5],
+            "misspelt name": lambda: _misspell(rng, rng.choice(LAST)),
+        }
+        report = {"students": students, "load_seconds": round(load_seconds, 2), "lookups": {}}
+        for label, make in queries.items():
+            timings = []
+            for _ in range(lookups):
+                text = make()
+                t0 = time.perf_counter()
+                search_students(conn, text)
+                timings.append(time.perf_counter() - t0)
+            timings.sort()
+            report["lookups"][label] = {"p50_ms": round(timings[len(timings) // 2] * 1000, 2),
+                                        "p95_ms": round(timings[int(len(timings) * 0.95)] * 1000, 2)}
+        conn.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time student search lookups on a synthetic table.")
+    parser.add_argument("--students", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.students, args.lookups), indent=2))
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import urllib.request
+from benchmarks.datagen import PASSWORD, generate
+from server import make_server
+
+# ===============================
+# HTTP SERVER LOAD TEST
+# ===============================
+# Starts the API server on a free localhost port against a seeded temporary
+# database and hammers the student read paths from concurrent clients:
+#     python -m benchmarks.server_load --clients 16 --requests 200
+
+
+def seed(db_path, students=200, subjects=8, semesters=4):
+    conn = sqlite3.connect(db_path)
+    generate(conn, students=students, teachers=1, subjects=subjects, semesters=semesters, per_semester=subjects)
+    conn.close()
+
+
+def _call(base, method, path, body=None, token=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+def run(clients=16, requests=200, pool_size=8, students=200):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "load.db")
+        seed(db_path, students=students)
+        httpd = make_server(port=0, db_path=db_path, pool_size=pool_size)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{httpd.server_address[1]}"
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def client(n):
+            token = _call(base, "POST", "/login",
+                          {"role": "student", "username": f"student{n % students}", "password": PASSWORD})["token"]
+            local = []
+            for i in range(requests):
+                path = f"/results?semester={1 + i % 4}" if i % 2 else "/gpa"
+                start = time.perf_counter()
+                try:
+                    _call(base, "GET", path, token=token)
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                local.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(local)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        httpd.shutdown()
+        httpd.server_close()
+        httpd.writes.close()
+        httpd.pool.close()
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+    return {"clients": clients, "requests": len(latencies), "errors": len(errors),
+            "seconds": round(elapsed, 3), "requests_per_sec": round(len(latencies) / elapsed, 1),
+            "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the local HTTP API.")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--students", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(run(args.clients, args.requests, args.pool_size, args.students), indent=2))
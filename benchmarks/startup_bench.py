@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ===============================
+# STARTUP BENCHMARK
+# ===============================
+# Imports main in fresh interpreters (with -X importtime) inside a temporary
+# directory and reports the wall-clock time to reach the menu, the slowest
+# imports, and which heavy optional modules were loaded at startup:
+#     python -m benchmarks.startup_bench --runs 10
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules that should only load once a feature needs them.
+HEAVY_MODULES = ["bcrypt", "cryptography.fernet", "maskpass", "reportlab.pdfgen.canvas", "tabulate"]
+
+
+def parse_importtime(stderr):
+    """Returns {module: (self_us, cumulative_us)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def _import_main(cwd):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=cwd,
+                          env={**os.environ, "PYTHONPATH": PROJECT_DIR}, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(proc.stderr)
+
+
+def run(runs=10, top=10):
+    with tempfile.TemporaryDirectory() as tmp:
+        # The first import creates and migrates the database; later ones only check its version.
+        first_seconds, _ = _import_main(tmp)
+        timings = []
+        modules = {}
+        for _ in range(runs):
+            elapsed, modules = _import_main(tmp)
+            timings.append(elapsed)
+
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return {
+        "runs": runs,
+        "first_start_ms": round(first_seconds * 1000, 1),
+        "wall_ms_median": round(statistics.median(timings) * 1000, 1),
+        "wall_ms_min": round(min(timings) * 1000, 1),
+        "import_main_ms": round(modules.get("main", (0, 0))[1] / 1000, 1),
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in modules],
+        "slowest_imports_self_ms": {name: round(self_us / 1000, 2) for name, (self_us, _) in slowest},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how long main.py takes to import.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs, args.top), indent=2))
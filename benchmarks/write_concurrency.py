@@ -0,0 +1,165 @@
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import service
+from benchmarks.datagen import generate
+from storage import ThreadLocalPool, WriteQueue, connect
+from utils import get_audit_writer
+
+# ===============================
+# CONCURRENT WRITE BENCHMARK
+# ===============================
+# Runs concurrent "teachers" that each enter marks (with a few reads in
+# between) against copies of one seeded database, in three modes:
+#   rollback  one plain connection per worker, default rollback journal (the old setup)
+#   wal       one tuned WAL connection per worker (storage.ThreadLocalPool)
+#   queue     WAL reads, writes through one storage.WriteQueue (group commit)
+# and reports throughput, latency and "database is locked" errors. Workers are
+# threads of one process (like the API server) or, with --processes, separate
+# processes (like several teachers running main.py); queue needs threads.
+#     python -m benchmarks.write_concurrency --workers 8 --writes 200
+#     python -m benchmarks.write_concurrency --workers 8 --processes --modes rollback wal
+
+MODES = ["rollback", "wal", "queue"]
+
+
+def seed(db_path, workers, students):
+    conn = sqlite3.connect(db_path)
+    generate(conn, students=students, teachers=workers, subjects=workers, semesters=1, per_semester=1)
+    conn.close()
+
+
+def _is_lock_error(e):
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+
+def _open(mode, db_path, timeout):
+    if mode == "rollback":
+        return sqlite3.connect(db_path, timeout=timeout, check_same_thread=False)
+    return connect(db_path, check_same_thread=False)
+
+
+def _teacher_writes(conn, n, writes, reads, write):
+    """One teacher entering `writes` marks; returns (latencies, lock errors, other errors)."""
+    subject_id, teacher_id, teacher = conn.execute(
+        "SELECT s.id, t.id, t.username FROM subjects s JOIN teachers t ON t.id = s.teacher_id WHERE s.id=?",
+        (n + 1,)).fetchone()
+    session = service.Session(teacher_id, teacher, "teacher")
+    # Each worker writes its own semester, so workers never collide on a row.
+    semester = 100 + n
+    latencies = []
+    lock_errors = other_errors = 0
+    for i in range(writes):
+        for _ in range(reads):
+            conn.execute("SELECT COUNT(*), AVG(marks) FROM marks WHERE subject_id=?", (subject_id,)).fetchone()
+        start = time.perf_counter()
+        try:
+            write(service.enter_result, session, 1 + i, subject_id, semester, 40 + i % 60)
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            if _is_lock_error(e):
+                lock_errors += 1
+            else:
+                other_errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, lock_errors, other_errors
+
+
+def _process_worker(args):
+    mode, db_path, n, writes, reads, timeout = args
+    conn = _open(mode, db_path, timeout)
+    try:
+        return _teacher_writes(conn, n, writes, reads, lambda fn, *a: fn(conn, *a))
+    finally:
+        get_audit_writer().close()
+        conn.close()
+
+
+def run_mode(mode, db_path, workers=8, writes=200, reads=2, timeout=5.0, processes=False):
+    writer = WriteQueue(db_path) if mode == "queue" else None
+    start = time.perf_counter()
+    if processes:
+        with multiprocessing.Pool(workers) as pool:
+            outcomes = pool.map(_process_worker, [(mode, db_path, n, writes, reads, timeout) for n in range(workers)])
+    else:
+        outcomes = [None] * workers
+        barrier = threading.Barrier(workers)
+        pool = None if mode == "rollback" else ThreadLocalPool(db_path)
+
+        def worker(n):
+            conn = pool.connection() if pool else _open(mode, db_path, timeout)
+            write = writer.run if writer else (lambda fn, *a: fn(conn, *a))
+            barrier.wait()
+            outcomes[n] = _teacher_writes(conn, n, writes, reads, write)
+            if pool:
+                pool.close()
+            else:
+                conn.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
+    batching = writer.stats() if writer else None
+    if writer:
+        writer.close()
+
+    conn = sqlite3.connect(db_path)
+    stored = conn.execute("SELECT COUNT(*) FROM marks WHERE semester >= 100").fetchone()[0]
+    journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    conn.close()
+    latencies = sorted(lat for outcome in outcomes for lat in outcome[0])
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+    result = {"mode": mode, "workers": f"{workers} {'processes' if processes else 'threads'}",
+              "journal_mode": journal, "writes_ok": len(latencies), "writes_stored": stored,
+              "lock_errors": sum(o[1] for o in outcomes), "other_errors": sum(o[2] for o in outcomes),
+              "seconds": round(elapsed, 3), "writes_per_sec": round(len(latencies) / elapsed, 1),
+              "p50_ms": pct(0.50), "p95_ms": pct(0.95), "p99_ms": pct(0.99)}
+    if batching:
+        result["jobs_per_batch"] = batching["jobs_per_batch"]
+    return result
+
+
+def run(workers=8, writes=200, reads=2, students=None, modes=MODES, timeout=5.0, processes=False):
+    students = students or writes
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # The audit log is written relative to the working directory.
+        os.chdir(tmp)
+        try:
+            base = os.path.join(tmp, "base.db")
+            seed(base, workers, max(students, writes))
+            for mode in modes:
+                if processes and mode == "queue":
+                    continue
+                db_path = os.path.join(tmp, f"{mode}.db")
+                shutil.copy(base, db_path)
+                results.append(run_mode(mode, db_path, workers, writes, reads, timeout, processes))
+            get_audit_writer().close()
+        finally:
+            os.chdir(cwd)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare concurrent write throughput and lock errors.")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="marks entered per worker")
+    parser.add_argument("--reads", type=int, default=2, help="reads before each write")
+    parser.add_argument("--timeout", type=float, default=5.0, help="busy timeout of the rollback-mode connections")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--processes", action="store_true", help="run workers as processes (skips queue)")
+    args = parser.parse_args()
+    print(json.dumps(run(args.workers, args.writes, args.reads, modes=args.modes, timeout=args.timeout,
+                         processes=args.processes), indent=2))
@@ -0,0 +1,161 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+from itertools import islice
+from grading import recurve, schemes_by_batch
+from result_cache import get_result_cache
+from utils import log_event
+
+FIELDS = ["username", "subject_code", "semester", "marks"]
+
+UPSERT_SQL = """INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(student_id, subject_id, semester) DO UPDATE SET
+                    marks = excluded.marks,
+                    grade = excluded.grade,
+                    grade_point = excluded.grade_point"""
+
+
+def read_records(path):
+    """Yields (line_no, record) pairs from a CSV or JSONL file without loading it whole."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = {"_raw": line.rstrip("\n")}
+                yield line_no, record
+        else:
+            reader = csv.DictReader(f)
+            for line_no, record in enumerate(reader, start=2):
+                yield line_no, record
+
+
+def _parse(record, students, subjects):
+    """Returns (row, None) for a valid record or (None, reason) for a bad one."""
+    if not isinstance(record, dict) or "_raw" in record:
+        return None, "unparseable line"
+    student_id = students.get(str(record.get("username", "")).strip())
+    if student_id is None:
+        return None, "unknown student"
+    subject_id = subjects.get(str(record.get("subject_code", "")).strip())
+    if subject_id is None:
+        return None, "unknown subject"
+    try:
+        semester = int(record.get("semester"))
+        marks = int(record.get("marks"))
+    except (TypeError, ValueError):
+        return None, "semester and marks must be integers"
+    if semester < 1:
+        return None, "semester must be positive"
+    if not 0 <= marks <= 100:
+        return None, "marks must be between 0 and 100"
+    return (student_id, subject_id, semester, marks), None
+
+
+def import_marks(conn, path, teacher_id=None, chunk_size=5000, reject_path=None, username="SYSTEM", role="admin"):
+    """Streams marks from a CSV/JSONL file into the marks table.
+
+    Each chunk is validated against in-memory username/subject-code maps,
+    graded with the student's batch scheme, and upserted with executemany in
+    its own transaction; relatively graded offerings are re-curved at the end.
+    Bad rows go to a reject CSV. When teacher_id is given only that teacher's
+    subjects are accepted. Returns a summary dict.
+    """
+    c = conn.cursor()
+    c.execute("SELECT username, id, batch FROM students")
+    students = {}
+    batches = {}
+    for name, student_id, batch in c.fetchall():
+        students[name] = student_id
+        batches[student_id] = batch
+    schemes, default_scheme = schemes_by_batch(conn)
+    if teacher_id is None:
+        c.execute("SELECT code, id FROM subjects")
+    else:
+        c.execute("SELECT code, id FROM subjects WHERE teacher_id=?", (teacher_id,))
+    subjects = dict(c.fetchall())
+
+    reject_path = reject_path or os.path.splitext(path)[0] + "_rejects.csv"
+    reject_file = None
+    reject_writer = None
+    imported = 0
+    rejected = 0
+    offerings = set()
+    start = time.perf_counter()
+
+    records = read_records(path)
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            rows = []
+            for line_no, record in chunk:
+                row, reason = _parse(record, students, subjects)
+                if row is None:
+                    if reject_writer is None:
+                        reject_file = open(reject_path, "w", newline="", encoding="utf-8")
+                        reject_writer = csv.writer(reject_file)
+                        reject_writer.writerow(["line"] + FIELDS + ["reason"])
+                    values = record if isinstance(record, dict) else {}
+                    reject_writer.writerow([line_no] + [values.get(k, "") for k in FIELDS] + [reason])
+                    rejected += 1
+                else:
+                    rows.append(row + schemes.get(batches[row[0]], default_scheme).grade(row[3]))
+            with conn:
+                conn.executemany(UPSERT_SQL, rows)
+            if rows:
+                get_result_cache().invalidate()
+            offerings.update((row[1], row[2]) for row in rows)
+            imported += len(rows)
+    finally:
+        if reject_file:
+            reject_file.close()
+    # Curved offerings are re-graded once, after all their marks are in.
+    for subject_id, semester in offerings:
+        recurve(conn, subject_id, semester)
+
+    elapsed = time.perf_counter() - start
+    log_event(username, role, f"Bulk imported marks from '{os.path.basename(path)}': "
+                              f"{imported} rows imported, {rejected} rejected in {elapsed:.2f}s.")
+    return {
+        "imported": imported,
+        "rejected": rejected,
+        "reject_file": reject_path if rejected else None,
+        "seconds": elapsed,
+    }
+
+
+def print_import_summary(summary):
+    print(f"✅ Imported {summary['imported']} rows in {summary['seconds']:.2f}s.")
+    if summary["rejected"]:
+        print(f"⚠️ {summary['rejected']} rows rejected, see {summary['reject_file']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import marks from a CSV or JSONL file.")
+    parser.add_argument("path", help="file with username, subject_code, semester, marks columns")
+    parser.add_argument("--teacher", help="only accept subjects taught by this teacher username")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--rejects", help="where to write rejected rows")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect("userdetails.db")
+    teacher_id = None
+    if args.teacher:
+        row = conn.execute("SELECT id FROM teachers WHERE username=?", (args.teacher,)).fetchone()
+        if not row:
+            raise SystemExit("Teacher not found.")
+        teacher_id = row[0]
+    summary = import_marks(conn, args.path, teacher_id=teacher_id, chunk_size=args.chunk_size,
+                           reject_path=args.rejects, username=args.teacher or "SYSTEM",
+                           role="teacher" if args.teacher else "admin")
+    print_import_summary(summary)
+    conn.close()
@@ -0,0 +1,189 @@
+import sqlite3
+import sys
+
+# ===============================
+# AGGREGATE TABLES
+# ===============================
+# student_semester_gpa / student_gpa hold running credit and grade-point sums
+# so that SGPA/CGPA reads are a single primary-key lookup. The triggers below
+# keep them in step with every write to marks (and to subject credits).
+AGGREGATE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS student_semester_gpa(
+        student_id INTEGER NOT NULL,
+        semester INTEGER NOT NULL,
+        total_credits INTEGER NOT NULL DEFAULT 0,
+        total_points REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY(student_id, semester)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS student_gpa(
+        student_id INTEGER PRIMARY KEY,
+        total_credits INTEGER NOT NULL DEFAULT 0,
+        total_points REAL NOT NULL DEFAULT 0
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS gpa_marks_insert AFTER INSERT ON marks
+    BEGIN
+        INSERT INTO student_semester_gpa (student_id, semester, total_credits, total_points)
+        SELECT NEW.student_id, NEW.semester, credits, COALESCE(NEW.grade_point, 0) * credits
+        FROM subjects WHERE id = NEW.subject_id
+        ON CONFLICT(student_id, semester) DO UPDATE SET
+            total_credits = total_credits + excluded.total_credits,
+            total_points = total_points + excluded.total_points;
+        INSERT INTO student_gpa (student_id, total_credits, total_points)
+        SELECT NEW.student_id, credits, COALESCE(NEW.grade_point, 0) * credits
+        FROM subjects WHERE id = NEW.subject_id
+        ON CONFLICT(student_id) DO UPDATE SET
+            total_credits = total_credits + excluded.total_credits,
+            total_points = total_points + excluded.total_points;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS gpa_marks_delete AFTER DELETE ON marks
+    BEGIN
+        UPDATE student_semester_gpa SET
+            total_credits = total_credits - (SELECT credits FROM subjects WHERE id = OLD.subject_id),
+            total_points = total_points - COALESCE(OLD.grade_point, 0) * (SELECT credits FROM subjects WHERE id = OLD.subject_id)
+        WHERE student_id = OLD.student_id AND semester = OLD.semester
+          AND EXISTS (SELECT 1 FROM subjects WHERE id = OLD.subject_id);
+        UPDATE student_gpa SET
+            total_credits = total_credits - (SELECT credits FROM subjects WHERE id = OLD.subject_id),
+            total_points = total_points - COALESCE(OLD.grade_point, 0) * (SELECT credits FROM subjects WHERE id = OLD.subject_id)
+        WHERE student_id = OLD.student_id
+          AND EXISTS (SELECT 1 FROM subjects WHERE id = OLD.subject_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS gpa_marks_update
+    AFTER UPDATE OF student_id, subject_id, semester, grade_point ON marks
+    BEGIN
+        UPDATE student_semester_gpa SET
+            total_credits = total_credits - (SELECT credits FROM subjects WHERE id = OLD.subject_id),
+            total_points = total_points - COALESCE(OLD.grade_point, 0) * (SELECT credits FROM subjects WHERE id = OLD.subject_id)
+        WHERE student_id = OLD.student_id AND semester = OLD.semester
+          AND EXISTS (SELECT 1 FROM subjects WHERE id = OLD.subject_id);
+        UPDATE student_gpa SET
+            total_credits = total_credits - (SELECT credits FROM subjects WHERE id = OLD.subject_id),
+            total_points = total_points - COALESCE(OLD.grade_point, 0) * (SELECT credits FROM subjects WHERE id = OLD.subject_id)
+        WHERE student_id = OLD.student_id
+          AND EXISTS (SELECT 1 FROM subjects WHERE id = OLD.subject_id);
+        INSERT INTO student_semester_gpa (student_id, semester, total_credits, total_points)
+        SELECT NEW.student_id, NEW.semester, credits, COALESCE(NEW.grade_point, 0) * credits
+        FROM subjects WHERE id = NEW.subject_id
+        ON CONFLICT(student_id, semester) DO UPDATE SET
+            total_credits = total_credits + excluded.total_credits,
+            total_points = total_points + excluded.total_points;
+        INSERT INTO student_gpa (student_id, total_credits, total_points)
+        SELECT NEW.student_id, credits, COALESCE(NEW.grade_point, 0) * credits
+        FROM subjects WHERE id = NEW.subject_id
+        ON CONFLICT(student_id) DO UPDATE SET
+            total_credits = total_credits + excluded.total_credits,
+            total_points = total_points + excluded.total_points;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS gpa_subject_credits_update
+    AFTER UPDATE OF credits ON subjects WHEN NEW.credits <> OLD.credits
+    BEGIN
+        UPDATE student_semester_gpa SET
+            total_credits = total_credits + (NEW.credits - OLD.credits),
+            total_points = total_points + (NEW.credits - OLD.credits) * (
+                SELECT COALESCE(m.grade_point, 0) FROM marks m
+                WHERE m.student_id = student_semester_gpa.student_id
+                  AND m.semester = student_semester_gpa.semester
+                  AND m.subject_id = NEW.id)
+        WHERE EXISTS (SELECT 1 FROM marks m
+                      WHERE m.student_id = student_semester_gpa.student_id
+                        AND m.semester = student_semester_gpa.semester
+                        AND m.subject_id = NEW.id);
+        UPDATE student_gpa SET
+            total_credits = total_credits + (NEW.credits - OLD.credits) * (
+                SELECT COUNT(*) FROM marks m
+                WHERE m.student_id = student_gpa.student_id AND m.subject_id = NEW.id),
+            total_points = total_points + (NEW.credits - OLD.credits) * (
+                SELECT COALESCE(SUM(COALESCE(m.grade_point, 0)), 0) FROM marks m
+                WHERE m.student_id = student_gpa.student_id AND m.subject_id = NEW.id)
+        WHERE student_id IN (SELECT student_id FROM marks WHERE subject_id = NEW.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS gpa_subject_delete AFTER DELETE ON subjects
+    BEGIN
+        UPDATE student_semester_gpa SET
+            total_credits = total_credits - OLD.credits,
+            total_points = total_points - OLD.credits * (
+                SELECT COALESCE(m.grade_point, 0) FROM marks m
+                WHERE m.student_id = student_semester_gpa.student_id
+                  AND m.semester = student_semester_gpa.semester
+                  AND m.subject_id = OLD.id)
+        WHERE EXISTS (SELECT 1 FROM marks m
+                      WHERE m.student_id = student_semester_gpa.student_id
+                        AND m.semester = student_semester_gpa.semester
+                        AND m.subject_id = OLD.id);
+        UPDATE student_gpa SET
+            total_credits = total_credits - OLD.credits * (
+                SELECT COUNT(*) FROM marks m
+                WHERE m.student_id = student_gpa.student_id AND m.subject_id = OLD.id),
+            total_points = total_points - OLD.credits * (
+                SELECT COALESCE(SUM(COALESCE(m.grade_point, 0)), 0) FROM marks m
+                WHERE m.student_id = student_gpa.student_id AND m.subject_id = OLD.id)
+        WHERE student_id IN (SELECT student_id FROM marks WHERE subject_id = OLD.id);
+    END""",
+]
+
+
+def ensure_gpa_aggregates(conn):
+    """Creates the aggregate tables and triggers, filling them on first creation."""
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='student_gpa'")
+    existed = c.fetchone() is not None
+    for statement in AGGREGATE_SCHEMA:
+        conn.execute(statement)
+    if not existed:
+        _fill_gpa_aggregates(conn)
+
+
+def _fill_gpa_aggregates(conn):
+    c = conn.cursor()
+    c.execute("DELETE FROM student_semester_gpa")
+    c.execute("DELETE FROM student_gpa")
+    c.execute("""
+        INSERT INTO student_semester_gpa (student_id, semester, total_credits, total_points)
+        SELECT m.student_id, m.semester, SUM(s.credits), SUM(COALESCE(m.grade_point, 0) * s.credits)
+        FROM marks m
+        JOIN subjects s ON m.subject_id = s.id
+        GROUP BY m.student_id, m.semester
+    """)
+    c.execute("""
+        INSERT INTO student_gpa (student_id, total_credits, total_points)
+        SELECT student_id, SUM(total_credits), SUM(total_points)
+        FROM student_semester_gpa
+        GROUP BY student_id
+    """)
+
+
+def rebuild_gpa_aggregates(conn):
+    """Reconstructs both aggregate tables from the marks table in one transaction."""
+    with conn:
+        _fill_gpa_aggregates(conn)
+
+
+def gpa_from_totals(total_credits, total_points):
+    if not total_credits:
+        return 0.0
+    return round(total_points / total_credits, 2)
+
+
+def read_sgpa(conn, student_id, semester):
+    c = conn.cursor()
+    c.execute("SELECT total_credits, total_points FROM student_semester_gpa WHERE student_id=? AND semester=?",
+              (student_id, semester))
+    row = c.fetchone()
+    return gpa_from_totals(*row) if row else 0.0
+
+
+def read_cgpa(conn, student_id):
+    c = conn.cursor()
+    c.execute("SELECT total_credits, total_points FROM student_gpa WHERE student_id=?", (student_id,))
+    row = c.fetchone()
+    return gpa_from_totals(*row) if row else 0.0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python gpa_aggregates.py rebuild")
+        sys.exit(1)
+    with sqlite3.connect("userdetails.db") as conn:
+        ensure_gpa_aggregates(conn)
+        rebuild_gpa_aggregates(conn)
+    print("GPA aggregates rebuilt.")
@@ -0,0 +1,255 @@
+import atexit
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from functools import lru_cache, wraps
+
+# ===============================
+# LATENCY INSTRUMENTATION
+# ===============================
+# connect() returns a connection whose cursors time every statement. Timings
+# are grouped by normalized SQL (literals replaced with ?) and kept as
+# histograms, next to per-action histograms recorded by the @timed decorator.
+# Statements slower than SLOW_QUERY_MS are appended, with their query plan,
+# to SLOW_QUERY_LOG. dump_metrics() writes everything as JSON or in the
+# Prometheus text format.
+
+ENABLED = os.environ.get("RMS_METRICS", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("RMS_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG = os.path.join("logs", "slow_queries.log")
+# When set, metrics are dumped to this file on exit.
+METRICS_FILE = os.environ.get("RMS_METRICS_FILE")
+
+# Histogram upper bounds in seconds; a final +Inf bucket is implied.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """Collapses whitespace and replaces literals and IN-lists so equivalent statements share a series."""
+    sql = " ".join(sql.split())
+    sql = _LITERALS.sub("?", sql)
+    return _IN_LISTS.sub("(?, ...)", sql)
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def observe(self, seconds, rows=0):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self):
+        return {"count": self.count, "sum_seconds": round(self.total, 6), "max_seconds": round(self.max, 6),
+                "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                "rows": self.rows, "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets))}
+
+
+class Metrics:
+    """Thread-safe registry of histograms keyed by (kind, name); kind is "sql" or "action"."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, kind, name, seconds, rows=0):
+        with self._lock:
+            hist = self._series.get((kind, name))
+            if hist is None:
+                hist = self._series[(kind, name)] = Histogram()
+            hist.observe(seconds, rows)
+
+    def add_rows(self, kind, name, rows):
+        with self._lock:
+            hist = self._series.get((kind, name))
+            if hist is not None:
+                hist.rows += rows
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        with self._lock:
+            data = {"sql": {}, "action": {}}
+            for (kind, name), hist in self._series.items():
+                data.setdefault(kind, {})[name] = hist.snapshot()
+            return data
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            series = sorted(self._series.items())
+            for kind, label in (("sql", "statement"), ("action", "action")):
+                metric = f"rms_{kind}_duration_seconds"
+                lines.append(f"# HELP {metric} Latency per {label}.")
+                lines.append(f"# TYPE {metric} histogram")
+                rows = []
+                for (series_kind, name), hist in series:
+                    if series_kind != kind:
+                        continue
+                    value = _label_value(name)
+                    cumulative = 0
+                    for bound, count in zip([str(b) for b in BUCKETS] + ["+Inf"], hist.buckets):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {hist.total:.6f}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {hist.count}')
+                    rows.append(f'rms_{kind}_rows_total{{{label}="{value}"}} {hist.rows}')
+                lines.append(f"# HELP rms_{kind}_rows_total Rows returned or changed per {label}.")
+                lines.append(f"# TYPE rms_{kind}_rows_total counter")
+                lines.extend(rows)
+        return "\n".join(lines) + "\n"
+
+
+def _label_value(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+            if METRICS_FILE:
+                atexit.register(dump_metrics, METRICS_FILE)
+        return _metrics
+
+
+def dump_metrics(path):
+    """Writes the current metrics to path: Prometheus text for .prom/.txt files, JSON otherwise."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    metrics = get_metrics()
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith((".prom", ".txt")):
+            f.write(metrics.to_prometheus())
+        else:
+            json.dump({"dumped_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **metrics.snapshot()}, f, indent=2)
+    return path
+
+
+# ===============================
+# SLOW QUERY LOG
+# ===============================
+_slow_lock = threading.Lock()
+
+
+def _log_slow_query(conn, sql, parameters, seconds):
+    try:
+        plan = [row[-1] for row in sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters)]
+    except (sqlite3.Error, ValueError):
+        plan = ["(no plan available)"]
+    lines = [f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {seconds * 1000:.1f} ms: {normalize_sql(sql)}"]
+    lines += [f"    {step}" for step in plan]
+    with _slow_lock:
+        try:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG), exist_ok=True)
+            with open(SLOW_QUERY_LOG, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Could not write slow query log: {e}", file=sys.stderr)
+
+
+# ===============================
+# INSTRUMENTED CONNECTION
+# ===============================
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times execute()/executemany() and counts the rows fetched with fetchone/fetchmany/fetchall."""
+
+    _statement = None
+
+    def _observe(self, sql, parameters, start):
+        seconds = time.perf_counter() - start
+        self._statement = normalize_sql(sql)
+        get_metrics().observe("sql", self._statement, seconds, max(self.rowcount, 0))
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            _log_slow_query(self.connection, sql, parameters, seconds)
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(sql, parameters, start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._observe(sql, (), start)
+
+    def _fetched(self, rows):
+        if self._statement is not None and rows:
+            get_metrics().add_rows("sql", self._statement, rows)
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._fetched(1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._fetched(len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(database, **kwargs):
+    """sqlite3.connect() that returns an instrumented connection unless RMS_METRICS=0."""
+    if ENABLED:
+        kwargs.setdefault("factory", InstrumentedConnection)
+    return sqlite3.connect(database, **kwargs)
+
+
+def timed(fn):
+    """Records each call of fn in the "action" histogram under module.function."""
+    if not ENABLED:
+        return fn
+    name = f"{fn.__module__}.{fn.__name__}"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            get_metrics().observe("action", name, time.perf_counter() - start)
+    return wrapper
@@ -1,173 +1,117 @@
 
 
 import sqlite3
-import bcrypt
-import maskpass
-import re
-import os
-import shutil
-from datetime import datetime
-from cryptography.fernet import Fernet
 from utils import log_event
+from migrations import migrate
+from instrumentation import dump_metrics
+from storage import connect
+from backup import create_backup, list_backups, restore_backup
+import service
+from service import ServiceError, check_password_strength
 
 
 # ===============================
 # DATABASE CONNECTION
 # ===============================
-connection = sqlite3.connect("userdetails.db")
-c = connection.cursor()
+connection = connect("userdetails.db")
 
 # ===============================
-# TABLE CREATION
+# SCHEMA MIGRATIONS
 # ===============================
-c.execute("""CREATE TABLE IF NOT EXISTS students(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL,
-    roll_no TEXT UNIQUE,
-    name TEXT,
-    batch TEXT
-)""")
-
-c.execute("""CREATE TABLE IF NOT EXISTS teachers(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL,
-    name TEXT,
-    department TEXT
-)""")
-
-c.execute("""CREATE TABLE IF NOT EXISTS subjects(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    code TEXT UNIQUE NOT NULL,
-    name TEXT NOT NULL,
-    credits INTEGER NOT NULL,
-    teacher_id INTEGER NOT NULL,
-    FOREIGN KEY(teacher_id) REFERENCES teachers(id)
-)""")
-
-c.execute("""CREATE TABLE IF NOT EXISTS marks(
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    student_id INTEGER NOT NULL,
-    subject_id INTEGER NOT NULL,
-    semester INTEGER NOT NULL,
-    marks INTEGER NOT NULL,
-    grade TEXT,
-    grade_point REAL,
-    FOREIGN KEY(student_id) REFERENCES students(id),
-    FOREIGN KEY(subject_id) REFERENCES subjects(id),
-    UNIQUE(student_id, subject_id, semester)
-)""")
-
-connection.commit()
-
-# ===============================
-# PASSWORD VALIDATION
-# ===============================
-def check_password_strength(password):
-    errors = []
-    if len(password) < 8:
-        errors.append("Password must be at least 8 characters long.")
-    if not re.search(r"[A-Z]", password):
-        errors.append("Password must contain at least one uppercase letter.")
-    if not re.search(r"[a-z]", password):
-        errors.append("Password must contain at least one lowercase letter.")
-    if not re.search(r"[0-9]", password):
-        errors.append("Password must contain at least one number.")
-    if not re.search(r"[@$!%*?&]", password):
-        errors.append("Password must contain at least one special character (@$!%*?&).")
-    return errors
-
-# ===============================
-# AUDIT LOG FUNCTION
-# ===============================
-def log_event(username, role, action):
-    """Logs all major events (register, login, CRUD, backup, etc.) in encrypted form."""
-    os.makedirs("logs", exist_ok=True)
-    log_db = "audit_logs.db"
-
-    # create log table if not exists
-    with sqlite3.connect(log_db) as conn:
-        cur = conn.cursor()
-        cur.execute("""CREATE TABLE IF NOT EXISTS logs(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            username TEXT,
-            role TEXT,
-            action TEXT
-        )""")
-
-        # encrypt the action text
-        key_file = "logs/key.key"
-        if not os.path.exists(key_file):
-            key = Fernet.generate_key()
-            with open(key_file, "wb") as f:
-                f.write(key)
-        else:
-            with open(key_file, "rb") as f:
-                key = f.read()
-        fernet = Fernet(key)
-
-        encrypted_action = fernet.encrypt(action.encode()).decode()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        cur.execute("INSERT INTO logs (timestamp, username, role, action) VALUES (?, ?, ?, ?)",
-                    (timestamp, username, role, encrypted_action))
-        conn.commit()
+migrate(connection)
 
 # ===============================
 # BACKUP & RECOVERY FUNCTION
 # ===============================
 def manage_backups():
-    """Handles automatic/manual backups and restoration."""
-    os.makedirs("backups", exist_ok=True)
-    backup_dir = "backups"
-    db_name = "userdetails.db"
-
+    """Handles online backups, verification and restoration."""
     while True:
         print("\n=== Backup & Recovery Menu ===")
         print("1. Create manual backup")
         print("2. Restore from latest backup")
         print("3. List all backups")
         print("4. Return to main menu")
-        choice = input("Choose an option (1-4): ").strip()
+        print("5. Export change delta")
+        print("6. Restore to a point in time")
+        choice = input("Choose an option (1-6): ").strip()
 
         if choice == "1":
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"userdetails_backup_{timestamp}.db")
-            shutil.copy(db_name, backup_file)
+            try:
+                backup_file = create_backup(connection)
+            except (OSError, RuntimeError, sqlite3.Error) as e:
+                print("❌ Backup failed:", e)
+                log_event("SYSTEM", "admin", f"Manual backup failed: {e}", sync=True)
+                continue
             print(f"Backup created: {backup_file}")
             log_event("SYSTEM", "admin", f"Manual backup created: {backup_file}")
 
         elif choice == "2":
-            backups = sorted(os.listdir(backup_dir))
+            backups = list_backups()
             if not backups:
                 print("No backups available.")
                 continue
-            latest = backups[-1]
-            shutil.copy(os.path.join(backup_dir, latest), db_name)
+            latest = backups[-1][0]
+            try:
+                restore_backup(connection, latest)
+            except (OSError, RuntimeError, sqlite3.Error) as e:
+                print("❌ Restore failed:", e)
+                log_event("SYSTEM", "admin", f"Restore from {latest} failed: {e}", sync=True)
+                continue
             print(f"Database restored from: {latest}")
-            log_event("SYSTEM", "admin", f"Database restored from {latest}")
+            log_event("SYSTEM", "admin", f"Database restored from {latest}", sync=True)
 
         elif choice == "3":
-            backups = sorted(os.listdir(backup_dir))
+            backups = list_backups()
             if not backups:
                 print("No backups found.")
             else:
                 print("Available backups:")
-                for b in backups:
-                    print(" -", b)
+                for name, entry in backups:
+                    if entry:
+                        print(f" - {name}  ({entry['size'] // 1024} KB, sha256 {entry['sha256'][:12]})")
+                    else:
+                        print(f" - {name}  (legacy copy, not verified)")
 
         elif choice == "4":
             break
+
+        elif choice == "5":
+            from journal import write_delta
+            try:
+                summary = write_delta(connection)
+            except (OSError, sqlite3.Error) as e:
+                print("❌ Delta export failed:", e)
+                continue
+            if summary is None:
+                print("No new changes since the last delta.")
+                continue
+            print(f"✅ {summary['name']}: {summary['entries']} changes, {summary['size'] // 1024} KB")
+            log_event("SYSTEM", "admin", f"Wrote change delta {summary['name']} ({summary['entries']} entries).")
+
+        elif choice == "6":
+            from journal import restore_point_in_time
+            target = input("Restore to (YYYY-MM-DD HH:MM[:SS]): ").strip()
+            try:
+                summary = restore_point_in_time(connection, target)
+            except (OSError, RuntimeError, ValueError, sqlite3.Error) as e:
+                print("❌ Restore failed:", e)
+                log_event("SYSTEM", "admin", f"Point-in-time restore to {target} failed: {e}", sync=True)
+                continue
+            print(f"✅ Database restored to {target} ({summary['method']}, {summary['seconds']:.2f}s).")
+            log_event("SYSTEM", "admin", f"Database restored to {target} ({summary['method']}).", sync=True)
         else:
             print("Invalid option.")
 
 # ===============================
 # USER FUNCTIONS
 # ===============================
+def _askpass(prompt):
+    # maskpass (and the portals below) load on first use to keep startup fast.
+    import maskpass
+    return maskpass.askpass(prompt=prompt, mask="•")
+
+
 def RegisterUser(role):
-    table = "students" if role == "student" else "teachers"
     username = input(f"Enter {role} username: ").strip()
     if role == "student":
         roll_no = input("Enter roll number: ").strip()
@@ -178,7 +122,7 @@ def RegisterUser(role):
         department = input("Enter department: ").strip()
 
     while True:
-        password = maskpass.askpass(prompt="Enter new password: ", mask="•")
+        password = _askpass("Enter new password: ")
         errors = check_password_strength(password)
         if errors:
             print("Weak password:")
@@ -187,25 +131,20 @@ def RegisterUser(role):
             print("Please try again.")
             continue
 
-        confirm = maskpass.askpass(prompt="Confirm password: ", mask="•")
+        confirm = _askpass("Confirm password: ")
         if password != confirm:
             print("Passwords do not match. Try again.")
             continue
         break
 
-    hashedpass = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
     try:
         if role == "student":
-            c.execute("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, ?, ?, ?, ?)",
-                      (username, hashedpass, roll_no, name, batch))
+            service.register_user(connection, role, username, password, roll_no=roll_no, name=name, batch=batch)
         else:
-            c.execute("INSERT INTO teachers (username, password, name, department) VALUES (?, ?, ?, ?)",
-                      (username, hashedpass, name, department))
-        connection.commit()
+            service.register_user(connection, role, username, password, name=name, department=department)
         print("Registered successfully.")
-        log_event(username, role, "Registered new account.")
-    except sqlite3.IntegrityError:
-        print("Username or roll number already exists.")
+    except ServiceError as e:
+        print(e.message)
         choice = input("Do you want to [L]ogin or [T]ry again? (L/T): ").lower()
         if choice == "l":
             LoginUser(role)
@@ -213,34 +152,29 @@ def RegisterUser(role):
             RegisterUser(role)
 
 def LoginUser(role):
-    table = "students" if role == "student" else "teachers"
     username = input(f"Enter {role} username: ").strip()
-    password = maskpass.askpass(prompt="Enter password: ", mask="•")
-    c.execute(f"SELECT id, password FROM {table} WHERE username = ?", (username,))
-    result = c.fetchone()
-    if result and bcrypt.checkpw(password.encode(), result[1]):
-        user_id = result[0]
-        print(f"{role.capitalize()} login successful.")
-        log_event(username, role, "Logged in.")
-        if role == "teacher":
-            TeacherPortal(connection, user_id, username)
-        else:
-            StudentPortal(connection, user_id, username)
-        log_event(username, role, "Logged out.")
+    password = _askpass("Enter password: ")
+    try:
+        session = service.login(connection, role, username, password)
+    except ServiceError as e:
+        print(e.message)
+        return
+    print(f"{role.capitalize()} login successful.")
+    if role == "teacher":
+        from teacher_portal import TeacherPortal
+        TeacherPortal(connection, session.user_id, username)
     else:
-        print("Invalid username or password.")
-        log_event(username, role, "Failed login attempt.")
+        from student_portal import StudentPortal
+        StudentPortal(connection, session.user_id, username)
+    service.logout(session)
 
 def ForgotPassword(role):
-    table = "students" if role == "student" else "teachers"
     username = input(f"Enter your {role} username: ").strip()
-    c.execute(f"SELECT id FROM {table} WHERE username = ?", (username,))
-    result = c.fetchone()
-    if not result:
+    if not service.user_exists(connection, role, username):
         print("Username not found.")
         return
     while True:
-        newpass = maskpass.askpass(prompt="Enter new password: ", mask="•")
+        newpass = _askpass("Enter new password: ")
         errors = check_password_strength(newpass)
         if errors:
             print("Weak password:")
@@ -248,23 +182,37 @@ def ForgotPassword(role):
                 print(" - " + e)
             print("Try again.")
             continue
-        confirm = maskpass.askpass(prompt="Confirm new password: ", mask="•")
+        confirm = _askpass("Confirm new password: ")
         if newpass != confirm:
             print("Passwords do not match. Try again.")
             continue
         break
-    hashedpass = bcrypt.hashpw(newpass.encode(), bcrypt.gensalt())
-    c.execute(f"UPDATE {table} SET password=? WHERE username=?", (hashedpass, username))
-    connection.commit()
+    service.reset_password(connection, role, username, newpass)
     print("Password reset successful.")
-    log_event(username, role, "Password reset.")
+
+def publish_results():
+    """Freezes a semester's results into the read-only snapshot students read from."""
+    from publish import publish_semester
+    try:
+        semester = int(input("Semester to publish: ").strip())
+    except ValueError:
+        print("❌ Semester must be a number.")
+        return
+    batch = input("Batch (blank for all batches): ").strip() or None
+    try:
+        summary = publish_semester(connection, semester, batch)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print("❌ Publishing failed:", e)
+        log_event("SYSTEM", "admin", f"Publishing semester {semester} failed: {e}", sync=True)
+        return
+    print(f"✅ Semester {semester}: {summary['students']} students, {summary['rows']} results published "
+          f"in {summary['seconds']:.2f}s.")
+    log_event("SYSTEM", "admin", f"Published semester {semester} results"
+                                 f"{' for batch ' + batch if batch else ''} ({summary['file']}).", sync=True)
 
 # ===============================
 # MAIN MENU
 # ===============================
-from teacher_portal import TeacherPortal
-from student_portal import StudentPortal
-
 if __name__ == "__main__":
     while True:
         print("\nMAIN MENU")
@@ -273,8 +221,10 @@ if __name__ == "__main__":
         print("3. Forgot Password")
         print("4. Exit")
         print("5. Backup & Recovery")
+        print("6. Dump performance metrics")
+        print("7. Publish semester results")
 
-        choice = input("Choose an option (1-5): ").strip()
+        choice = input("Choose an option (1-7): ").strip()
         if choice in ["1", "2", "3"]:
             role = input("Are you a [student] or [teacher]? ").strip().lower()
             if role not in ["student", "teacher"]:
@@ -291,5 +241,13 @@ if __name__ == "__main__":
             break
         elif choice == "5":
             manage_backups()
+        elif choice == "6":
+            path = input("Write to (.json or .prom, blank for logs/metrics.json): ").strip() or "logs/metrics.json"
+            try:
+                print("📈 Metrics written to", dump_metrics(path))
+            except OSError as e:
+                print("❌ Error:", e)
+        elif choice == "7":
+            publish_results()
         else:
             print("Invalid choice.")
\ No newline at end of file
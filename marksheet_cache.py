@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+# ===============================
+# MARKSHEET CACHE
+# ===============================
+# Content-addressed store of rendered marksheet PDFs. The key is a SHA-256 of
+# everything the PDF is drawn from (template version, student info, semester
+# rows, SGPA, CGPA), so an unchanged marksheet is copied from disk instead of
+# being re-rendered, and a marksheet whose marks changed can never be served
+# stale: its inputs, and therefore its key, are different.
+#
+# Files live in <cache dir>/<key[:2]>/<key>.pdf. A small SQLite index next to
+# them records each entry's owner, size and last use plus hit/miss counters,
+# shared by every process using the directory. When the total size passes
+# RMS_MARKSHEET_CACHE_MB the least recently used entries are evicted.
+
+MARKSHEET_CACHE_DIR = os.environ.get("RMS_MARKSHEET_CACHE_DIR", "marksheet_cache")
+MARKSHEET_CACHE_MB = float(os.environ.get("RMS_MARKSHEET_CACHE_MB", "256"))
+INDEX_NAME = "index.db"
+COUNTERS = ("hits", "misses", "evictions", "invalidations")
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries(
+    key TEXT PRIMARY KEY,
+    student_id INTEGER NOT NULL,
+    semester INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_student ON entries(student_id, semester);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used);
+CREATE TABLE IF NOT EXISTS counters(
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+
+def cache_key(inputs):
+    """SHA-256 of the JSON form of inputs (tuples and rows become lists)."""
+    text = json.dumps(inputs, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class MarksheetCache:
+    def __init__(self, cache_dir=MARKSHEET_CACHE_DIR, max_mb=MARKSHEET_CACHE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _index(self):
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.cache_dir, INDEX_NAME), timeout=10, check_same_thread=False)
+            # The index only describes files that can be re-rendered, so it
+            # trades durability for speed.
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.executescript(INDEX_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".pdf")
+
+    def _count(self, conn, name, amount=1):
+        conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                     "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, amount))
+
+    def _remove(self, conn, keys):
+        for key in keys:
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+        conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
+
+    def fetch(self, student_id, semester, inputs, filename, render):
+        """Writes the marksheet for inputs to filename, rendering it only on a miss.
+
+        render(path) must draw the PDF at path. Returns True on a cache hit.
+        """
+        if self.max_bytes <= 0:
+            render(filename)
+            return False
+        key = cache_key(inputs)
+        path = self.path_for(key)
+        with self._lock:
+            conn = self._index()
+            with conn:
+                hit = (conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+                       and os.path.exists(path))
+                if hit:
+                    conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._count(conn, "hits" if hit else "misses")
+        if hit:
+            try:
+                shutil.copyfile(path, filename)
+                return True
+            except FileNotFoundError:
+                # Evicted by another process since the lookup; render it again.
+                pass
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part = f"{path}.{os.getpid()}-{threading.get_ident()}.part"
+        try:
+            render(part)
+            os.replace(part, path)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+        shutil.copyfile(path, filename)
+        self._store(student_id, semester, key, os.path.getsize(path))
+        return False
+
+    def _store(self, student_id, semester, key, size):
+        now = time.time()
+        with self._lock:
+            conn = self._index()
+            with conn:
+                # Earlier versions of this marksheet can no longer be requested.
+                superseded = [row[0] for row in conn.execute(
+                    "SELECT key FROM entries WHERE student_id = ? AND semester = ? AND key <> ?",
+                    (student_id, semester, key))]
+                self._remove(conn, superseded)
+                conn.execute("INSERT OR REPLACE INTO entries (key, student_id, semester, size, created, last_used) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", (key, student_id, semester, size, now, now))
+                self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append(key)
+            total -= size
+        self._remove(conn, victims)
+        self._count(conn, "evictions", len(victims))
+
+    def invalidate(self, student_id=None, semester=None):
+        """Drops a student's cached marksheets (one semester, or all of them), or everything."""
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            conn = self._index()
+            with conn:
+                if student_id is None:
+                    keys = [row[0] for row in conn.execute("SELECT key FROM entries")]
+                elif semester is None:
+                    keys = [row[0] for row in conn.execute("SELECT key FROM entries WHERE student_id = ?",
+                                                           (student_id,))]
+                else:
+                    keys = [row[0] for row in conn.execute(
+                        "SELECT key FROM entries WHERE student_id = ? AND semester = ?", (student_id, semester))]
+                if keys:
+                    self._remove(conn, keys)
+                    self._count(conn, "invalidations", len(keys))
+
+    def stats(self):
+        with self._lock:
+            conn = self._index()
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            counters = dict.fromkeys(COUNTERS, 0)
+            counters.update(conn.execute("SELECT name, value FROM counters"))
+        lookups = counters["hits"] + counters["misses"]
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, **counters,
+                "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0}
+
+    def reset_stats(self):
+        with self._lock:
+            conn = self._index()
+            with conn:
+                conn.execute("DELETE FROM counters")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_marksheet_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MarksheetCache()
+        return _cache
+
+
+if __name__ == "__main__":
+    command = sys.argv[1:]
+    if command not in (["status"], ["clear"], ["reset-stats"]):
+        print("Usage: python marksheet_cache.py status|clear|reset-stats")
+        sys.exit(1)
+    cache = get_marksheet_cache()
+    if command == ["clear"]:
+        cache.invalidate()
+        print("Marksheet cache cleared.")
+    elif command == ["reset-stats"]:
+        cache.reset_stats()
+        print("Marksheet cache counters reset.")
+    else:
+        s = cache.stats()
+        print(f"{s['entries']} marksheets, {s['bytes'] / 1048576:.1f} of {s['max_bytes'] / 1048576:.0f} MB")
+        print(f"hits {s['hits']}, misses {s['misses']}, hit rate {s['hit_rate']:.1%}, "
+              f"evictions {s['evictions']}, invalidations {s['invalidations']}")
+    cache.close()
@@ -0,0 +1,134 @@
+import sqlite3
+import sys
+from datetime import datetime
+from gpa_aggregates import ensure_gpa_aggregates
+from grading import ensure_grading_schemes, ensure_relative_grading, ensure_scheme_version
+from journal import ensure_change_journal
+from student_search import ensure_student_search
+
+# ===============================
+# MIGRATIONS
+# ===============================
+# Each migration is (version, description, steps). A step is either an SQL
+# statement or a callable taking the connection. The applied version is kept in
+# PRAGMA user_version and every applied migration is logged in schema_migrations.
+# Steps run one statement at a time (never executescript, which commits first)
+# inside a single explicit transaction, so a failing migration leaves nothing
+# behind and can simply be run again.
+
+
+def _create_base_tables(conn):
+    c = conn.cursor()
+    c.execute("""CREATE TABLE IF NOT EXISTS students(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        roll_no TEXT UNIQUE,
+        name TEXT,
+        batch TEXT
+    )""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS teachers(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        name TEXT,
+        department TEXT
+    )""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS subjects(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        credits INTEGER NOT NULL,
+        teacher_id INTEGER NOT NULL,
+        FOREIGN KEY(teacher_id) REFERENCES teachers(id)
+    )""")
+
+    c.execute("""CREATE TABLE IF NOT EXISTS marks(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        subject_id INTEGER NOT NULL,
+        semester INTEGER NOT NULL,
+        marks INTEGER NOT NULL,
+        grade TEXT,
+        grade_point REAL,
+        FOREIGN KEY(student_id) REFERENCES students(id),
+        FOREIGN KEY(subject_id) REFERENCES subjects(id),
+        UNIQUE(student_id, subject_id, semester)
+    )""")
+
+
+MIGRATIONS = [
+    (1, "base schema", [_create_base_tables]),
+    (2, "SGPA/CGPA aggregate tables", [ensure_gpa_aggregates]),
+    (3, "hot-path indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_marks_subject ON marks(subject_id)",
+        "CREATE INDEX IF NOT EXISTS idx_marks_student_semester ON marks(student_id, semester)",
+        "CREATE INDEX IF NOT EXISTS idx_subjects_teacher ON subjects(teacher_id)",
+        "CREATE INDEX IF NOT EXISTS idx_teachers_department ON teachers(department)",
+        "CREATE INDEX IF NOT EXISTS idx_students_batch ON students(batch)",
+    ]),
+    (4, "student search index", [ensure_student_search]),
+    (5, "grading schemes", [ensure_grading_schemes]),
+    (6, "relative grading", [ensure_relative_grading]),
+    (7, "change journal", [ensure_change_journal]),
+    (8, "grading scheme version", [ensure_scheme_version]),
+    (9, "case-insensitive search indexes", [
+        "CREATE INDEX IF NOT EXISTS idx_students_username_nocase ON students(username COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_students_roll_no_nocase ON students(roll_no COLLATE NOCASE)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """Applies every pending migration up to target, in order. Returns the versions applied."""
+    version = current_version(conn)
+    if version >= target:
+        return []
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_migrations(
+        version INTEGER PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )""")
+    conn.commit()
+
+    applied = []
+    for number, description, steps in MIGRATIONS:
+        if number <= version or number > target:
+            continue
+        # An explicit BEGIN: the implicit one is only issued before DML, which
+        # would leave the CREATE statements of a step outside the transaction.
+        conn.execute("BEGIN")
+        try:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute("INSERT OR REPLACE INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)",
+                         (number, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            # PRAGMA cannot take parameters; number comes from MIGRATIONS above.
+            conn.execute(f"PRAGMA user_version = {int(number)}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied.append(number)
+    return applied
+
+
+if __name__ == "__main__":
+    conn = sqlite3.connect("userdetails.db")
+    if sys.argv[1:] == ["status"]:
+        print(f"Schema version {current_version(conn)} (latest {LATEST_VERSION}).")
+    else:
+        applied = migrate(conn)
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+    conn.close()
@@ -0,0 +1,94 @@
+import os
+from collections import namedtuple
+
+# ===============================
+# KEYSET PAGER
+# ===============================
+# Pages through a query by remembering the sort key of the first and last row
+# shown instead of using OFFSET, so every page costs the same no matter how
+# deep the teacher has scrolled. Only one page of rows is fetched at a time.
+
+PAGE_SIZE = int(os.environ.get("RMS_PAGE_SIZE", "20"))
+
+# rows: the page, oldest-first. first_key/last_key: sort keys to pass as
+# before=/after= for the previous/next page.
+Page = namedtuple("Page", "rows has_prev has_next first_key last_key")
+
+
+def keyset_page(conn, select, conditions, params, keys, after=None, before=None, page_size=PAGE_SIZE):
+    """Runs one page of `select` ordered by `keys` and returns a Page.
+
+    select is the SELECT ... FROM ... part without WHERE or ORDER BY.
+    conditions/params are ANDed filters. keys is a list of (sql_expression,
+    column_position) pairs forming a unique sort key; the positions say where
+    each key value appears in the selected row. Pass the last_key of a page as
+    after= for the next page, or its first_key as before= for the previous one.
+    """
+    conditions = list(conditions)
+    params = list(params)
+    columns = ", ".join(expr for expr, _ in keys)
+    direction = ""
+    if after is not None:
+        conditions.append(f"({columns}) > ({', '.join('?' * len(keys))})")
+        params.extend(after)
+    elif before is not None:
+        conditions.append(f"({columns}) < ({', '.join('?' * len(keys))})")
+        params.extend(before)
+        direction = " DESC"
+    sql = select
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY " + ", ".join(expr + direction for expr, _ in keys) + " LIMIT ?"
+    params.append(page_size + 1)
+
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    rows = cur.fetchmany(page_size + 1)
+    cur.close()
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before is not None:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = after is not None, more
+    if not rows:
+        return Page([], has_prev, has_next, None, None)
+    key = lambda row: tuple(row[pos] for _, pos in keys)
+    return Page(rows, has_prev, has_next, key(rows[0]), key(rows[-1]))
+
+
+def browse(fetch, headers, empty_message="No rows."):
+    """Prints fetch() one page at a time until the user presses Enter.
+
+    fetch(after=None, before=None) must return a Page. Returns False when
+    there was nothing to show.
+    """
+    from tabulate import tabulate
+    page = fetch()
+    if not page.rows:
+        print(empty_message)
+        return False
+    while True:
+        print(tabulate(page.rows, headers=headers, tablefmt="grid"))
+        options = []
+        if page.has_prev:
+            options.append("[p]rev")
+        if page.has_next:
+            options.append("[n]ext")
+        if not options:
+            return True
+        choice = input(f"{', '.join(options)}, Enter to stop: ").strip().lower()
+        if choice == "n" and page.has_next:
+            moved = fetch(after=page.last_key)
+        elif choice == "p" and page.has_prev:
+            moved = fetch(before=page.first_key)
+        elif not choice:
+            return True
+        else:
+            print("Invalid choice.")
+            continue
+        if moved.rows:
+            page = moved
+        else:
+            print("No more rows.")
@@ -0,0 +1,351 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from urllib.parse import quote
+from gpa_aggregates import gpa_from_totals
+from storage import MMAP_SIZE
+
+# ===============================
+# PUBLISHED RESULTS SNAPSHOT
+# ===============================
+# "Publishing" a semester freezes its results, with SGPA and CGPA already
+# computed, into a separate read-only database under published/. Student reads
+# are then served from that file instead of the live userdetails.db, so
+# results-day traffic never touches the tables teachers are still correcting
+# and each view is one primary-key range read, with no GPA work.
+#
+# A snapshot file is never modified once written: each publication copies the
+# previous snapshot's other semesters, adds the fresh one and writes a new
+# file, then atomically replaces the current.json pointer. Readers open the
+# file with immutable=1 (no locking or change checks) and mmap, and move to the
+# new file on their next read after the pointer changes.
+
+PUBLISH_DIR = os.environ.get("RMS_PUBLISH_DIR", "published")
+PUBLISH_KEEP = int(os.environ.get("RMS_PUBLISH_KEEP", "3"))
+POINTER = "current.json"
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE results(
+    student_id INTEGER NOT NULL,
+    semester INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    credits INTEGER NOT NULL,
+    marks INTEGER NOT NULL,
+    grade TEXT,
+    grade_point REAL,
+    PRIMARY KEY(student_id, semester, code)
+) WITHOUT ROWID;
+CREATE TABLE semesters(
+    student_id INTEGER NOT NULL,
+    semester INTEGER NOT NULL,
+    credits INTEGER NOT NULL,
+    sgpa REAL NOT NULL,
+    PRIMARY KEY(student_id, semester)
+) WITHOUT ROWID;
+CREATE TABLE students(
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL,
+    roll_no TEXT,
+    name TEXT,
+    batch TEXT,
+    credits INTEGER NOT NULL DEFAULT 0,
+    cgpa REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE published_semesters(
+    semester INTEGER NOT NULL,
+    batch TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    students INTEGER NOT NULL,
+    PRIMARY KEY(semester, batch)
+) WITHOUT ROWID;
+"""
+
+
+def _uri(path, **params):
+    query = "&".join(f"{k}={v}" for k, v in params.items())
+    return f"file:{quote(os.path.abspath(path))}?{query}"
+
+
+def current_publication(publish_dir=PUBLISH_DIR):
+    """Returns the current pointer ({"file", "published_at", "semesters"}) or None."""
+    try:
+        with open(os.path.join(publish_dir, POINTER), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_pointer(publish_dir, pointer):
+    path = os.path.join(publish_dir, POINTER)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish_semester(conn, semester, batch=None, publish_dir=PUBLISH_DIR):
+    """Freezes one semester's results (for one batch, or all) into a new snapshot and makes it current.
+
+    Semesters published earlier are carried over unchanged; the published
+    semester replaces any earlier publication of it. CGPA is computed over
+    the published semesters only, so marks entered for a semester that is
+    not out yet do not show. Returns a summary dict.
+    """
+    start = time.perf_counter()
+    live_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    if not live_path:
+        raise ValueError("Publishing needs a file-backed database.")
+    os.makedirs(publish_dir, exist_ok=True)
+    published_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    name = f"results_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.db"
+    part = os.path.join(publish_dir, f".{name}.part")
+    previous = current_publication(publish_dir)
+
+    snap = sqlite3.connect(part, uri=True)
+    try:
+        # Written once and renamed into place, so no journal is needed.
+        snap.execute("PRAGMA journal_mode=OFF")
+        snap.execute("PRAGMA synchronous=OFF")
+        snap.executescript(SNAPSHOT_SCHEMA)
+        snap.create_function("gpa", 2, gpa_from_totals, deterministic=True)
+        snap.execute("ATTACH DATABASE ? AS live", (_uri(live_path, mode="ro"),))
+        if previous:
+            snap.execute("ATTACH DATABASE ? AS prev",
+                         (_uri(os.path.join(publish_dir, previous["file"]), mode="ro", immutable=1),))
+
+        # One transaction: every read of the live database sees the same commit.
+        snap.execute("BEGIN")
+        if previous:
+            replaced = "semester = ? AND (? IS NULL OR student_id IN (SELECT id FROM prev.students WHERE batch = ?))"
+            snap.execute(f"INSERT INTO results SELECT * FROM prev.results WHERE NOT ({replaced})",
+                         (semester, batch, batch))
+            snap.execute("INSERT INTO published_semesters SELECT * FROM prev.published_semesters "
+                         "WHERE NOT (semester = ? AND batch = ?)", (semester, batch or ""))
+        cur = snap.execute("""
+            INSERT INTO results (student_id, semester, code, name, credits, marks, grade, grade_point)
+            SELECT m.student_id, m.semester, subj.code, subj.name, subj.credits, m.marks, m.grade, m.grade_point
+            FROM live.marks m
+            JOIN live.subjects subj ON subj.id = m.subject_id
+            JOIN live.students st ON st.id = m.student_id
+            WHERE m.semester = ? AND (? IS NULL OR st.batch = ?)
+            ORDER BY m.student_id, subj.code
+        """, (semester, batch, batch))
+        published = (snap.execute("SELECT COUNT(DISTINCT student_id) FROM results WHERE semester = ? AND "
+                                  "(? IS NULL OR student_id IN (SELECT id FROM live.students WHERE batch = ?))",
+                                  (semester, batch, batch)).fetchone()[0], cur.rowcount)
+        snap.execute("INSERT INTO published_semesters VALUES (?, ?, ?, ?)",
+                     (semester, batch or "", published_at, published[0]))
+        snap.execute("""
+            INSERT INTO semesters (student_id, semester, credits, sgpa)
+            SELECT student_id, semester, SUM(credits), gpa(SUM(credits), SUM(credits * COALESCE(grade_point, 0)))
+            FROM results GROUP BY student_id, semester
+        """)
+        snap.execute("""
+            INSERT INTO students (id, username, roll_no, name, batch, credits, cgpa)
+            SELECT st.id, st.username, st.roll_no, st.name, st.batch, r.credits, gpa(r.credits, r.points)
+            FROM (SELECT student_id, SUM(credits) AS credits, SUM(credits * COALESCE(grade_point, 0)) AS points
+                  FROM results GROUP BY student_id) AS r
+            JOIN live.students st ON st.id = r.student_id
+        """)
+        snap.commit()
+        snap.execute("DETACH DATABASE live")
+        if previous:
+            snap.execute("DETACH DATABASE prev")
+        semesters = [row[0] for row in snap.execute("SELECT DISTINCT semester FROM published_semesters ORDER BY 1")]
+        totals = snap.execute("SELECT (SELECT COUNT(*) FROM students), (SELECT COUNT(*) FROM results)").fetchone()
+        snap.close()
+        _fsync(part)
+        os.replace(part, os.path.join(publish_dir, name))
+    finally:
+        snap.close()
+        if os.path.exists(part):
+            os.remove(part)
+
+    _write_pointer(publish_dir, {"file": name, "published_at": published_at, "semesters": semesters})
+    prune_publications(publish_dir)
+    return {"file": name, "semester": semester, "batch": batch, "students": published[0], "rows": published[1],
+            "total_students": totals[0], "total_rows": totals[1], "semesters": semesters,
+            "seconds": time.perf_counter() - start}
+
+
+def list_publications(publish_dir=PUBLISH_DIR):
+    """Snapshot file names, oldest first."""
+    try:
+        return sorted(n for n in os.listdir(publish_dir) if n.startswith("results_") and n.endswith(".db"))
+    except FileNotFoundError:
+        return []
+
+
+def prune_publications(publish_dir=PUBLISH_DIR, keep=PUBLISH_KEEP):
+    """Deletes all but the newest `keep` snapshots, never the current one."""
+    current = (current_publication(publish_dir) or {}).get("file")
+    names = list_publications(publish_dir)
+    for name in names[:max(0, len(names) - max(1, keep))]:
+        if name == current:
+            continue
+        try:
+            # Readers that still have the file open keep reading it (POSIX).
+            os.remove(os.path.join(publish_dir, name))
+        except OSError:
+            pass
+
+
+def withdraw(publish_dir=PUBLISH_DIR):
+    """Removes the current pointer; student reads go back to the live database."""
+    try:
+        os.remove(os.path.join(publish_dir, POINTER))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# ===============================
+# SNAPSHOT READER
+# ===============================
+class PublishedResults:
+    """Serves student reads from the current snapshot, one immutable connection per thread."""
+
+    def __init__(self, publish_dir=PUBLISH_DIR):
+        self.publish_dir = publish_dir
+        self._pointer = os.path.join(publish_dir, POINTER)
+        self._seen = None
+        self._file = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def current_file(self):
+        """Name of the current snapshot, re-reading the pointer only when it was replaced."""
+        try:
+            st = os.stat(self._pointer)
+        except FileNotFoundError:
+            self._seen = self._file = None
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._seen:
+            with self._lock:
+                pointer = current_publication(self.publish_dir)
+                self._file = pointer["file"] if pointer else None
+                self._seen = stamp
+        return self._file
+
+    def _connection(self):
+        name = self.current_file()
+        if name is None:
+            return None, None
+        held = getattr(self._local, "held", None)
+        if held is not None and held[0] == name:
+            return name, held[1]
+        if held is not None:
+            held[1].close()
+        conn = sqlite3.connect(_uri(os.path.join(self.publish_dir, name), mode="ro", immutable=1), uri=True)
+        conn.execute(f"PRAGMA mmap_size={int(MMAP_SIZE)}")
+        self._local.held = (name, conn)
+        return name, conn
+
+    def _covers(self, conn, student_id, semester):
+        """True when the snapshot holds this semester for the student's batch (or for every batch)."""
+        return conn.execute("SELECT 1 FROM students st JOIN published_semesters p ON p.batch IN ('', st.batch) "
+                            "WHERE st.id = ? AND p.semester = ?", (student_id, semester)).fetchone() is not None
+
+    def semester_results(self, student_id, semester):
+        """{"rows", "sgpa", "cgpa", "published"} from the snapshot, or None when the snapshot does not
+        cover this semester for the student's batch."""
+        name, conn = self._connection()
+        if conn is None or not self._covers(conn, student_id, semester):
+            return None
+        rows = conn.execute("SELECT code, name, credits, marks, grade FROM results "
+                            "WHERE student_id = ? AND semester = ?", (student_id, semester)).fetchall()
+        sgpa = conn.execute("SELECT sgpa FROM semesters WHERE student_id = ? AND semester = ?",
+                            (student_id, semester)).fetchone()
+        return {"rows": rows, "sgpa": sgpa[0] if sgpa else 0.0, "cgpa": self._cgpa(conn, student_id),
+                "published": name}
+
+    def cgpa(self, student_id):
+        """CGPA over the published semesters, or None when the snapshot has no results for the student."""
+        _, conn = self._connection()
+        if conn is None:
+            return None
+        return self._cgpa(conn, student_id)
+
+    def _cgpa(self, conn, student_id):
+        row = conn.execute("SELECT cgpa FROM students WHERE id = ?", (student_id,)).fetchone()
+        return row[0] if row else None
+
+    def student_info(self, student_id):
+        """(roll_no, name, batch) as published, or None."""
+        _, conn = self._connection()
+        if conn is None:
+            return None
+        return conn.execute("SELECT roll_no, name, batch FROM students WHERE id = ?", (student_id,)).fetchone()
+
+    def close(self):
+        """Closes the calling thread's snapshot connection."""
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            held[1].close()
+            self._local.held = None
+
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def get_published_results():
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            _reader = PublishedResults()
+        return _reader
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish semester results as a read-only snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("semester", help="publish (or re-publish) one semester")
+    p.add_argument("semester", type=int)
+    p.add_argument("--batch", help="only this batch (default: every batch)")
+    sub.add_parser("status", help="show the current publication")
+    sub.add_parser("withdraw", help="stop serving the snapshot; students read live results again")
+    parser.add_argument("--db", default="userdetails.db")
+    parser.add_argument("--dir", default=PUBLISH_DIR)
+    args = parser.parse_args()
+
+    if args.command == "semester":
+        from utils import log_event
+        conn = sqlite3.connect(args.db)
+        try:
+            summary = publish_semester(conn, args.semester, args.batch, args.dir)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            raise SystemExit(f"❌ Publishing failed: {e}")
+        finally:
+            conn.close()
+        log_event("SYSTEM", "admin", f"Published semester {args.semester} results"
+                                     f"{' for batch ' + args.batch if args.batch else ''} ({summary['file']}).", sync=True)
+        print(f"✅ Semester {args.semester}: {summary['students']} students, {summary['rows']} results "
+              f"published as {summary['file']} in {summary['seconds']:.2f}s.")
+    elif args.command == "withdraw":
+        print("Publication withdrawn." if withdraw(args.dir) else "Nothing is published.")
+    else:
+        pointer = current_publication(args.dir)
+        if not pointer:
+            print("Nothing is published; students see live results.")
+        else:
+            print(f"Current: {pointer['file']} (published {pointer['published_at']}), "
+                  f"semesters {', '.join(map(str, pointer['semesters']))}")
+            for name in list_publications(args.dir):
+                print(f"  {name}")
@@ -0,0 +1,152 @@
+import ast
+import os
+import random
+import sqlite3
+import sys
+from unittest import mock
+import service
+from migrations import migrate
+
+# ===============================
+# QUERY PLAN REGRESSION CHECK
+# ===============================
+# Runs EXPLAIN QUERY PLAN for every literal SQL query executed in the portal
+# and service modules against a seeded database and reports any step that falls back to a
+# full table scan. SQL assembled at run time (class list filters, keyset
+# pages) is covered by calling its builders with representative arguments
+# and checking the statements they execute. Exits non-zero on regressions so
+# it can gate CI:
+#     python query_plans.py
+
+PORTAL_MODULES = ["teacher_portal.py", "student_portal.py", "service.py", "student_search.py"]
+
+# Queries that read a whole table by design, as (module, first line of SQL).
+ALLOWED_FULL_SCANS = {
+    # One-off schema check when the search index is created.
+    ("student_search.py", "SELECT 1 FROM sqlite_master WHERE type='table' AND name='student_search'"),
+    # The unfiltered class list reports every student.
+    ("dynamic", "fetch_class_list()"),
+    # First page of all students: walks the username index and stops after one page.
+    ("dynamic", "students_page()"),
+}
+
+_TEACHER = service.Session(1, "teacher0", "teacher")
+
+# Representative calls of the query builders, as (label, fn(conn)).
+DYNAMIC_QUERIES = [
+    ("fetch_class_list()", lambda conn: service.fetch_class_list(conn)),
+    ("fetch_class_list(batch)", lambda conn: service.fetch_class_list(conn, batch="2023")),
+    ("fetch_class_list(batch, desc, top_k)",
+     lambda conn: service.fetch_class_list(conn, batch="2023", order="desc", top_k=10)),
+    ("fetch_class_list(department)", lambda conn: service.fetch_class_list(conn, department="DEPT1")),
+    ("fetch_class_list(teacher_id)", lambda conn: service.fetch_class_list(conn, teacher_id=1)),
+    ("fetch_class_list(batch, department, teacher_id)",
+     lambda conn: service.fetch_class_list(conn, batch="2023", department="DEPT1", teacher_id=1, order="asc")),
+    ("teacher_results_page()", lambda conn: service.teacher_results_page(conn, _TEACHER)),
+    ("teacher_results_page(semester, subject_code)",
+     lambda conn: service.teacher_results_page(conn, _TEACHER, semester=1, subject_code="SUB000")),
+    ("teacher_results_page(roll range)",
+     lambda conn: service.teacher_results_page(conn, _TEACHER, roll_from="R000100", roll_to="R000200")),
+    ("teacher_results_page(after)",
+     lambda conn: service.teacher_results_page(conn, _TEACHER, after=("student5", 1, "SUB000"))),
+    ("teacher_results_page(before)",
+     lambda conn: service.teacher_results_page(conn, _TEACHER, before=("student5", 1, "SUB000"))),
+    ("students_page()", lambda conn: service.students_page(conn)),
+    ("students_page(roll range, after)",
+     lambda conn: service.students_page(conn, roll_from="R000100", roll_to="R000900", after=("student200",))),
+]
+
+
+def extract_queries(path):
+    """Yields (line_no, sql) for every execute()/executemany() call with a literal SQL string."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ("execute", "executemany") and node.args
+                and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)):
+            yield node.lineno, node.args[0].value
+
+
+def seed_database(conn, students=2000, teachers=20, subjects=80, semesters=4, per_semester=5):
+    """Creates the real schema and fills it with enough rows for the planner to use statistics."""
+    migrate(conn)
+    rng = random.Random(7)
+    c = conn.cursor()
+    c.executemany("INSERT INTO teachers (username, password, name, department) VALUES (?, ?, ?, ?)",
+                  [(f"teacher{i}", b"x", f"Teacher {i}", f"DEPT{i % 4}") for i in range(teachers)])
+    c.executemany("INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, ?, ?)",
+                  [(f"SUB{i:03d}", f"Subject {i}", 2 + i % 3, 1 + i % teachers) for i in range(subjects)])
+    c.executemany("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, ?, ?, ?, ?)",
+                  [(f"student{i}", b"x", f"R{i:06d}", f"Student {i}", str(2022 + i % 4)) for i in range(students)])
+    rows = []
+    for sid in range(1, students + 1):
+        for sem in range(1, semesters + 1):
+            for subj in rng.sample(range(1, subjects + 1), per_semester):
+                rows.append((sid, subj, sem, rng.randint(30, 100), "A", 9.0))
+    c.executemany("INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point) VALUES (?, ?, ?, ?, ?, ?)",
+                  rows)
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def traced_queries(conn, fn):
+    """Runs fn(conn) and returns the SELECT statements it executed, with parameters inlined."""
+    seen = []
+    conn.set_trace_callback(seen.append)
+    try:
+        # The page builders write audit events; keep them out of the check.
+        with mock.patch.object(service, "log_event"):
+            fn(conn)
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in seen if sql.lstrip().upper().startswith("SELECT")]
+
+
+def full_scans(conn, sql):
+    """Returns the plan steps of sql that scan a whole table."""
+    params = [1] * sql.count("?")
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        # FTS5 reports a MATCH lookup as "SCAN ... VIRTUAL TABLE INDEX n:M..."
+        indexed = "VIRTUAL TABLE INDEX" in detail and ":M" in detail
+        if detail.startswith("SCAN ") and "CONSTANT ROW" not in detail and not indexed:
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans(conn, modules=PORTAL_MODULES, base_dir=None):
+    """Returns (module, line, sql, scans) for each query whose plan contains a full scan."""
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    failures = []
+    for module in modules:
+        for line_no, sql in extract_queries(os.path.join(base_dir, module)):
+            first_line = sql.strip().splitlines()[0].strip()
+            if (module, first_line) in ALLOWED_FULL_SCANS:
+                continue
+            scans = full_scans(conn, sql)
+            if scans:
+                failures.append((module, line_no, sql, scans))
+    for label, fn in DYNAMIC_QUERIES:
+        if ("dynamic", label) in ALLOWED_FULL_SCANS:
+            continue
+        for sql in traced_queries(conn, fn):
+            scans = full_scans(conn, sql)
+            if scans:
+                failures.append(("dynamic", label, sql, scans))
+    return failures
+
+
+if __name__ == "__main__":
+    conn = seed_database(sqlite3.connect(":memory:"))
+    failures = check_query_plans(conn)
+    checked = sum(len(list(extract_queries(os.path.join(os.path.dirname(os.path.abspath(__file__)), m))))
+                  for m in PORTAL_MODULES) + len(DYNAMIC_QUERIES)
+    for module, line_no, sql, scans in failures:
+        print(f"❌ {module}:{line_no} full scan: {'; '.join(scans)}")
+        print("   " + " ".join(sql.split()))
+    print(f"{checked} queries checked, {len(failures)} full scans.")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+
+# ===============================
+# STUDENT RESULT CACHE
+# ===============================
+# Read-through LRU cache for the student result views. Keys are tuples that
+# start with the student id: (student_id, semester) for the result rows and
+# GPAs, (student_id, semester, "grid") for the rendered table.
+#
+# Entries are dropped when marks change:
+#   * writes made through this process call invalidate(), which also bumps a
+#     generation counter so a read that raced with the write is not cached;
+#   * writes made by other processes are noticed through PRAGMA data_version,
+#     which changes on a connection whenever another connection commits.
+
+RESULT_CACHE_SIZE = int(os.environ.get("RMS_RESULT_CACHE_SIZE", "4096"))
+# Connections whose data_version is tracked before the table is reset.
+MAX_TRACKED_CONNECTIONS = 64
+
+
+class ResultCache:
+    def __init__(self, max_entries=RESULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._by_student = {}
+        # id(conn) -> (conn, data_version). The connection is kept so its id
+        # cannot be reused by a different connection while it is tracked.
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_student.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_student[key[0]]
+
+    def _clear(self):
+        self._entries.clear()
+        self._by_student.clear()
+        self.generation += 1
+        self.invalidations += 1
+
+    def validate(self, conn):
+        """Clears the cache if another connection has committed since `conn` last looked."""
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with self._lock:
+            seen = self._versions.get(id(conn))
+            if seen is not None and seen[0] is conn and seen[1] == version:
+                return
+            # A connection we have not seen cannot tell us what it missed.
+            if len(self._versions) >= MAX_TRACKED_CONNECTIONS:
+                self._versions.clear()
+            self._versions[id(conn)] = (conn, version)
+            if self._entries:
+                self._clear()
+
+    def invalidate(self, student_id=None):
+        """Drops one student's entries, or everything when student_id is None."""
+        with self._lock:
+            if student_id is None:
+                self._clear()
+                return
+            self.generation += 1
+            self.invalidations += 1
+            for key in list(self._by_student.get(student_id, ())):
+                self._drop(key)
+
+    def get_or_build(self, conn, key, build):
+        """Returns the cached value for key, calling build() and caching its result on a miss."""
+        self.validate(conn)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self.generation
+        value = build()
+        with self._lock:
+            # Skip caching if marks changed while we were reading them.
+            if generation == self.generation and self.max_entries > 0:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                self._by_student.setdefault(key[0], set()).add(key)
+                while len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                    "invalidations": self.invalidations}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
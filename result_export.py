@@ -0,0 +1,159 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import time
+from gpa_aggregates import gpa_from_totals
+from storage import connect
+
+# ===============================
+# BULK RESULT EXPORT
+# ===============================
+# Streams every matching mark row, joined with its student and subject and the
+# stored SGPA/CGPA, straight from one cursor through a generator pipeline into
+# a CSV or JSONL file (gzip when the name ends in .gz). At most FETCH_ROWS rows
+# are in memory at a time, so a full dump uses the same memory for a thousand
+# rows as for ten million. The single SELECT reads one consistent snapshot even while teachers
+# keep writing (WAL).
+#     python result_export.py exports/results_2025_sem3.csv.gz --batch 2025 --semester 3
+
+FIELDS = ["roll_no", "username", "name", "batch", "semester", "subject_code", "subject_name", "credits",
+          "department", "marks", "grade", "grade_point", "sgpa", "cgpa"]
+FORMATS = ("csv", "jsonl")
+FETCH_ROWS = 5000
+GZIP_COMPRESSLEVEL = 6
+
+
+def iter_results(conn, batch=None, semester=None, department=None):
+    """Yields blocks (lists) of result tuples in FIELDS order, ordered by student, semester and subject.
+
+    department filters on the department of the subject's teacher. SGPA and
+    CGPA are the student's full values from the aggregate tables, whatever
+    the filters.
+    """
+    where = []
+    params = []
+    if batch:
+        where.append("st.batch = ?")
+        params.append(batch)
+    if semester is not None:
+        where.append("m.semester = ?")
+        params.append(semester)
+    if department:
+        where.append("t.department = ?")
+        params.append(department)
+    # CROSS JOIN pins the join order: driving from students in id order lets
+    # SQLite walk the indexes and only sort each student's own marks. Left to
+    # itself it may start from the department index and sort the whole result.
+    sql = """SELECT st.roll_no, st.username, st.name, st.batch, m.semester, subj.code, subj.name, subj.credits,
+                    t.department, m.marks, m.grade, m.grade_point,
+                    sg.total_credits, sg.total_points, g.total_credits, g.total_points
+             FROM students st
+             CROSS JOIN marks m ON m.student_id = st.id
+             CROSS JOIN subjects subj ON subj.id = m.subject_id
+             LEFT JOIN teachers t ON t.id = subj.teacher_id
+             LEFT JOIN student_semester_gpa sg ON sg.student_id = st.id AND sg.semester = m.semester
+             LEFT JOIN student_gpa g ON g.student_id = st.id"""
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY st.id, m.semester, subj.code"
+
+    c = conn.cursor()
+    c.execute(sql, params)
+    while True:
+        rows = c.fetchmany(FETCH_ROWS)
+        if not rows:
+            return
+        yield [(*row, gpa_from_totals(sem_cr or 0, sem_pts or 0), gpa_from_totals(cr or 0, pts or 0))
+               for *row, sem_cr, sem_pts, cr, pts in rows]
+
+
+def csv_blocks(blocks):
+    """Yields the CSV header and then one text block per block of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for block in blocks:
+        writer.writerows(block)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_blocks(blocks):
+    """Yields one text block per block of rows, one JSON object per line keyed by FIELDS."""
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    for block in blocks:
+        yield "".join([dumps(dict(zip(FIELDS, row))) + "\n" for row in block])
+
+
+def _counted(blocks, counter):
+    for block in blocks:
+        counter[0] += len(block)
+        yield block
+
+
+def format_for(path):
+    """Guesses the export format from the file name (csv unless it ends in .jsonl[.gz])."""
+    name = path[:-3] if path.endswith(".gz") else path
+    return "jsonl" if name.endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def export_results(conn, path, fmt=None, batch=None, semester=None, department=None):
+    """Streams the matching results into path and returns a summary with rows/sec.
+
+    The file is written under a temporary name and renamed when complete, so
+    a downstream job never picks up a half-written export.
+    """
+    fmt = fmt or format_for(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; use csv or jsonl.")
+    start = time.perf_counter()
+    counter = [0]
+    blocks = _counted(iter_results(conn, batch, semester, department), counter)
+    text = csv_blocks(blocks) if fmt == "csv" else jsonl_blocks(blocks)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    part_path = path + ".part"
+    try:
+        if path.endswith(".gz"):
+            f = gzip.open(part_path, "wt", encoding="utf-8", newline="", compresslevel=GZIP_COMPRESSLEVEL)
+        else:
+            f = open(part_path, "w", encoding="utf-8", newline="")
+        with f:
+            f.writelines(text)
+        os.replace(part_path, path)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    seconds = time.perf_counter() - start
+    return {"path": path, "format": fmt, "rows": counter[0], "bytes": os.path.getsize(path),
+            "seconds": seconds, "rows_per_sec": counter[0] / seconds if seconds else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export results with SGPA/CGPA to CSV or JSONL (gzip with .gz).")
+    parser.add_argument("path", help="output file, e.g. results.csv, results.jsonl.gz")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file name")
+    parser.add_argument("--batch")
+    parser.add_argument("--semester", type=int)
+    parser.add_argument("--department", help="only subjects taught by this department")
+    parser.add_argument("--db", default="userdetails.db")
+    args = parser.parse_args()
+
+    from utils import log_event
+    conn = connect(args.db)
+    try:
+        summary = export_results(conn, args.path, args.format, args.batch, args.semester, args.department)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        raise SystemExit(f"❌ Export failed: {e}")
+    finally:
+        conn.close()
+    log_event("SYSTEM", "admin", f"Exported {summary['rows']} result rows to {summary['path']}.")
+    print(f"✅ {summary['rows']} rows -> {summary['path']} ({summary['bytes'] // 1024} KB) "
+          f"in {summary['seconds']:.2f}s, {summary['rows_per_sec']:,.0f} rows/sec.")
@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import queue
+import secrets
+import sqlite3
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import service
+from instrumentation import get_metrics
+from marksheet_cache import get_marksheet_cache
+from migrations import migrate
+from result_cache import get_result_cache
+from service import ServiceError
+from storage import WriteQueue, connect
+
+# ===============================
+# LOCAL HTTP/JSON SERVER
+# ===============================
+# Exposes the service layer on localhost. Each request borrows its own
+# connection from a pool, so concurrent sessions do not share a cursor.
+# Mark and subject writes are handed to a single WriteQueue instead, which
+# commits the writes of concurrent requests together.
+# Authenticate with POST /login and send the returned token as
+# "Authorization: Bearer <token>".
+
+DB_NAME = "userdetails.db"
+
+
+class ConnectionPool:
+    """Hands out at most `size` SQLite connections, reusing idle ones."""
+
+    def __init__(self, db_path, size=8, timeout=30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ServiceError("Server busy, try again.", 503)
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SessionStore:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, session):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = session
+        return token
+
+    def get(self, token):
+        with self._lock:
+            return self._sessions.get(token)
+
+    def drop(self, token):
+        with self._lock:
+            return self._sessions.pop(token, None)
+
+
+def _records(rows, columns):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _int(params, key, default=None):
+    value = params.get(key, default)
+    if value is None or value == "":
+        if default is None:
+            raise ServiceError(f"Missing '{key}'.")
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(f"'{key}' must be an integer.")
+
+
+def _str(params, key):
+    value = params.get(key)
+    if not value:
+        raise ServiceError(f"Missing '{key}'.")
+    return str(value).strip()
+
+
+# ===============================
+# ROUTES
+# ===============================
+# Each handler takes (conn, session, params) and returns a JSON-able value.
+def register(conn, session, params):
+    new = service.register_user(conn, _str(params, "role"), _str(params, "username"), _str(params, "password"),
+                                roll_no=params.get("roll_no"), name=params.get("name"),
+                                batch=params.get("batch"), department=params.get("department"))
+    return {"user_id": new.user_id}
+
+
+def add_subject(conn, session, params):
+    service.add_subject(conn, session, _str(params, "code"), _str(params, "name"), _int(params, "credits"))
+    return {"ok": True}
+
+
+def subjects(conn, session, params):
+    return _records(service.teacher_subjects(conn, session), ["id", "code", "name", "credits"])
+
+
+def search_students(conn, session, params):
+    rows = service.search_students(conn, session, _str(params, "q"), _int(params, "limit", 10))
+    return _records(rows, ["id", "username", "roll_no", "name", "batch"])
+
+
+def _result_args(conn, params):
+    student_id = service.find_student(conn, _str(params, "username"))[0]
+    return student_id, _int(params, "subject_id"), _int(params, "semester")
+
+
+def enter_result(conn, session, params):
+    service.enter_result(conn, session, *_result_args(conn, params), _int(params, "marks"))
+    return {"ok": True}
+
+
+def update_result(conn, session, params):
+    service.update_result(conn, session, *_result_args(conn, params), _int(params, "marks"))
+    return {"ok": True}
+
+
+def delete_result(conn, session, params):
+    return {"deleted": service.delete_result(conn, session, *_result_args(conn, params))}
+
+
+def results(conn, session, params):
+    if session and session.role == "teacher":
+        rows = service.teacher_results(conn, session)
+        return _records(rows, ["username", "roll_no", "name", "subj_code", "subject", "sem", "marks", "grade"])
+    result = service.student_results(conn, session, _int(params, "semester"))
+    result["rows"] = _records(result["rows"], ["code", "subject", "credits", "marks", "grade"])
+    return result
+
+
+def gpa(conn, session, params):
+    if params.get("semester"):
+        return service.student_results(conn, session, _int(params, "semester"))
+    return {"cgpa": service.student_cgpa(conn, session)}
+
+
+def class_list(conn, session, params):
+    rows = service.class_list(conn, session, batch=params.get("batch"), department=params.get("department"),
+                              mine=params.get("mine") in ("1", "true", True), order=params.get("order"),
+                              top_k=_int(params, "top", 0) or None)
+    return _records(rows, ["student_id", "username", "roll_no", "name", "cgpa"])
+
+
+def cache_stats(conn, session, params):
+    return get_result_cache().stats()
+
+
+def marksheet_cache_stats(conn, session, params):
+    return get_marksheet_cache().stats()
+
+
+ROUTES = {
+    ("POST", "/register"): register,
+    ("POST", "/subjects"): add_subject,
+    ("GET", "/subjects"): subjects,
+    ("GET", "/students/search"): search_students,
+    ("POST", "/results"): enter_result,
+    ("PUT", "/results"): update_result,
+    ("DELETE", "/results"): delete_result,
+    ("GET", "/results"): results,
+    ("GET", "/gpa"): gpa,
+    ("GET", "/class-list"): class_list,
+    ("GET", "/stats/cache"): cache_stats,
+    ("GET", "/stats/marksheets"): marksheet_cache_stats,
+}
+
+# Routes run on the writer thread. /register stays on the pool: bcrypt hashing
+# would hold up every other queued write.
+WRITE_ROUTES = {add_subject, enter_result, update_result, delete_result}
+
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "ResultManagement/1.0"
+
+    def log_message(self, format, *args):
+        # Requests are already recorded in the audit log.
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if content_type == "application/json":
+            body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _params(self, url):
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        header = (self.headers.get("Content-Length") or "0").strip()
+        if not (header.isascii() and header.isdigit()):
+            raise ServiceError("Content-Length must be a non-negative integer.")
+        length = int(header)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                raise ServiceError("Request body must be JSON.")
+            if not isinstance(body, dict):
+                raise ServiceError("Request body must be a JSON object.")
+            params.update(body)
+        return params
+
+    def _token(self):
+        header = self.headers.get("Authorization", "")
+        return header[7:] if header.startswith("Bearer ") else None
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        app = self.server
+        try:
+            params = self._params(url)
+            session = app.sessions.get(self._token())
+            with app.pool.connection() as conn:
+                if method == "POST" and url.path == "/login":
+                    new = service.login(conn, _str(params, "role"), _str(params, "username"), _str(params, "password"))
+                    return self._send(200, {"token": app.sessions.create(new), "user_id": new.user_id})
+                if method == "POST" and url.path == "/logout":
+                    if session:
+                        app.sessions.drop(self._token())
+                        service.logout(session)
+                    return self._send(200, {"ok": True})
+                if method == "GET" and url.path == "/metrics":
+                    return self._send(200, get_metrics().to_prometheus().encode(), "text/plain; version=0.0.4")
+                if method == "GET" and url.path == "/marksheet":
+                    return self._marksheet(conn, session, params)
+                route = ROUTES.get((method, url.path))
+                if route is None:
+                    return self._send(404, {"error": "Not found."})
+                if route in WRITE_ROUTES:
+                    return self._send(200, app.writes.run(route, session, params))
+                return self._send(200, route(conn, session, params))
+        except ServiceError as e:
+            self._send(e.status, {"error": e.message})
+        except sqlite3.Error as e:
+            self._send(500, {"error": f"Database error: {e}"})
+        except Exception:
+            print(f"Unhandled error in {method} {url.path}:", file=sys.stderr)
+            traceback.print_exc()
+            self._send(500, {"error": "Internal server error."})
+
+    def _marksheet(self, conn, session, params):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = service.marksheet(conn, session, _int(params, "semester"), output_dir=tmp)
+            with open(path, "rb") as f:
+                body = f.read()
+        self._send(200, body, "application/pdf")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def make_server(host="127.0.0.1", port=8000, db_path=DB_NAME, pool_size=8):
+    """Builds (but does not start) a threaded server bound to host:port."""
+    conn = connect(db_path)
+    migrate(conn)
+    conn.close()
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    httpd.pool = ConnectionPool(db_path, size=pool_size)
+    httpd.writes = WriteQueue(db_path)
+    httpd.sessions = SessionStore()
+    return httpd
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the result management API on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default=DB_NAME)
+    parser.add_argument("--pool-size", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    httpd = make_server(args.host, args.port, args.db, args.pool_size)
+    print(f"Serving on http://{args.host}:{httpd.server_address[1]} (Ctrl+C to stop)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.writes.close()
+        httpd.pool.close()
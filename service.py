@@ -0,0 +1,529 @@
+import os
+import re
+import sqlite3
+from collections import namedtuple
+from gpa_aggregates import read_sgpa, read_cgpa
+from grading import (DEFAULT, RELATIVE_MIN_PASS, clear_relative_grading, grade_for_student, recurve,
+                     set_relative_grading)
+from instrumentation import timed
+from marksheet_cache import get_marksheet_cache
+from pager import PAGE_SIZE, keyset_page
+from publish import get_published_results
+from result_cache import get_result_cache
+from storage import transaction
+from student_search import search_students as _search_students
+from utils import log_event
+
+# ===============================
+# SERVICE LAYER
+# ===============================
+# Non-interactive core operations shared by the console portals and the
+# HTTP server. Every function takes an open connection; operations performed
+# on behalf of a user also take their Session. Failures raise ServiceError
+# with a user-facing message and an HTTP-style status code.
+
+Session = namedtuple("Session", "user_id username role")
+
+TABLES = {"student": "students", "teacher": "teachers"}
+
+
+class ServiceError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _table(role):
+    if role not in TABLES:
+        raise ServiceError("Invalid role.")
+    return TABLES[role]
+
+
+def _auth():
+    # bcrypt is loaded on the first password operation rather than at startup.
+    from auth import get_auth_service
+    return get_auth_service()
+
+
+def _require(session, role):
+    if session is None or session.role != role:
+        raise ServiceError(f"Only a logged-in {role} can do this.", 403)
+
+
+# ===============================
+# GRADES & GPA
+# ===============================
+def calculate_grade(marks):
+    """Grades marks with the default scheme; see grading.py for per-batch schemes."""
+    return DEFAULT.grade(marks)
+
+
+def compute_cgpa_for_student(conn, student_id):
+    return read_cgpa(conn, student_id)
+
+
+def fetch_class_list(conn, batch=None, department=None, teacher_id=None, order=None, top_k=None):
+    """Lists every matching student's CGPA in one query over the student_gpa aggregates.
+
+    Filters: batch, department (of a teacher whose subject the student took),
+    teacher_id (only students with marks in that teacher's subjects).
+    order is "asc", "desc" or None; top_k limits the number of rows returned.
+    """
+    where = []
+    params = []
+    if batch:
+        where.append("st.batch = ?")
+        params.append(batch)
+    # IN (subquery) rather than a correlated EXISTS: SQLite builds the id list
+    # from the teacher/department indexes instead of probing every student.
+    if department:
+        where.append("""st.id IN (SELECT m2.student_id FROM marks m2
+                                  JOIN subjects s2 ON m2.subject_id = s2.id
+                                  JOIN teachers t ON s2.teacher_id = t.id
+                                  WHERE t.department = ?)""")
+        params.append(department)
+    if teacher_id is not None:
+        where.append("""st.id IN (SELECT m2.student_id FROM marks m2
+                                  JOIN subjects s2 ON m2.subject_id = s2.id
+                                  WHERE s2.teacher_id = ?)""")
+        params.append(teacher_id)
+
+    sql = """SELECT st.id, st.username, st.roll_no, st.name,
+                    COALESCE(g.total_points * 1.0 / NULLIF(g.total_credits, 0), 0) AS cgpa
+             FROM students st
+             LEFT JOIN student_gpa g ON g.student_id = st.id"""
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order == "desc":
+        sql += " ORDER BY cgpa DESC, st.id"
+    elif order == "asc":
+        sql += " ORDER BY cgpa ASC, st.id"
+    else:
+        sql += " ORDER BY st.id"
+    if top_k:
+        sql += " LIMIT ?"
+        params.append(int(top_k))
+
+    c = conn.cursor()
+    c.execute(sql, params)
+    return [(sid, uname, roll_no, sname, round(cgpa, 2)) for sid, uname, roll_no, sname, cgpa in c]
+
+
+def calculate_sgpa(conn, student_id, semester):
+    return read_sgpa(conn, student_id, semester)
+
+
+def calculate_cgpa(conn, student_id):
+    return read_cgpa(conn, student_id)
+
+
+# Part of every marksheet cache key: bump it whenever render_marksheet draws
+# something differently, so PDFs cached with the old layout are not reused.
+MARKSHEET_TEMPLATE_VERSION = 1
+
+
+@timed
+def render_marksheet(filename, info, semester, rows, sgpa, cgpa):
+    """Draws one marksheet PDF; info is (roll_no, name, batch) and rows are (code, name, credits, marks, grade)."""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    roll_no, name, batch = info
+    pdf = canvas.Canvas(filename, pagesize=letter)
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(180, 750, "VIT Vellore - Marksheet")
+    pdf.setFont("Helvetica", 11)
+    pdf.drawString(50, 720, f"Name: {name}")
+    pdf.drawString(300, 720, f"Roll No: {roll_no}")
+    pdf.drawString(50, 700, f"Batch: {batch}")
+    pdf.drawString(300, 700, f"Semester: {semester}")
+    y = 670
+    pdf.setFont("Helvetica-Bold", 10)
+    pdf.drawString(50, y, "Code")
+    pdf.drawString(120, y, "Subject")
+    pdf.drawString(320, y, "Credits")
+    pdf.drawString(380, y, "Marks")
+    pdf.drawString(430, y, "Grade")
+    pdf.setFont("Helvetica", 10)
+    for r in rows:
+        y -= 18
+        pdf.drawString(50, y, str(r[0]))
+        pdf.drawString(120, y, str(r[1])[:40])
+        pdf.drawString(320, y, str(r[2]))
+        pdf.drawString(380, y, str(r[3]))
+        pdf.drawString(430, y, str(r[4]))
+        if y < 80:
+            pdf.showPage()
+            y = 750
+    y -= 30
+    pdf.setFont("Helvetica-Bold", 11)
+    pdf.drawString(50, y, f"SGPA: {sgpa}")
+    pdf.drawString(200, y, f"CGPA: {cgpa}")
+    pdf.save()
+
+
+# ===============================
+# ACCOUNTS
+# ===============================
+def check_password_strength(password):
+    errors = []
+    if len(password) < 8:
+        errors.append("Password must be at least 8 characters long.")
+    if not re.search(r"[A-Z]", password):
+        errors.append("Password must contain at least one uppercase letter.")
+    if not re.search(r"[a-z]", password):
+        errors.append("Password must contain at least one lowercase letter.")
+    if not re.search(r"[0-9]", password):
+        errors.append("Password must contain at least one number.")
+    if not re.search(r"[@$!%*?&]", password):
+        errors.append("Password must contain at least one special character (@$!%*?&).")
+    return errors
+
+
+def user_exists(conn, role, username):
+    c = conn.cursor()
+    c.execute(f"SELECT id FROM {_table(role)} WHERE username = ?", (username,))
+    return c.fetchone() is not None
+
+
+@timed
+def register_user(conn, role, username, password, roll_no=None, name=None, batch=None, department=None):
+    table = _table(role)
+    errors = check_password_strength(password)
+    if errors:
+        raise ServiceError("Weak password: " + " ".join(errors))
+    hashedpass = _auth().hash_password(password)
+    c = conn.cursor()
+    try:
+        if role == "student":
+            c.execute("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, ?, ?, ?, ?)",
+                      (username, hashedpass, roll_no, name, batch))
+        else:
+            c.execute("INSERT INTO teachers (username, password, name, department) VALUES (?, ?, ?, ?)",
+                      (username, hashedpass, name, department))
+        conn.commit()
+    except sqlite3.IntegrityError:
+        conn.rollback()
+        raise ServiceError("Username or roll number already exists.", 409)
+    log_event(username, role, "Registered new account.")
+    return Session(c.lastrowid, username, role)
+
+
+@timed
+def login(conn, role, username, password):
+    user_id = _auth().authenticate(conn, _table(role), username, password)
+    if user_id is None:
+        log_event(username, role, "Failed login attempt.", sync=True)
+        raise ServiceError("Invalid username or password.", 401)
+    log_event(username, role, "Logged in.")
+    return Session(user_id, username, role)
+
+
+def logout(session):
+    log_event(session.username, session.role, "Logged out.")
+
+
+@timed
+def reset_password(conn, role, username, new_password):
+    table = _table(role)
+    if not user_exists(conn, role, username):
+        raise ServiceError("Username not found.", 404)
+    errors = check_password_strength(new_password)
+    if errors:
+        raise ServiceError("Weak password: " + " ".join(errors))
+    hashedpass = _auth().hash_password(new_password)
+    conn.execute(f"UPDATE {table} SET password=? WHERE username=?", (hashedpass, username))
+    conn.commit()
+    log_event(username, role, "Password reset.", sync=True)
+
+
+# ===============================
+# TEACHER OPERATIONS
+# ===============================
+@timed
+def add_subject(conn, session, code, name, credits):
+    _require(session, "teacher")
+    try:
+        conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, ?, ?)",
+                     (code, name, credits, session.user_id))
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        log_event(session.username, "teacher", f"Failed to add subject '{name}': {e}")
+        raise ServiceError(str(e), 409)
+    log_event(session.username, "teacher", f"Added subject '{name}' (code={code}, credits={credits}).")
+
+
+def teacher_subjects(conn, session):
+    _require(session, "teacher")
+    c = conn.cursor()
+    c.execute("SELECT id, code, name, credits FROM subjects WHERE teacher_id=?", (session.user_id,))
+    return c.fetchall()
+
+
+@timed
+def search_students(conn, session, text, limit=10):
+    """Returns up to `limit` (id, username, roll_no, name, batch) rows matching text (see student_search)."""
+    _require(session, "teacher")
+    return _search_students(conn, text, limit)
+
+
+def _roll_range(conditions, params, roll_from, roll_to):
+    if roll_from:
+        conditions.append("s.roll_no >= ?")
+        params.append(roll_from)
+    if roll_to:
+        conditions.append("s.roll_no <= ?")
+        params.append(roll_to)
+
+
+def students_page(conn, roll_from=None, roll_to=None, after=None, before=None, page_size=PAGE_SIZE):
+    """One pager.Page of (id, username, roll_no, name) ordered by username, optionally within a roll-number range."""
+    conditions, params = [], []
+    _roll_range(conditions, params, roll_from, roll_to)
+    return keyset_page(conn, "SELECT s.id, s.username, s.roll_no, s.name FROM students s", conditions, params,
+                       [("s.username", 1)], after=after, before=before, page_size=page_size)
+
+
+def find_student(conn, username):
+    """Returns (id, name) for a student username or raises ServiceError."""
+    c = conn.cursor()
+    c.execute("SELECT id, name FROM students WHERE username=?", (username,))
+    student = c.fetchone()
+    if not student:
+        raise ServiceError("Student not found.", 404)
+    return student
+
+
+def _check_subject(conn, session, subject_id):
+    c = conn.cursor()
+    c.execute("SELECT id FROM subjects WHERE id=? AND teacher_id=?", (subject_id, session.user_id))
+    if not c.fetchone():
+        raise ServiceError("Subject not found among your subjects.", 404)
+
+
+def result_exists(conn, student_id, subject_id, semester):
+    c = conn.cursor()
+    c.execute("SELECT id FROM marks WHERE student_id=? AND subject_id=? AND semester=?",
+              (student_id, subject_id, semester))
+    return c.fetchone() is not None
+
+
+def _check_marks(marks):
+    if not 0 <= marks <= 100:
+        raise ServiceError("Marks must be between 0 and 100.")
+
+
+@timed
+def enter_result(conn, session, student_id, subject_id, semester, marks):
+    _require(session, "teacher")
+    _check_subject(conn, session, subject_id)
+    _check_marks(marks)
+    if result_exists(conn, student_id, subject_id, semester):
+        raise ServiceError("Marks already entered. Use update option instead.", 409)
+    grade, gp = grade_for_student(conn, student_id, marks)
+    # The mark and the re-curve of its offering commit together.
+    with transaction(conn):
+        conn.execute(
+            "INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point) VALUES (?, ?, ?, ?, ?, ?)",
+            (student_id, subject_id, semester, marks, grade, gp)
+        )
+        recurve(conn, subject_id, semester)
+    get_result_cache().invalidate(student_id)
+    get_marksheet_cache().invalidate(student_id, semester)
+    log_event(session.username, "teacher", f"Entered marks for student_id={student_id}, subject_id={subject_id}, sem={semester}, marks={marks}.")
+
+
+@timed
+def update_result(conn, session, student_id, subject_id, semester, marks):
+    _require(session, "teacher")
+    _check_subject(conn, session, subject_id)
+    _check_marks(marks)
+    if not result_exists(conn, student_id, subject_id, semester):
+        raise ServiceError("No existing result. Use Add Result option.", 404)
+    grade, gp = grade_for_student(conn, student_id, marks)
+    with transaction(conn):
+        conn.execute("UPDATE marks SET marks=?, grade=?, grade_point=? WHERE student_id=? AND subject_id=? AND semester=?",
+                     (marks, grade, gp, student_id, subject_id, semester))
+        recurve(conn, subject_id, semester)
+    get_result_cache().invalidate(student_id)
+    get_marksheet_cache().invalidate(student_id, semester)
+    log_event(session.username, "teacher", f"Updated marks for student_id={student_id}, subject_id={subject_id}, sem={semester}, new_marks={marks}.")
+
+
+@timed
+def delete_result(conn, session, student_id, subject_id, semester):
+    """Deletes one result and returns the number of rows removed."""
+    _require(session, "teacher")
+    _check_subject(conn, session, subject_id)
+    with transaction(conn):
+        cur = conn.execute("DELETE FROM marks WHERE student_id=? AND subject_id=? AND semester=?",
+                           (student_id, subject_id, semester))
+        recurve(conn, subject_id, semester)
+    get_result_cache().invalidate(student_id)
+    get_marksheet_cache().invalidate(student_id, semester)
+    log_event(session.username, "teacher", f"Deleted marks for student_id={student_id}, subject_id={subject_id}, sem={semester}.", sync=True)
+    return cur.rowcount
+
+
+@timed
+def teacher_results(conn, session):
+    _require(session, "teacher")
+    c = conn.cursor()
+    c.execute("""SELECT s.username, s.roll_no, s.name, subj.code, subj.name, m.semester, m.marks, m.grade
+                 FROM marks m
+                 JOIN students s ON m.student_id = s.id
+                 JOIN subjects subj ON m.subject_id = subj.id
+                 WHERE subj.teacher_id=?
+                 ORDER BY s.username, m.semester""", (session.user_id,))
+    rows = c.fetchall()
+    if rows:
+        log_event(session.username, "teacher", "Viewed all results list.")
+    return rows
+
+
+@timed
+def teacher_results_page(conn, session, semester=None, subject_code=None, roll_from=None, roll_to=None,
+                         after=None, before=None, page_size=PAGE_SIZE):
+    """One pager.Page of the teacher's results, filtered in SQL and ordered by (username, semester, subject code)."""
+    _require(session, "teacher")
+    conditions, params = ["subj.teacher_id = ?"], [session.user_id]
+    if semester is not None:
+        conditions.append("m.semester = ?")
+        params.append(semester)
+    if subject_code:
+        conditions.append("subj.code = ?")
+        params.append(subject_code)
+    _roll_range(conditions, params, roll_from, roll_to)
+    page = keyset_page(conn, """SELECT s.username, s.roll_no, s.name, subj.code, subj.name, m.semester, m.marks, m.grade
+                                FROM marks m
+                                JOIN students s ON m.student_id = s.id
+                                JOIN subjects subj ON m.subject_id = subj.id""",
+                       conditions, params, [("s.username", 0), ("m.semester", 5), ("subj.code", 3)],
+                       after=after, before=before, page_size=page_size)
+    if page.rows and after is None and before is None:
+        log_event(session.username, "teacher", "Viewed all results list.")
+    return page
+
+
+@timed
+def class_list(conn, session, batch=None, department=None, mine=False, order=None, top_k=None):
+    _require(session, "teacher")
+    rows = fetch_class_list(conn, batch=batch, department=department,
+                            teacher_id=session.user_id if mine else None,
+                            order=order if order in ("asc", "desc") else None, top_k=top_k)
+    if rows:
+        log_event(session.username, "teacher", "Viewed class list with CGPA.")
+    return rows
+
+
+@timed
+def relative_grading(conn, session, subject_id, semester, method, min_pass=RELATIVE_MIN_PASS):
+    """Curves one of the teacher's subject offerings ("zscore"/"percentile"), or
+    returns it to absolute grading with method "absolute". Returns the summary."""
+    _require(session, "teacher")
+    _check_subject(conn, session, subject_id)
+    try:
+        if method == "absolute":
+            summary = clear_relative_grading(conn, subject_id, semester)
+        else:
+            summary = set_relative_grading(conn, subject_id, semester, method, min_pass)
+    except ValueError as e:
+        raise ServiceError(str(e))
+    log_event(session.username, "teacher", f"Set {method} grading for subject_id={subject_id}, sem={semester}: "
+                                           f"{summary['changed']} rows changed.")
+    return summary
+
+
+@timed
+def cohort_analytics(conn, session, batch=None, semester=None, mine=False):
+    """Returns analytics.cohort_report for the cohort; mine limits it to the teacher's subjects."""
+    _require(session, "teacher")
+    # NumPy is only loaded when analytics are requested.
+    from analytics import cohort_report
+    report = cohort_report(conn, batch=batch, semester=semester, teacher_id=session.user_id if mine else None)
+    if report["students"]:
+        log_event(session.username, "teacher", f"Viewed cohort analytics (batch={batch}, semester={semester}, mine={mine}).")
+    return report
+
+
+# ===============================
+# STUDENT OPERATIONS
+# ===============================
+def _load_student_results(conn, student_id, semester):
+    c = conn.cursor()
+    c.execute("""
+        SELECT subj.code, subj.name, subj.credits, m.marks, m.grade
+        FROM marks m
+        JOIN subjects subj ON m.subject_id = subj.id
+        WHERE m.student_id=? AND m.semester=?
+    """, (student_id, semester))
+    rows = c.fetchall()
+    if not rows:
+        return {"rows": [], "sgpa": 0.0, "cgpa": 0.0}
+    return {"rows": rows,
+            "sgpa": calculate_sgpa(conn, student_id, semester),
+            "cgpa": calculate_cgpa(conn, student_id)}
+
+
+def _semester_view(conn, student_id, semester):
+    """The student's semester results: the published snapshot when it covers this semester for the
+    student's batch, else the live tables."""
+    published = get_published_results().semester_results(student_id, semester)
+    if published is not None:
+        return published
+    return get_result_cache().get_or_build(conn, (student_id, semester),
+                                           lambda: _load_student_results(conn, student_id, semester))
+
+
+@timed
+def student_results(conn, session, semester):
+    """Returns {"rows", "sgpa", "cgpa"} for one semester; rows is empty when nothing is recorded.
+
+    Once results are published, reads come from the published snapshot (and
+    carry its file name under "published"); before that they are served from
+    the result cache when the student's marks have not changed.
+    """
+    _require(session, "student")
+    result = _semester_view(conn, session.user_id, semester)
+    if result["rows"]:
+        log_event(session.username, "student", f"Viewed results for semester {semester}.")
+    return dict(result)
+
+
+@timed
+def student_cgpa(conn, session):
+    _require(session, "student")
+    cgpa = get_published_results().cgpa(session.user_id)
+    if cgpa is None:
+        cgpa = calculate_cgpa(conn, session.user_id)
+    log_event(session.username, "student", "Viewed consolidated CGPA.")
+    return cgpa
+
+
+@timed
+def marksheet(conn, session, semester, output_dir=None):
+    """Writes the student's marksheet PDF for a semester and returns its path.
+
+    The PDF is copied from the marksheet cache when nothing it shows has
+    changed since it was last rendered.
+    """
+    _require(session, "student")
+    c = conn.cursor()
+    c.execute("SELECT roll_no, name, batch FROM students WHERE id=?", (session.user_id,))
+    info = c.fetchone()
+    if not info:
+        raise ServiceError("Student info missing.", 404)
+    result = _semester_view(conn, session.user_id, semester)
+    rows = result["rows"]
+    sgpa = result["sgpa"]
+    cgpa = result["cgpa"] if rows or "published" in result else calculate_cgpa(conn, session.user_id)
+    filename = f"{session.username}_sem{semester}_marksheet.pdf"
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        filename = os.path.join(output_dir, filename)
+    inputs = (MARKSHEET_TEMPLATE_VERSION, info, semester, rows, sgpa, cgpa)
+    get_marksheet_cache().fetch(session.user_id, semester, inputs, filename,
+                                lambda path: render_marksheet(path, info, semester, rows, sgpa, cgpa))
+    log_event(session.username, "student", f"Downloaded marksheet PDF for semester {semester}.")
+    return filename
@@ -0,0 +1,272 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from instrumentation import ENABLED, InstrumentedConnection, connect as _connect
+
+# ===============================
+# STORAGE LAYER
+# ===============================
+# connect() opens the database in WAL mode with tuned pragmas, so readers never
+# block the writer and a writer waits (up to BUSY_TIMEOUT_MS) instead of failing
+# with "database is locked" when another process or thread holds the lock.
+# ThreadLocalPool keeps one such connection per thread. WriteQueue funnels
+# writes through a single writer thread that groups the jobs queued at the same
+# time into one transaction (group commit), one SAVEPOINT per job.
+
+DB_NAME = "userdetails.db"
+BUSY_TIMEOUT_MS = int(os.environ.get("RMS_BUSY_TIMEOUT_MS", "10000"))
+# NORMAL is durable against application crashes in WAL mode; use FULL to also survive power loss.
+SYNCHRONOUS = os.environ.get("RMS_SYNCHRONOUS", "NORMAL").upper()
+CACHE_SIZE_KB = int(os.environ.get("RMS_CACHE_SIZE_KB", "32768"))
+MMAP_SIZE = int(os.environ.get("RMS_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Most jobs grouped into one transaction, and how long the writer waits for more.
+# With 0 a batch is whatever queued up while the previous batch was committing.
+WRITE_BATCH = int(os.environ.get("RMS_WRITE_BATCH", "64"))
+WRITE_WAIT_MS = float(os.environ.get("RMS_WRITE_WAIT_MS", "0"))
+
+
+def tune(conn):
+    """Switches conn to WAL and applies the connection pragmas; returns conn."""
+    if SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        raise ValueError(f"RMS_SYNCHRONOUS must be OFF, NORMAL, FULL or EXTRA, not {SYNCHRONOUS}.")
+    # journal_mode is stored in the database file; the others are per connection.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size={-int(CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def connect(db_path=DB_NAME, **kwargs):
+    """Opens a tuned, instrumented WAL connection."""
+    kwargs.setdefault("timeout", BUSY_TIMEOUT_MS / 1000)
+    return tune(_connect(db_path, **kwargs))
+
+
+def pragmas(conn):
+    """Returns the effective storage pragmas of conn, for diagnostics."""
+    return {name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+            for name in ("journal_mode", "busy_timeout", "synchronous", "cache_size", "mmap_size")}
+
+
+# ===============================
+# PER-THREAD POOL
+# ===============================
+class ThreadLocalPool:
+    """Gives each thread its own connection, opened on first use and reused after."""
+
+    def __init__(self, db_path=DB_NAME):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.db_path)
+            with self._lock:
+                # Forget connections of threads that have exited; they close with their thread.
+                for ident in [i for i, (thread, _) in self._open.items() if not thread.is_alive()]:
+                    del self._open[ident]
+                self._open[threading.get_ident()] = (threading.current_thread(), conn)
+        return conn
+
+    def close(self):
+        """Closes the calling thread's connection and drops the others."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+        with self._lock:
+            self._open.clear()
+
+
+# ===============================
+# WRITE QUEUE (GROUP COMMIT)
+# ===============================
+_ConnectionBase = InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+class WriterConnection(_ConnectionBase):
+    """The writer thread's connection: a job cannot end the batch's transaction.
+
+    Service functions call conn.commit() after each write and conn.rollback()
+    when a write fails. Inside a batch commit() only marks the job done (the
+    writer commits the whole batch at once) and rollback() undoes the current
+    job's SAVEPOINT, leaving the jobs before it intact. "with conn:" behaves
+    the same way.
+    """
+
+    batching = False
+
+    def commit(self):
+        if not self.batching:
+            super().commit()
+
+    def rollback(self):
+        if not self.batching:
+            super().rollback()
+        elif self.in_transaction:
+            self.execute("ROLLBACK TO job")
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.batching:
+            return super().__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            self.rollback()
+        return False
+
+
+@contextmanager
+def transaction(conn):
+    """Use instead of "with conn:" in code that may run as a WriteQueue job.
+
+    Outside a batch it is exactly "with conn:". Inside one it runs the block
+    in a nested SAVEPOINT and leaves the commit to the batch.
+    """
+    if not getattr(conn, "batching", False):
+        with conn:
+            yield conn
+        return
+    conn.execute("SAVEPOINT tx")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK TO tx")
+        conn.execute("RELEASE tx")
+        raise
+    conn.execute("RELEASE tx")
+
+
+class WriteQueue:
+    """Runs write jobs fn(conn, *args) one at a time on a dedicated writer thread.
+
+    Jobs that arrive while a batch is forming (up to batch jobs, waiting at
+    most wait_ms for more) share one BEGIN IMMEDIATE ... COMMIT. Each job runs
+    in its own SAVEPOINT, so a job that raises is rolled back alone and its
+    exception is re-raised to the caller; the others still commit.
+    """
+
+    def __init__(self, db_path=DB_NAME, batch=WRITE_BATCH, wait_ms=WRITE_WAIT_MS):
+        self.db_path = db_path
+        self.batch = max(1, batch)
+        self.wait = wait_ms / 1000
+        self.jobs = 0
+        self.batches = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._started = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="rms-writer", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, fn, *args, **kwargs):
+        """Queues fn(conn, *args, **kwargs) and returns a Future for its result."""
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Queues fn and waits until the batch containing it has committed."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self):
+        return {"jobs": self.jobs, "batches": self.batches, "failed": self.failed,
+                "jobs_per_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+                "queued": self._queue.qsize()}
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            conn = connect(self.db_path, factory=WriterConnection, check_same_thread=False)
+        except (sqlite3.Error, ValueError) as e:
+            self._error = e
+            self._started.set()
+            return
+        self._started.set()
+        stopping = False
+        try:
+            while not stopping:
+                first = self._queue.get()
+                if first is None:
+                    break
+                batch = [first]
+                deadline = time.monotonic() + self.wait
+                while len(batch) < self.batch:
+                    try:
+                        job = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        stopping = True
+                        break
+                    batch.append(job)
+                self._run_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _run_batch(self, conn, batch):
+        outcomes = []
+        conn.batching = True
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for future, fn, args, kwargs in batch:
+                if not future.set_running_or_notify_cancel():
+                    outcomes.append(None)
+                    continue
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((True, fn(conn, *args, **kwargs)))
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    outcomes.append((False, e))
+                conn.execute("RELEASE job")
+            conn.batching = False
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.batching = False
+            if conn.in_transaction:
+                conn.rollback()
+            # The batch was rolled back, so every job in it fails.
+            outcomes = [None if outcome is None else (False, e) for outcome in outcomes]
+            outcomes += [(False, e)] * (len(batch) - len(outcomes))
+        finally:
+            conn.batching = False
+
+        self.batches += 1
+        for (future, _, _, _), outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            self.jobs += 1
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                self.failed += 1
+                future.set_exception(value)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_write_queue(db_path=DB_NAME):
+    """Returns the process-wide WriteQueue for db_path, starting it on first use."""
+    with _writers_lock:
+        writer = _writers.get(db_path)
+        if writer is None:
+            writer = _writers[db_path] = WriteQueue(db_path)
+        return writer
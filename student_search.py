@@ -0,0 +1,167 @@
+import sqlite3
+import sys
+from difflib import SequenceMatcher
+
+# ===============================
+# STUDENT SEARCH INDEX
+# ===============================
+# student_search is an FTS5 trigram index over students(username, roll_no,
+# name). The triggers below keep it in step with registrations, renames and
+# deletions, so lookups never have to read the whole students table.
+SEARCH_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS student_search USING fts5(
+        username, roll_no, name,
+        content='students', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS student_search_insert AFTER INSERT ON students
+    BEGIN
+        INSERT INTO student_search (rowid, username, roll_no, name)
+        VALUES (NEW.id, NEW.username, NEW.roll_no, NEW.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS student_search_delete AFTER DELETE ON students
+    BEGIN
+        INSERT INTO student_search (student_search, rowid, username, roll_no, name)
+        VALUES ('delete', OLD.id, OLD.username, OLD.roll_no, OLD.name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS student_search_update AFTER UPDATE OF username, roll_no, name ON students
+    BEGIN
+        INSERT INTO student_search (student_search, rowid, username, roll_no, name)
+        VALUES ('delete', OLD.id, OLD.username, OLD.roll_no, OLD.name);
+        INSERT INTO student_search (rowid, username, roll_no, name)
+        VALUES (NEW.id, NEW.username, NEW.roll_no, NEW.name);
+    END""",
+]
+
+SEARCH_LIMIT = 10
+# Index hits considered before ranking; keeps ranking cost flat on big tables.
+CANDIDATES = 200
+# Minimum similarity (0-1) for a fuzzy match to be shown.
+FUZZY_THRESHOLD = 0.6
+
+
+def ensure_student_search(conn):
+    """Creates the search index and its triggers, filling it on first creation."""
+    c = conn.cursor()
+    c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='student_search'")
+    existed = c.fetchone() is not None
+    for statement in SEARCH_SCHEMA:
+        conn.execute(statement)
+    if not existed:
+        _fill_student_search(conn)
+
+
+def _fill_student_search(conn):
+    conn.execute("INSERT INTO student_search (student_search) VALUES ('rebuild')")
+
+
+def rebuild_student_search(conn):
+    with conn:
+        _fill_student_search(conn)
+
+
+def _quote(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _prefix_matches(conn, text, limit):
+    # Username and roll-number prefixes come straight from their COLLATE
+    # NOCASE indexes (so "cs2025" finds "CS2025001"); this also covers input
+    # shorter than one trigram.
+    lower = text.lower()
+    upper = lower + "\U0010ffff"
+    c = conn.cursor()
+    c.execute("""SELECT id, username, roll_no, name, batch FROM students
+                 WHERE username COLLATE NOCASE >= ? AND username COLLATE NOCASE < ?
+                 ORDER BY username COLLATE NOCASE LIMIT ?""", (lower, upper, limit))
+    rows = c.fetchall()
+    c.execute("""SELECT id, username, roll_no, name, batch FROM students
+                 WHERE roll_no COLLATE NOCASE >= ? AND roll_no COLLATE NOCASE < ?
+                 ORDER BY roll_no COLLATE NOCASE LIMIT ?""", (lower, upper, limit))
+    return rows + c.fetchall()
+
+
+def _substring_matches(conn, text, limit):
+    # Rows come back in rowid order so the scan stops after `limit` hits;
+    # _rank orders them afterwards.
+    c = conn.cursor()
+    c.execute("""SELECT s.id, s.username, s.roll_no, s.name, s.batch
+                 FROM student_search
+                 JOIN students s ON s.id = student_search.rowid
+                 WHERE student_search MATCH ?
+                 LIMIT ?""", (_quote(text), limit))
+    return c.fetchall()
+
+
+def _fuzzy_matches(conn, text, limit):
+    # Any shared trigram is a candidate; bm25 puts rows sharing the most first.
+    grams = sorted({text[i:i + 3] for i in range(len(text) - 2)})
+    c = conn.cursor()
+    c.execute("""SELECT s.id, s.username, s.roll_no, s.name, s.batch
+                 FROM student_search
+                 JOIN students s ON s.id = student_search.rowid
+                 WHERE student_search MATCH ?
+                 ORDER BY rank LIMIT ?""", (" OR ".join(_quote(g) for g in grams), limit))
+    return [row for row in c.fetchall() if _similarity(row, text) >= FUZZY_THRESHOLD]
+
+
+def _fields(row):
+    username, roll_no, name = (str(v or "").lower() for v in row[1:4])
+    return [username, roll_no, name] + name.split()
+
+
+def _similarity(row, text):
+    return max((SequenceMatcher(None, text, field).ratio() for field in _fields(row) if field), default=0.0)
+
+
+def _rank(row, text):
+    fields = _fields(row)
+    if text in fields[:2]:
+        return (0, 0.0, row[1])
+    if any(f.startswith(text) for f in fields):
+        return (1, 0.0, row[1])
+    if any(text in f for f in fields[:3]):
+        return (2, 0.0, row[1])
+    return (3, -_similarity(row, text), row[1])
+
+
+def search_students(conn, text, limit=SEARCH_LIMIT):
+    """Returns up to `limit` (id, username, roll_no, name, batch) rows best matching text.
+
+    Exact username/roll matches come first, then prefix and substring matches
+    on username, roll number or name. When nothing matches literally, rows
+    sharing trigrams with the query are ranked by similarity instead (so
+    "Sherma" still finds "Sharma").
+    """
+    text = text.strip()
+    if not text:
+        return []
+    lowered = text.lower()
+    candidates = _prefix_matches(conn, text, limit)
+    if len(text) >= 3:
+        candidates += _substring_matches(conn, text, CANDIDATES)
+        if not candidates:
+            candidates = _fuzzy_matches(conn, lowered, CANDIDATES)
+
+    seen = set()
+    unique = []
+    for row in candidates:
+        if row[0] not in seen:
+            seen.add(row[0])
+            unique.append(row)
+    unique.sort(key=lambda row: _rank(row, lowered))
+    return unique[:limit]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        with sqlite3.connect("userdetails.db") as conn:
+            ensure_student_search(conn)
+            rebuild_student_search(conn)
+        print("Student search index rebuilt.")
+    elif len(sys.argv) == 3 and sys.argv[1] == "find":
+        with sqlite3.connect("userdetails.db") as conn:
+            for row in search_students(conn, sys.argv[2]):
+                print(*row, sep="\t")
+    else:
+        print("Usage: python student_search.py rebuild | find <text>")
+        sys.exit(1)
@@ -1,44 +1,60 @@
 from tabulate import tabulate
 from utils import log_event
-
-
-def calculate_grade(marks):
-    if marks >= 90:
-        return "S", 10.0
-    if marks >= 80:
-        return "A", 9.0
-    if marks >= 70:
-        return "B", 8.0
-    if marks >= 60:
-        return "C", 7.0
-    if marks >= 50:
-        return "D", 6.0
-    if marks >= 40:
-        return "E", 5.0
-    return "F", 0.0
-
-
-def compute_cgpa_for_student(conn, student_id):
-    c = conn.cursor()
-    c.execute("""
-        SELECT m.grade_point, s.credits
-        FROM marks m
-        JOIN subjects s ON m.subject_id = s.id
-        WHERE m.student_id = ?
-    """, (student_id,))
-    rows = c.fetchall()
-    total_points = 0
-    total_credits = 0
-    for gp, cr in rows:
-        total_points += (gp or 0) * cr
-        total_credits += cr
-    if total_credits == 0:
-        return 0.0
-    return round(total_points / total_credits, 2)
+import service
+from pager import browse
+from grading import RELATIVE_MIN_PASS
+from service import ServiceError, Session
+# Re-exported for callers that still import the grading helpers from here.
+from service import calculate_grade, compute_cgpa_for_student, fetch_class_list
+
+
+def _pick_subject(connection, session, with_credits=False):
+    """Shows the teacher's subjects and asks for a subject id and semester; None if there are none."""
+    subjects = service.teacher_subjects(connection, session)
+    if not subjects:
+        return None
+    if with_credits:
+        print(tabulate(subjects, headers=["id", "code", "name", "credits"], tablefmt="grid"))
+    else:
+        print(tabulate([s[:3] for s in subjects], headers=["id", "code", "name"], tablefmt="grid"))
+    subject_id = int(input("Enter subject id: ").strip())
+    semester = int(input("Semester number: ").strip())
+    return subject_id, semester
+
+
+def _ask_roll_range():
+    roll_from = input("Roll number from (blank for no limit): ").strip() or None
+    roll_to = input("Roll number to (blank for no limit): ").strip() or None
+    return roll_from, roll_to
+
+
+def ask_student(connection, session):
+    """Searches students by username, roll number or name and returns (id, username), or None if cancelled."""
+    while True:
+        text = input("Search student (username, roll no or name; ? to browse, blank to cancel): ").strip()
+        if not text:
+            return None
+        if text == "?":
+            roll_from, roll_to = _ask_roll_range()
+            browse(lambda after=None, before=None: service.students_page(connection, roll_from, roll_to, after, before),
+                   ["id", "username", "roll_no", "name"], "No students in that range.")
+            continue
+        matches = service.search_students(connection, session, text)
+        if not matches:
+            print("No matching students.")
+            log_event(session.username, "teacher", f"Searched for non-existent student '{text}'.")
+            continue
+        if len(matches) == 1 or matches[0][1] == text:
+            return matches[0][0], matches[0][1]
+        print(tabulate([(i,) + row[1:] for i, row in enumerate(matches, start=1)],
+                       headers=["#", "username", "roll_no", "name", "batch"], tablefmt="grid"))
+        pick = input("Pick # (blank to search again): ").strip()
+        if pick.isdigit() and 1 <= int(pick) <= len(matches):
+            return matches[int(pick) - 1][0], matches[int(pick) - 1][1]
 
 
 def TeacherPortal(connection, teacher_id, username):
-    c = connection.cursor()
+    session = Session(teacher_id, username, "teacher")
     print(f"Welcome, {username}. Teacher Portal")
 
     while True:
@@ -50,166 +66,182 @@ def TeacherPortal(connection, teacher_id, username):
         print("5. View all my results")
         print("6. View class list (with CGPA)")
         print("7. Logout")
+        print("8. Bulk import results (CSV/JSONL)")
+        print("9. Cohort analytics (ranks, percentiles, distributions)")
+        print("10. Relative grading for a subject")
         choice = input("Choose an option: ").strip()
 
-        # ADD SUBJECT
-        if choice == "1":
-            code = input("Subject code: ").strip()
-            name = input("Subject name: ").strip()
-            credits = int(input("Credits: ").strip())
-            try:
-                c.execute(
-                    "INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, ?, ?)",
-                    (code, name, credits, teacher_id)
-                )
-                connection.commit()
+        try:
+            # ADD SUBJECT
+            if choice == "1":
+                code = input("Subject code: ").strip()
+                name = input("Subject name: ").strip()
+                credits = int(input("Credits: ").strip())
+                service.add_subject(connection, session, code, name, credits)
                 print("✅ Subject added successfully.")
-                log_event(username, "teacher", f"Added subject '{name}' (code={code}, credits={credits}).")
-            except Exception as e:
-                print("❌ Error:", e)
-                log_event(username, "teacher", f"Failed to add subject '{name}': {e}")
-
-        # ENTER RESULT
-        elif choice == "2":
-            c.execute("SELECT id, username, roll_no, name FROM students")
-            students = c.fetchall()
-            print(tabulate(students, headers=["id", "username", "roll_no", "name"], tablefmt="grid"))
-
-            student_username = input("Enter student username: ").strip()
-            c.execute("SELECT id, name FROM students WHERE username=?", (student_username,))
-            student = c.fetchone()
-            if not student:
-                print("Student not found.")
-                log_event(username, "teacher", f"Tried to enter result for non-existent student '{student_username}'.")
-                continue
-            student_id = student[0]
-
-            c.execute("SELECT id, code, name, credits FROM subjects WHERE teacher_id=?", (teacher_id,))
-            subjects = c.fetchall()
-            if not subjects:
-                print("No subjects. Add subjects first.")
-                continue
-            print(tabulate(subjects, headers=["id", "code", "name", "credits"], tablefmt="grid"))
-            subject_id = int(input("Enter subject id: ").strip())
-            semester = int(input("Semester number: ").strip())
-
-            c.execute("SELECT id FROM marks WHERE student_id=? AND subject_id=? AND semester=?",
-                      (student_id, subject_id, semester))
-            if c.fetchone():
-                print("Marks already entered. Use update option instead.")
-                continue
-
-            marks = int(input("Marks (0-100): ").strip())
-            grade, gp = calculate_grade(marks)
-            c.execute(
-                "INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point) VALUES (?, ?, ?, ?, ?, ?)",
-                (student_id, subject_id, semester, marks, grade, gp)
-            )
-            connection.commit()
-            print("✅ Result recorded.")
-            log_event(username, "teacher", f"Entered marks for student_id={student_id}, subject_id={subject_id}, sem={semester}, marks={marks}.")
-
-        # UPDATE RESULT
-        elif choice == "3":
-            student_username = input("Enter student username: ").strip()
-            c.execute("SELECT id FROM students WHERE username=?", (student_username,))
-            student = c.fetchone()
-            if not student:
-                print("Student not found.")
-                continue
-            student_id = student[0]
-
-            c.execute("SELECT id, code, name FROM subjects WHERE teacher_id=?", (teacher_id,))
-            subjects = c.fetchall()
-            if not subjects:
-                print("You have no subjects.")
-                continue
-            print(tabulate(subjects, headers=["id", "code", "name"], tablefmt="grid"))
-            subject_id = int(input("Enter subject id: ").strip())
-            semester = int(input("Semester number: ").strip())
-
-            c.execute("SELECT id FROM marks WHERE student_id=? AND subject_id=? AND semester=?",
-                      (student_id, subject_id, semester))
-            if not c.fetchone():
-                print("No existing result. Use Add Result option.")
-                continue
-
-            marks = int(input("New marks: ").strip())
-            grade, gp = calculate_grade(marks)
-            c.execute("UPDATE marks SET marks=?, grade=?, grade_point=? WHERE student_id=? AND subject_id=? AND semester=?",
-                      (marks, grade, gp, student_id, subject_id, semester))
-            connection.commit()
-            print("✅ Result updated.")
-            log_event(username, "teacher", f"Updated marks for student_id={student_id}, subject_id={subject_id}, sem={semester}, new_marks={marks}.")
-
-        # DELETE RESULT
-        elif choice == "4":
-            student_username = input("Enter student username: ").strip()
-            c.execute("SELECT id FROM students WHERE username=?", (student_username,))
-            student = c.fetchone()
-            if not student:
-                print("Student not found.")
-                continue
-            student_id = student[0]
-
-            c.execute("SELECT id, code, name FROM subjects WHERE teacher_id=?", (teacher_id,))
-            subjects = c.fetchall()
-            if not subjects:
-                print("You have no subjects.")
-                continue
-            print(tabulate(subjects, headers=["id", "code", "name"], tablefmt="grid"))
-            subject_id = int(input("Enter subject id: ").strip())
-            semester = int(input("Semester number: ").strip())
-
-            c.execute("DELETE FROM marks WHERE student_id=? AND subject_id=? AND semester=?",
-                      (student_id, subject_id, semester))
-            connection.commit()
-            print("🗑️ Result deleted.")
-            log_event(username, "teacher", f"Deleted marks for student_id={student_id}, subject_id={subject_id}, sem={semester}.")
-
-        # VIEW ALL RESULTS
-        elif choice == "5":
-            c.execute("""SELECT s.username, s.roll_no, s.name, subj.code, subj.name, m.semester, m.marks, m.grade
-                         FROM marks m
-                         JOIN students s ON m.student_id = s.id
-                         JOIN subjects subj ON m.subject_id = subj.id
-                         WHERE subj.teacher_id=?
-                         ORDER BY s.username, m.semester""", (teacher_id,))
-            rows = c.fetchall()
-            if rows:
-                print(tabulate(rows, headers=["username", "roll_no", "name", "subj_code", "subject", "sem", "marks", "grade"], tablefmt="grid"))
-                log_event(username, "teacher", "Viewed all results list.")
+
+            # ENTER RESULT
+            elif choice == "2":
+                student = ask_student(connection, session)
+                if not student:
+                    continue
+                student_id = student[0]
+
+                picked = _pick_subject(connection, session, with_credits=True)
+                if not picked:
+                    print("No subjects. Add subjects first.")
+                    continue
+                subject_id, semester = picked
+                if service.result_exists(connection, student_id, subject_id, semester):
+                    print("Marks already entered. Use update option instead.")
+                    continue
+
+                marks = int(input("Marks (0-100): ").strip())
+                service.enter_result(connection, session, student_id, subject_id, semester, marks)
+                print("✅ Result recorded.")
+
+            # UPDATE RESULT
+            elif choice == "3":
+                student = ask_student(connection, session)
+                if not student:
+                    continue
+                student_id = student[0]
+                picked = _pick_subject(connection, session)
+                if not picked:
+                    print("You have no subjects.")
+                    continue
+                subject_id, semester = picked
+                if not service.result_exists(connection, student_id, subject_id, semester):
+                    print("No existing result. Use Add Result option.")
+                    continue
+
+                marks = int(input("New marks: ").strip())
+                service.update_result(connection, session, student_id, subject_id, semester, marks)
+                print("✅ Result updated.")
+
+            # DELETE RESULT
+            elif choice == "4":
+                student = ask_student(connection, session)
+                if not student:
+                    continue
+                student_id = student[0]
+                picked = _pick_subject(connection, session)
+                if not picked:
+                    print("You have no subjects.")
+                    continue
+                subject_id, semester = picked
+                service.delete_result(connection, session, student_id, subject_id, semester)
+                print("🗑️ Result deleted.")
+
+            # VIEW ALL RESULTS
+            elif choice == "5":
+                semester = input("Filter by semester (blank for all): ").strip()
+                if semester and not semester.isdigit():
+                    print("Invalid number.")
+                    continue
+                semester = int(semester) if semester else None
+                subject_code = input("Filter by subject code (blank for all): ").strip() or None
+                roll_from, roll_to = _ask_roll_range()
+                browse(lambda after=None, before=None: service.teacher_results_page(
+                           connection, session, semester, subject_code, roll_from, roll_to, after, before),
+                       ["username", "roll_no", "name", "subj_code", "subject", "sem", "marks", "grade"],
+                       "No results found.")
+
+            # VIEW CLASS LIST
+            elif choice == "6":
+                batch = input("Filter by batch (blank for all): ").strip() or None
+                department = input("Filter by department (blank for all): ").strip() or None
+                mine = input("Only students in my subjects? [y/N]: ").strip().lower() == "y"
+                order = input("Sort by CGPA? [desc/asc/none]: ").strip().lower()
+                top_k = input("Show top N (blank for all): ").strip()
+                if top_k and not top_k.isdigit():
+                    print("Invalid number.")
+                    continue
+
+                class_list = service.class_list(connection, session, batch=batch, department=department, mine=mine,
+                                                order=order, top_k=int(top_k) if top_k else None)
+                if not class_list:
+                    print("No students.")
+                    continue
+
+                print(tabulate(class_list, headers=["student_id", "username", "roll_no", "name", "CGPA"], tablefmt="grid"))
+
+            elif choice == "7":
+                print("Logging out.")
+                log_event(username, "teacher", "Logged out of portal.")
+                break
+
+            # BULK IMPORT
+            elif choice == "8":
+                from bulk_import import import_marks, print_import_summary
+                path = input("Path to CSV/JSONL file (username, subject_code, semester, marks): ").strip()
+                try:
+                    summary = import_marks(connection, path, teacher_id=teacher_id, username=username, role="teacher")
+                except OSError as e:
+                    print("❌ Error:", e)
+                    continue
+                print_import_summary(summary)
+
+            # COHORT ANALYTICS
+            elif choice == "9":
+                from analytics import export_report, ranked_rows
+                batch = input("Filter by batch (blank for all): ").strip() or None
+                semester = input("Semester (blank for CGPA over all semesters): ").strip()
+                if semester and not semester.isdigit():
+                    print("Invalid number.")
+                    continue
+                mine = input("Only my subjects? [y/N]: ").strip().lower() == "y"
+                report = service.cohort_analytics(connection, session, batch=batch,
+                                                  semester=int(semester) if semester else None, mine=mine)
+                if not report["students"]:
+                    print("No marks for that cohort.")
+                    continue
+
+                stats = report["gpa"]
+                print(f"{report['students']} students, {report['mark_rows']} marks. "
+                      f"GPA mean {stats['mean']}, median {stats['median']}, std {stats['std']}")
+                print(tabulate([stats["percentiles"].values()],
+                               headers=[f"P{p}" for p in stats["percentiles"]], tablefmt="grid"))
+                print(tabulate(ranked_rows(connection, report, limit=10),
+                               headers=["rank", "percentile", "username", "roll_no", "name", "credits", "GPA"],
+                               tablefmt="grid"))
+                print(tabulate([[s["code"], s["n"], s["mean"], s["median"], s["std"], s["min"], s["max"]]
+                                for s in report["subjects"]],
+                               headers=["subject", "n", "mean", "median", "std", "min", "max"], tablefmt="grid"))
+                print(tabulate([report["grade_distribution"].values()],
+                               headers=list(report["grade_distribution"]), tablefmt="grid"))
+
+                path = input("Export full rank list to CSV (blank to skip): ").strip()
+                if path:
+                    try:
+                        print("📄 Exported", *export_report(connection, report, path))
+                    except OSError as e:
+                        print("❌ Error:", e)
+
+            # RELATIVE GRADING
+            elif choice == "10":
+                picked = _pick_subject(connection, session)
+                if not picked:
+                    print("No subjects. Add subjects first.")
+                    continue
+                subject_id, semester = picked
+                method = input("Method [zscore/percentile/absolute]: ").strip().lower()
+                min_pass = RELATIVE_MIN_PASS
+                if method in ("zscore", "percentile"):
+                    text = input(f"Minimum pass marks (blank for {RELATIVE_MIN_PASS}): ").strip()
+                    min_pass = int(text) if text else RELATIVE_MIN_PASS
+                summary = service.relative_grading(connection, session, subject_id, semester, method, min_pass)
+                if method == "absolute":
+                    print(f"✅ Absolute grading restored, {summary['changed']} grades changed.")
+                elif summary["students"]:
+                    print(f"{summary['students']} students, mean {summary['mean']}, std {summary['std']}")
+                    print(tabulate([summary["cutoffs"].values()], headers=list(summary["cutoffs"]), tablefmt="grid"))
+                    print(f"✅ {summary['changed']} grades changed. Late entries are re-graded automatically.")
+                else:
+                    print("✅ Relative grading set; grades are assigned as marks are entered.")
+
             else:
-                print("No results found.")
-
-        # VIEW CLASS LIST
-        elif choice == "6":
-            from operator import itemgetter
-            c.execute("SELECT id, username, name, roll_no FROM students")
-            students = c.fetchall()
-            class_list = []
-            for s in students:
-                sid, uname, sname, roll_no = s
-                cgpa = compute_cgpa_for_student(connection, sid)
-                class_list.append((sid, uname, roll_no, sname, cgpa))
-
-            if not class_list:
-                print("No students.")
-                continue
-
-            order = input("Sort by CGPA? [desc/asc/none]: ").strip().lower()
-            if order == "desc":
-                class_list = sorted(class_list, key=itemgetter(4), reverse=True)
-            elif order == "asc":
-                class_list = sorted(class_list, key=itemgetter(4))
-
-            print(tabulate(class_list, headers=["student_id", "username", "roll_no", "name", "CGPA"], tablefmt="grid"))
-            log_event(username, "teacher", "Viewed class list with CGPA.")
-
-        elif choice == "7":
-            print("Logging out.")
-            log_event(username, "teacher", "Logged out of portal.")
-            break
-
-        else:
-            print("Invalid choice.")
\ No newline at end of file
+                print("Invalid choice.")
+
+        except ServiceError as e:
+            print("❌", e.message)
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import cohort_report
+from grading import assign_scheme, parse_boundaries, regrade, save_scheme
+from migrations import migrate
+
+
+class CohortReportTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        migrate(self.conn)
+        self.conn.execute("INSERT INTO teachers (username, password, name, department) VALUES ('t0', x'00', 'T', 'CSE')")
+        self.conn.executemany("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, x'00', ?, ?, '2025')",
+                              [(f"s{i}", f"R{i}", f"S{i}") for i in range(3)])
+        self.conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES ('C1', 'Course', 300, 1)")
+        self.conn.executemany("INSERT INTO marks (student_id, subject_id, semester, marks) VALUES (?, 1, 1, ?)",
+                              [(1, 95), (2, 72), (3, 30)])
+        self.conn.commit()
+        save_scheme(self.conn, "letters", parse_boundaries("70:Distinction:9,40:Pass:6,0:Fail:0"))
+        assign_scheme(self.conn, "2025", "letters")
+        regrade(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_grade_distribution_counts_stored_grades(self):
+        report = cohort_report(self.conn, batch="2025")
+        self.assertEqual(report["grade_distribution"], {"Distinction": 2, "Fail": 1})
+
+    def test_credits_above_255_are_not_truncated(self):
+        report = cohort_report(self.conn, semester=1)
+        self.assertEqual(list(report["ranking"]["credits"]), [300, 300, 300])
+
+
+if __name__ == "__main__":
+    unittest.main()
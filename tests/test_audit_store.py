@@ -0,0 +1,27 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_store import _may_match
+from view_audit_logs import build_filters
+
+
+class UntilFilterTest(unittest.TestCase):
+    """A bare --until date covers the whole day, for segment pruning as well as the row filter."""
+
+    entry = {"rows": 10, "first": "2025-03-01 08:00:00", "last": "2025-03-31 18:00:00", "users": ["alice"]}
+
+    def test_segment_starting_on_the_until_day_is_kept(self):
+        self.assertTrue(_may_match(self.entry, until="2025-03-01"))
+        self.assertFalse(_may_match(self.entry, until="2025-02-28"))
+        self.assertFalse(_may_match(self.entry, until="2025-03-01 07:59:59"))
+
+    def test_row_filter_uses_the_same_bound(self):
+        _, params = build_filters(until="2025-03-01")
+        self.assertEqual(params, ["2025-03-01 23:59:59"])
+
+
+if __name__ == "__main__":
+    unittest.main()
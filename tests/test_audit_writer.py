@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_store import segment_name, segment_path
+from utils import AuditWriter
+
+
+class AuditWriterTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.segment_dir = os.path.join(self._tmp.name, "segments")
+        # A plain file where the segment directory should be makes every write fail.
+        open(self.segment_dir, "w").close()
+        self.writer = AuditWriter(self.segment_dir, os.path.join(self._tmp.name, "key.key"), flush_interval=0.05)
+
+    def tearDown(self):
+        self.writer.close()
+        self._tmp.cleanup()
+
+    def _stored(self):
+        conn = sqlite3.connect(segment_path(segment_name(), self.segment_dir))
+        try:
+            return conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_failed_write_keeps_the_thread_and_the_events(self):
+        self.writer.log("alice", "student", "first")
+        with self.assertRaises(OSError):
+            self.writer.log("bob", "teacher", "second", sync=True)
+        time.sleep(0.2)
+        self.assertTrue(self.writer._thread.is_alive())
+
+        os.remove(self.segment_dir)
+        self.writer.log("carol", "admin", "third")
+        deadline = time.monotonic() + 5
+        while self.writer._pending or not self.writer._queue.empty():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        self.assertEqual(self._stored(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
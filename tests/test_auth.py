@@ -0,0 +1,60 @@
+import os
+import sqlite3
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from auth import AuthService, hash_rounds
+
+
+class AuthServiceTest(unittest.TestCase):
+    def setUp(self):
+        # The minimum cost keeps the test fast; the behaviour does not depend on it.
+        self.auth = AuthService(rounds=4, workers=2)
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE students (id INTEGER PRIMARY KEY, username TEXT, password TEXT)")
+        self.conn.execute("INSERT INTO students (username, password) VALUES ('alice', ?)",
+                          (self.auth.hash_password("Secret@1"),))
+
+    def tearDown(self):
+        self.conn.close()
+        self.auth.shutdown()
+
+    def test_hash_and_verify(self):
+        hashed = self.auth.hash_password("Passw0rd@")
+        self.assertEqual(hash_rounds(hashed), 4)
+        self.assertTrue(self.auth.verify("Passw0rd@", hashed))
+        self.assertTrue(self.auth.verify("Passw0rd@", hashed.decode()))
+        self.assertFalse(self.auth.verify("wrong", hashed))
+        self.assertIsNone(hash_rounds(b"not a hash"))
+
+    def test_authenticate(self):
+        self.assertEqual(self.auth.authenticate(self.conn, "students", "alice", "Secret@1"), 1)
+        self.assertIsNone(self.auth.authenticate(self.conn, "students", "alice", "wrong"))
+        self.assertIsNone(self.auth.authenticate(self.conn, "students", "nobody", "Secret@1"))
+
+    def test_login_rehashes_at_the_current_cost(self):
+        self.conn.execute("UPDATE students SET password = ? WHERE id = 1",
+                          (bcrypt.hashpw(b"Secret@1", bcrypt.gensalt(5)),))
+        self.assertEqual(self.auth.authenticate(self.conn, "students", "alice", "Secret@1"), 1)
+        stored = self.conn.execute("SELECT password FROM students WHERE id = 1").fetchone()[0]
+        self.assertEqual(hash_rounds(stored), 4)
+        self.assertTrue(self.auth.verify("Secret@1", stored))
+
+    def test_concurrent_logins(self):
+        hashed = self.auth.hash_password("Secret@1")
+        results = []
+        threads = [threading.Thread(target=lambda ok=(i % 2 == 0): results.append(
+            self.auth.verify("Secret@1" if ok else "nope", hashed) == ok)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [True] * 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup import create_backup, list_backups, restore_backup
+from marksheet_cache import get_marksheet_cache
+from migrations import migrate
+from result_cache import get_result_cache
+
+
+class RestoreTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The marksheet cache lives relative to the working directory.
+        os.chdir(self._tmp.name)
+        self.conn = sqlite3.connect(os.path.join(self._tmp.name, "test.db"))
+        migrate(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+        get_marksheet_cache().close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_restore_clears_result_and_marksheet_caches(self):
+        create_backup(self.conn, "backups")
+        cache = get_result_cache()
+        cache.get_or_build(self.conn, (1, 1), lambda: {"rows": [("stale",)]})
+        marksheets = get_marksheet_cache()
+        before = marksheets.stats()["invalidations"]
+        marksheets.fetch(1, 1, ("inputs",), "sheet.pdf", lambda path: open(path, "wb").close())
+
+        restore_backup(self.conn, list_backups("backups")[-1][0], "backups")
+
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(marksheets.stats()["entries"], 0)
+        self.assertEqual(marksheets.stats()["invalidations"], before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
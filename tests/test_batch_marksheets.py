@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from batch_marksheets import collect_jobs, generate_batch_marksheets
+from benchmarks.datagen import generate
+from gpa_aggregates import read_cgpa, read_sgpa
+
+
+class BatchMarksheetTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The audit log is written relative to the working directory.
+        os.chdir(self._tmp.name)
+        self.output_dir = os.path.join(self._tmp.name, "marksheets")
+        self.conn = sqlite3.connect(os.path.join(self._tmp.name, "test.db"))
+        generate(self.conn, students=12, teachers=2, subjects=6, semesters=2, per_semester=2, seed=3)
+
+    def tearDown(self):
+        self.conn.close()
+        utils.get_audit_writer().close()
+        utils._writer = None
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_jobs_match_the_student_views(self):
+        jobs = collect_jobs(self.conn, 1, batch="2023", output_dir=self.output_dir)
+        self.assertEqual(len(jobs), 3)
+        for username, filename, info, semester, rows, sgpa, cgpa in jobs:
+            student_id, batch = self.conn.execute("SELECT id, batch FROM students WHERE username = ?",
+                                                  (username,)).fetchone()
+            self.assertEqual((info[2], semester, len(rows)), ("2023", 1, 2))
+            self.assertEqual(sgpa, read_sgpa(self.conn, student_id, 1))
+            self.assertEqual(cgpa, read_cgpa(self.conn, student_id))
+            self.assertEqual(os.path.dirname(filename), os.path.join(self.output_dir, "2023", "sem1"))
+
+    def test_renders_every_pdf(self):
+        summary = generate_batch_marksheets(self.conn, 2, output_dir=self.output_dir, workers=2, partition_size=5)
+        self.assertEqual((summary["rendered"], summary["failed"]), (12, 0))
+        pdfs = [name for _, _, names in os.walk(self.output_dir) for name in names]
+        self.assertEqual(len(pdfs), 12)
+        with open(os.path.join(self.output_dir, "2022", "sem2", "student0_sem2_marksheet.pdf"), "rb") as f:
+            self.assertEqual(f.read(5), b"%PDF-")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from bulk_import import import_marks
+from migrations import migrate
+
+
+class ImportMarksTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The audit log is written relative to the working directory.
+        os.chdir(self._tmp.name)
+        self.conn = sqlite3.connect(os.path.join(self._tmp.name, "test.db"))
+        migrate(self.conn)
+        with self.conn:
+            self.conn.executemany("INSERT INTO teachers (username, password) VALUES (?, 'x')", [("t1",), ("t2",)])
+            self.conn.executemany("INSERT INTO students (username, password, batch) VALUES (?, 'x', '2025')",
+                                  [(f"s{i}",) for i in range(1, 6)])
+            self.conn.executemany("INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, 4, ?)",
+                                  [("MA1", "Maths", 1), ("PH1", "Physics", 2)])
+
+    def tearDown(self):
+        self.conn.close()
+        utils.get_audit_writer().close()
+        utils._writer = None
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _csv(self, rows):
+        path = os.path.join(self._tmp.name, "marks.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["username", "subject_code", "semester", "marks"])
+            writer.writerows(rows)
+        return path
+
+    def _marks(self):
+        return self.conn.execute("""SELECT st.username, s.code, m.semester, m.marks, m.grade FROM marks m
+                                    JOIN students st ON st.id = m.student_id JOIN subjects s ON s.id = m.subject_id
+                                    ORDER BY 1, 2""").fetchall()
+
+    def test_valid_rows_are_graded_and_bad_rows_rejected(self):
+        path = self._csv([("s1", "MA1", 1, 95), ("s2", "MA1", 1, 30), ("nobody", "MA1", 1, 50),
+                          ("s3", "XX9", 1, 50), ("s4", "MA1", "one", 50), ("s5", "MA1", 1, 101)])
+        summary = import_marks(self.conn, path, chunk_size=2)
+        self.assertEqual((summary["imported"], summary["rejected"]), (2, 4))
+        self.assertEqual(self._marks(), [("s1", "MA1", 1, 95, "S"), ("s2", "MA1", 1, 30, "F")])
+        with open(summary["reject_file"], newline="", encoding="utf-8") as f:
+            reasons = [row["reason"] for row in csv.DictReader(f)]
+        self.assertEqual(reasons, ["unknown student", "unknown subject", "semester and marks must be integers",
+                                   "marks must be between 0 and 100"])
+        self.assertEqual(self.conn.execute("SELECT total_credits FROM student_gpa WHERE student_id = 1").fetchone(),
+                         (4,))
+
+    def test_reimport_updates_and_teacher_filter(self):
+        import_marks(self.conn, self._csv([("s1", "MA1", 1, 40)]))
+        summary = import_marks(self.conn, self._csv([("s1", "MA1", 1, 80), ("s1", "PH1", 1, 80)]), teacher_id=1)
+        self.assertEqual((summary["imported"], summary["rejected"]), (1, 1))
+        self.assertEqual([row[:4] for row in self._marks()], [("s1", "MA1", 1, 80)])
+
+    def test_jsonl(self):
+        path = os.path.join(self._tmp.name, "marks.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"username": "s1", "subject_code": "PH1", "semester": 2, "marks": 70}) + "\n")
+            f.write("{not json\n\n")
+        summary = import_marks(self.conn, path)
+        self.assertEqual((summary["imported"], summary["rejected"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
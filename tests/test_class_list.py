@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import generate
+from service import fetch_class_list
+
+
+class ClassListTest(unittest.TestCase):
+    """The one-query class list agrees with a per-student recompute from the marks."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = sqlite3.connect(":memory:")
+        generate(cls.conn, students=120, teachers=6, subjects=18, semesters=2, per_semester=3, seed=4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def _expected(self, where="1", params=()):
+        rows = self.conn.execute(f"""
+            SELECT st.id, st.username, st.roll_no, st.name,
+                   (SELECT SUM(m.grade_point * s.credits) * 1.0 / SUM(s.credits)
+                    FROM marks m JOIN subjects s ON s.id = m.subject_id WHERE m.student_id = st.id)
+            FROM students st WHERE {where} ORDER BY st.id""", params).fetchall()
+        return [(sid, uname, roll_no, name, round(cgpa or 0, 2)) for sid, uname, roll_no, name, cgpa in rows]
+
+    def test_all_students(self):
+        self.assertEqual(fetch_class_list(self.conn), self._expected())
+
+    def test_batch_filter(self):
+        self.assertEqual(fetch_class_list(self.conn, batch="2023"), self._expected("st.batch = ?", ("2023",)))
+
+    def test_teacher_and_department_filters(self):
+        taught = """st.id IN (SELECT m.student_id FROM marks m JOIN subjects s ON s.id = m.subject_id
+                              JOIN teachers t ON t.id = s.teacher_id WHERE {})"""
+        self.assertEqual(fetch_class_list(self.conn, teacher_id=2),
+                         self._expected(taught.format("t.id = ?"), (2,)))
+        self.assertEqual(fetch_class_list(self.conn, department="ECE"),
+                         self._expected(taught.format("t.department = ?"), ("ECE",)))
+
+    def test_order_and_top_k(self):
+        expected = self._expected()
+        top = fetch_class_list(self.conn, order="desc", top_k=5)
+        self.assertEqual(top, sorted(expected, key=lambda row: (-row[4], row[0]))[:5])
+        bottom = fetch_class_list(self.conn, order="asc", top_k=5)
+        self.assertEqual(bottom, sorted(expected, key=lambda row: (row[4], row[0]))[:5])
+
+
+if __name__ == "__main__":
+    unittest.main()
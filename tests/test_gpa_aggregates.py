@@ -0,0 +1,78 @@
+import os
+import random
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.datagen import generate
+from gpa_aggregates import read_cgpa, read_sgpa
+
+
+class GpaTriggerTest(unittest.TestCase):
+    """The trigger-maintained aggregates always equal a recompute from marks and subjects."""
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        generate(self.conn, students=60, teachers=4, subjects=12, semesters=2, per_semester=3, seed=2)
+        self.rng = random.Random(9)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _assert_consistent(self):
+        def rounded(rows):
+            return sorted((*key, credits, round(points, 6)) for *key, credits, points in rows if credits)
+
+        recomputed = """SELECT m.student_id{}, SUM(s.credits), SUM(COALESCE(m.grade_point, 0) * s.credits)
+                        FROM marks m JOIN subjects s ON s.id = m.subject_id GROUP BY m.student_id{}"""
+        self.assertEqual(rounded(self.conn.execute("SELECT student_id, semester, total_credits, total_points "
+                                                   "FROM student_semester_gpa")),
+                         rounded(self.conn.execute(recomputed.format(", m.semester", ", m.semester"))))
+        self.assertEqual(rounded(self.conn.execute("SELECT student_id, total_credits, total_points FROM student_gpa")),
+                         rounded(self.conn.execute(recomputed.format("", ""))))
+
+    def _marks(self):
+        return self.conn.execute("SELECT id, student_id, subject_id, semester FROM marks").fetchall()
+
+    def test_insert(self):
+        with self.conn:
+            self.conn.execute("INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point) "
+                              "VALUES (1, 12, 3, 88, 'A', 9)")
+        self._assert_consistent()
+
+    def test_update_marks_and_move_rows(self):
+        rows = self.rng.sample(self._marks(), 20)
+        with self.conn:
+            for mark_id, _, _, _ in rows[:10]:
+                self.conn.execute("UPDATE marks SET grade_point = ? WHERE id = ?", (self.rng.randint(0, 10), mark_id))
+            for mark_id, _, _, semester in rows[10:]:
+                # Moving a row to another semester updates both semesters.
+                self.conn.execute("UPDATE OR IGNORE marks SET semester = ? WHERE id = ?", (semester + 2, mark_id))
+        self._assert_consistent()
+
+    def test_delete(self):
+        with self.conn:
+            for mark_id, _, _, _ in self.rng.sample(self._marks(), 15):
+                self.conn.execute("DELETE FROM marks WHERE id = ?", (mark_id,))
+        self._assert_consistent()
+
+    def test_subject_credit_change_and_delete(self):
+        with self.conn:
+            self.conn.execute("UPDATE subjects SET credits = credits + 2 WHERE id IN (1, 2)")
+            self.conn.execute("UPDATE subjects SET credits = 1 WHERE id = 3")
+        self._assert_consistent()
+        with self.conn:
+            self.conn.execute("DELETE FROM subjects WHERE id = 4")
+        self._assert_consistent()
+
+    def test_reads(self):
+        row = self.conn.execute("""SELECT SUM(m.grade_point * s.credits) / SUM(s.credits) FROM marks m
+                                   JOIN subjects s ON s.id = m.subject_id WHERE m.student_id = 5""").fetchone()
+        self.assertEqual(read_cgpa(self.conn, 5), round(row[0], 2))
+        self.assertEqual(read_sgpa(self.conn, 5, 99), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grading
+import service
+from marksheet_cache import get_marksheet_cache
+from migrations import migrate
+
+
+def _setup(conn, rows):
+    """Creates one teacher, one subject and a student (batch from rows) per (batch, marks) row."""
+    migrate(conn)
+    conn.execute("INSERT INTO teachers (username, password, name, department) VALUES ('t0', x'00', 'T', 'CSE')")
+    conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES ('C1', 'Course', 4, 1)")
+    for i, (batch, marks) in enumerate(rows, 1):
+        conn.execute("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, x'00', ?, ?, ?)",
+                     (f"s{i}", f"R{i}", f"Student {i}", batch))
+        grade, point = grading.grade_for_student(conn, i, marks)
+        conn.execute("INSERT INTO marks (student_id, subject_id, semester, marks, grade, grade_point) "
+                     "VALUES (?, 1, 1, ?, ?, ?)", (i, marks, grade, point))
+    conn.commit()
+
+
+class RegradeTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        _setup(self.conn, [("2024", 95), ("2024", 85), ("2025", 95), ("2025", 72)])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _grades(self):
+        return [row[0] for row in self.conn.execute("SELECT grade FROM marks ORDER BY student_id")]
+
+    def test_default_scheme(self):
+        self.assertEqual(self._grades(), ["S", "A", "S", "B"])
+        self.assertEqual(grading.DEFAULT.grade(40), ("E", 5.0))
+        self.assertEqual(grading.DEFAULT.grade(39), ("F", 0.0))
+
+    def test_regrade_only_touches_the_assigned_batch(self):
+        grading.save_scheme(self.conn, "r2025", grading.parse_boundaries("80:O:10,60:A:8,0:F:0"))
+        grading.assign_scheme(self.conn, "2025", "r2025")
+        # Saving and assigning leave stored grades alone until regrade runs.
+        self.assertEqual(self._grades(), ["S", "A", "S", "B"])
+        summary = grading.regrade(self.conn, batch="2025")
+        self.assertEqual(summary["changed"], 2)
+        self.assertEqual(self._grades(), ["S", "A", "O", "A"])
+        self.assertEqual(grading.regrade(self.conn)["changed"], 0)
+
+    def test_regrade_writes_only_changed_rows(self):
+        # 85 and 72 keep their grades, so only the two 95s are written.
+        grading.save_scheme(self.conn, grading.DEFAULT_SCHEME, grading.parse_boundaries("96:S:10,80:A:9,70:B:8,0:F:0"))
+        self.assertEqual(grading.regrade(self.conn)["changed"], 2)
+        self.assertEqual(self._grades(), ["A", "A", "A", "B"])
+        self.assertEqual(grading.grade_for_student(self.conn, 1, 96), ("S", 10.0))
+
+    def test_bad_schemes_are_rejected(self):
+        with self.assertRaises(ValueError):
+            grading.GradingScheme("x", [(10, "A", 9)])
+        with self.assertRaises(ValueError):
+            grading.parse_boundaries("90-S-10")
+        with self.assertRaises(ValueError):
+            grading.assign_scheme(self.conn, "2025", "missing")
+
+
+class SchemeCacheTest(unittest.TestCase):
+    """Cached schemes follow edits made through any connection."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self._tmp.name, "test.db")
+        self.conn = sqlite3.connect(path)
+        _setup(self.conn, [("2025", 85)])
+        self.other = sqlite3.connect(path)
+
+    def tearDown(self):
+        self.other.close()
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def test_edits_from_another_connection_are_seen(self):
+        self.assertEqual(grading.grade_for_student(self.conn, 1, 85), ("A", 9.0))
+        with self.other:
+            self.other.execute("UPDATE grade_boundaries SET grade = 'A+' WHERE min_marks = 80")
+        self.assertEqual(grading.grade_for_student(self.conn, 1, 85), ("A+", 9.0))
+        grading.save_scheme(self.other, "r2025", grading.parse_boundaries("85:O:10,0:F:0"))
+        grading.assign_scheme(self.other, "2025", "r2025")
+        self.assertEqual(grading.grade_for_student(self.conn, 1, 85), ("O", 10.0))
+
+    def test_unchanged_schemes_stay_cached(self):
+        grading.grade_for_student(self.conn, 1, 85)
+        with mock.patch.object(grading, "GradingScheme", side_effect=AssertionError("reloaded")):
+            self.assertEqual(grading.grade_for_student(self.conn, 1, 95), ("S", 10.0))
+
+
+class CurveLookupTest(unittest.TestCase):
+    def test_zscore_cutoffs(self):
+        # mean 70, std sqrt(200) ~ 14.1
+        lookup, mean, std = grading.curve_lookup({50: 1, 60: 1, 70: 1, 80: 1, 90: 1}, "zscore")
+        self.assertEqual((mean, round(std, 3)), (70, 14.142))
+        self.assertEqual([lookup[m][0] for m in (92, 90, 78, 70, 63, 56, 55, 40, 39)],
+                         ["S", "A", "B", "C", "D", "E", "F", "F", "F"])
+
+    def test_zscore_of_a_uniform_cohort(self):
+        lookup, _, std = grading.curve_lookup({75: 4}, "zscore")
+        self.assertEqual(std, 0)
+        self.assertEqual(lookup[75], ("C", 7.0))
+
+    def test_percentile_shares_and_ties(self):
+        lookup, _, _ = grading.curve_lookup({m: 1 for m in range(91, 101)}, "percentile")
+        self.assertEqual([lookup[m][0] for m in (100, 99, 98, 97)], ["S", "A", "A", "B"])
+        # Equal marks share a grade: half the cohort tops it with 80.
+        lookup, _, _ = grading.curve_lookup({80: 5, 70: 5}, "percentile", min_pass=0)
+        self.assertEqual([lookup[m][0] for m in (80, 75, 70, 69)], ["S", "C", "C", "F"])
+
+    def test_min_pass_and_bad_method(self):
+        lookup, _, _ = grading.curve_lookup({41: 1, 42: 1}, "percentile", min_pass=42)
+        self.assertEqual(lookup[41], ("F", 0.0))
+        self.assertEqual(lookup[42][0], "S")
+        with self.assertRaises(ValueError):
+            grading.curve_lookup({50: 1}, "bell")
+
+
+class RecurveTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        _setup(self.conn, [("2025", 50), ("2025", 60), ("2025", 70), ("2025", 80), ("2025", 90)])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _grades(self):
+        return [row[0] for row in self.conn.execute("SELECT grade FROM marks ORDER BY student_id")]
+
+    def test_curve_then_return_to_absolute(self):
+        summary = grading.set_relative_grading(self.conn, 1, 1, "zscore")
+        self.assertEqual(summary["students"], 5)
+        self.assertEqual(self._grades(), ["F", "E", "C", "B", "A"])
+        # Re-running on unchanged marks writes nothing.
+        self.assertEqual(grading.recurve(self.conn, 1, 1)["changed"], 0)
+        self.assertEqual(grading.clear_relative_grading(self.conn, 1, 1)["changed"], 5)
+        self.assertEqual(self._grades(), ["D", "C", "B", "A", "S"])
+        self.assertIsNone(grading.recurve(self.conn, 1, 1))
+
+    def test_regrade_leaves_curved_offerings_alone(self):
+        grading.set_relative_grading(self.conn, 1, 1, "percentile")
+        curved = self._grades()
+        self.assertEqual(grading.regrade(self.conn)["changed"], 0)
+        self.assertEqual(self._grades(), curved)
+
+
+class MarkWriteCurveTest(unittest.TestCase):
+    """A mark change and the re-curve of its offering commit or roll back together."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The marksheet cache is opened relative to the working directory.
+        os.chdir(self._tmp.name)
+        path = os.path.join(self._tmp.name, "test.db")
+        self.conn = sqlite3.connect(path)
+        _setup(self.conn, [("2025", 50), ("2025", 70), ("2025", 90)])
+        self.conn.execute("INSERT INTO students (username, password, roll_no, name, batch) "
+                          "VALUES ('s4', x'00', 'R4', 'Student 4', '2025')")
+        self.conn.commit()
+        grading.set_relative_grading(self.conn, 1, 1, "zscore")
+        self.other = sqlite3.connect(path)
+        self.teacher = service.Session(1, "t0", "teacher")
+
+    def tearDown(self):
+        self.other.close()
+        self.conn.close()
+        get_marksheet_cache().close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _rows(self):
+        return self.other.execute("SELECT student_id, marks, grade FROM marks ORDER BY student_id").fetchall()
+
+    def _failing_recurve(self):
+        return mock.patch.object(service, "recurve", side_effect=sqlite3.OperationalError("disk I/O error"))
+
+    def test_failed_recurve_rolls_back_the_mark(self):
+        before = self._rows()
+        with self._failing_recurve():
+            with self.assertRaises(sqlite3.OperationalError):
+                service.enter_result(self.conn, self.teacher, 4, 1, 1, 100)
+            with self.assertRaises(sqlite3.OperationalError):
+                service.update_result(self.conn, self.teacher, 1, 1, 1, 95)
+            with self.assertRaises(sqlite3.OperationalError):
+                service.delete_result(self.conn, self.teacher, 2, 1, 1)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self._rows(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrumentation
+from instrumentation import BUCKETS, Histogram, Metrics, get_metrics, normalize_sql
+
+
+class NormalizeSqlTest(unittest.TestCase):
+    def test_literals_and_whitespace_collapse(self):
+        self.assertEqual(normalize_sql("SELECT *  FROM t\n WHERE a = 12 AND b = 'x''y'"),
+                         "SELECT * FROM t WHERE a = ? AND b = ?")
+
+    def test_in_lists_share_a_series(self):
+        self.assertEqual(normalize_sql("SELECT 1 FROM t WHERE id IN (?, ?, ?)"),
+                         normalize_sql("SELECT 1 FROM t WHERE id IN (?,?)"))
+
+
+class HistogramTest(unittest.TestCase):
+    def test_buckets_and_snapshot(self):
+        hist = Histogram()
+        hist.observe(0.0001, rows=2)
+        hist.observe(BUCKETS[-1] + 1, rows=3)
+        snapshot = hist.snapshot()
+        self.assertEqual(snapshot["count"], 2)
+        self.assertEqual(snapshot["rows"], 5)
+        self.assertEqual(snapshot["buckets"][str(BUCKETS[0])], 1)
+        self.assertEqual(snapshot["buckets"]["+Inf"], 1)
+        self.assertEqual(snapshot["max_seconds"], BUCKETS[-1] + 1)
+
+    def test_empty_histogram_has_zero_mean(self):
+        self.assertEqual(Histogram().snapshot()["mean_ms"], 0.0)
+
+
+class MetricsTest(unittest.TestCase):
+    def test_snapshot_groups_by_kind_and_reset_clears(self):
+        metrics = Metrics()
+        metrics.observe("sql", "SELECT ?", 0.002, rows=1)
+        metrics.add_rows("sql", "SELECT ?", 4)
+        metrics.add_rows("sql", "never observed", 4)
+        metrics.observe("action", "service.login", 0.3)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["sql"]["SELECT ?"]["rows"], 5)
+        self.assertNotIn("never observed", snapshot["sql"])
+        self.assertEqual(snapshot["action"]["service.login"]["count"], 1)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {"sql": {}, "action": {}})
+
+    def test_prometheus_buckets_are_cumulative(self):
+        metrics = Metrics()
+        metrics.observe("sql", 'SELECT "a"', 0.0001)
+        metrics.observe("sql", 'SELECT "a"', 0.3)
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE rms_sql_duration_seconds histogram", text)
+        self.assertIn('rms_sql_duration_seconds_bucket{statement="SELECT \\"a\\"",le="0.0005"} 1', text)
+        self.assertIn('rms_sql_duration_seconds_bucket{statement="SELECT \\"a\\"",le="+Inf"} 2', text)
+        self.assertIn('rms_sql_duration_seconds_count{statement="SELECT \\"a\\""} 2', text)
+
+
+class InstrumentedConnectionTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The slow query log is written relative to the working directory.
+        os.chdir(self._tmp.name)
+        get_metrics().reset()
+        self.conn = instrumentation.connect(":memory:")
+        self.conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+        self.conn.executemany("INSERT INTO t (name) VALUES (?)", [("a",), ("b",), ("c",)])
+
+    def tearDown(self):
+        self.conn.close()
+        get_metrics().reset()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_statements_are_timed_with_rows(self):
+        self.conn.execute("SELECT name FROM t WHERE id > 1").fetchall()
+        self.conn.execute("SELECT name FROM t WHERE id > 2").fetchone()
+        sql = get_metrics().snapshot()["sql"]
+        self.assertEqual(sql["INSERT INTO t (name) VALUES (?)"]["rows"], 3)
+        select = sql["SELECT name FROM t WHERE id > ?"]
+        self.assertEqual(select["count"], 2)
+        self.assertEqual(select["rows"], 3)
+
+    def test_slow_statements_are_logged_with_their_plan(self):
+        self.assertFalse(os.path.exists(instrumentation.SLOW_QUERY_LOG))
+        with mock.patch.object(instrumentation, "SLOW_QUERY_MS", 0):
+            self.conn.execute("SELECT name FROM t WHERE id = 2").fetchone()
+        with open(instrumentation.SLOW_QUERY_LOG, encoding="utf-8") as f:
+            log = f.read()
+        self.assertIn("SELECT name FROM t WHERE id = ?", log)
+        self.assertIn("USING INTEGER PRIMARY KEY", log)
+
+    def test_timed_records_actions(self):
+        @instrumentation.timed
+        def action():
+            return 7
+
+        self.assertEqual(action(), 7)
+        actions = get_metrics().snapshot()["action"]
+        self.assertEqual(actions[f"{__name__}.action"]["count"], 1)
+
+    def test_dump_metrics_formats(self):
+        self.conn.execute("SELECT 1").fetchone()
+        with open(instrumentation.dump_metrics(os.path.join("out", "metrics.json")), encoding="utf-8") as f:
+            self.assertIn("SELECT ?", json.load(f)["sql"])
+        with open(instrumentation.dump_metrics("metrics.prom"), encoding="utf-8") as f:
+            self.assertIn('statement="SELECT ?"', f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
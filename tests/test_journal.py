@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup import create_backup, list_backups, restore_backup
+from journal import RESTORE_MARK, list_deltas, restore_to, rewind, write_delta
+from marksheet_cache import get_marksheet_cache
+from migrations import migrate
+
+
+class JournalTest(unittest.TestCase):
+    """Deltas, rewind and point-in-time restore against a small live database."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The marksheet cache lives relative to the working directory.
+        os.chdir(self._tmp.name)
+        self.backups = os.path.join(self._tmp.name, "backups")
+        self.conn = sqlite3.connect(os.path.join(self._tmp.name, "test.db"))
+        migrate(self.conn)
+        with self.conn:
+            self.conn.execute("INSERT INTO teachers (username, password, name) VALUES ('t0', 'x', 'T')")
+
+    def tearDown(self):
+        self.conn.close()
+        get_marksheet_cache().close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _add(self, *codes):
+        with self.conn:
+            for code in codes:
+                self.conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, 3, 1)",
+                                  (code, code))
+
+    def _codes(self):
+        return [row[0] for row in self.conn.execute("SELECT code FROM subjects ORDER BY code")]
+
+    def _now(self):
+        # Journal timestamps have millisecond resolution; keep the phases apart.
+        time.sleep(0.02)
+        moment = self.conn.execute("SELECT strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')").fetchone()[0]
+        time.sleep(0.02)
+        return moment
+
+    def test_changes_after_a_plain_restore_are_exported(self):
+        create_backup(self.conn, self.backups)
+        self._add("A2", "A3")
+        write_delta(self.conn, self.backups)
+        restore_backup(self.conn, list_backups(self.backups)[-1][0], self.backups)
+        self._add("B1", "B2")
+
+        summary = write_delta(self.conn, self.backups)
+        self.assertIsNotNone(summary)
+        # The restore mark and both new subjects, numbered after the first delta.
+        self.assertEqual(summary["first_seq"], list_deltas(self.backups)[0][1]["last_seq"] + 1)
+        self.assertEqual(summary["entries"], 3)
+        moment = self._now()
+        self._add("C1")
+
+        # A rewind cannot cross the restore, and a full restore replays B1/B2, not A2/A3.
+        restore_to(self.conn, moment, self.backups)
+        self.assertEqual(self._codes(), ["B1", "B2"])
+
+    def test_rewind_round_trip(self):
+        self._add("A1")
+        moment = self._now()
+        self._add("B1")
+        with self.conn:
+            self.conn.execute("UPDATE subjects SET credits = 5 WHERE code = 'A1'")
+            self.conn.execute("DELETE FROM subjects WHERE code = 'A1'")
+        write_delta(self.conn, self.backups)
+        self._add("C1")
+
+        summary = rewind(self.conn, moment, self.backups)
+        self.assertEqual(summary["undone"], 4)
+        self.assertEqual(self._codes(), ["A1"])
+        self.assertEqual(self.conn.execute("SELECT credits FROM subjects").fetchone()[0], 3)
+
+    def test_rewind_refuses_to_cross_a_restore(self):
+        create_backup(self.conn, self.backups)
+        moment = self._now()
+        self._add("A1")
+        restore_backup(self.conn, list_backups(self.backups)[-1][0], self.backups)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM change_journal WHERE op = ?",
+                                           (RESTORE_MARK,)).fetchone()[0], 1)
+        with self.assertRaises(RuntimeError):
+            rewind(self.conn, moment, self.backups)
+
+    def test_restore_to_round_trip(self):
+        create_backup(self.conn, self.backups)
+        self._add("A1", "A2")
+        with self.conn:
+            self.conn.execute("UPDATE subjects SET name = 'Renamed' WHERE code = 'A1'")
+        write_delta(self.conn, self.backups)
+        moment = self._now()
+        self._add("B1")
+        with self.conn:
+            self.conn.execute("DELETE FROM subjects WHERE code = 'A2'")
+
+        summary = restore_to(self.conn, moment, self.backups)
+        self.assertEqual(summary["replayed"], 3)
+        self.assertEqual(self.conn.execute("SELECT code, name FROM subjects ORDER BY code").fetchall(),
+                         [("A1", "Renamed"), ("A2", "A2")])
+        # The journal keeps going after the restore.
+        self._add("D1")
+        self.assertIsNotNone(write_delta(self.conn, self.backups))
+
+
+if __name__ == "__main__":
+    unittest.main()
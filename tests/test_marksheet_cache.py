@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marksheet_cache import MarksheetCache, cache_key
+
+# Every fake marksheet is 1000 bytes; the cache holds two and a half of them.
+SIZE = 1000
+MAX_MB = 2500 / (1024 * 1024)
+
+
+class MarksheetCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache = MarksheetCache(os.path.join(self._tmp.name, "cache"), max_mb=MAX_MB)
+        self.out = os.path.join(self._tmp.name, "out.pdf")
+        self.renders = []
+
+    def tearDown(self):
+        self.cache.close()
+        self._tmp.cleanup()
+
+    def _render(self, path):
+        self.renders.append(path)
+        with open(path, "wb") as f:
+            f.write(b"%" * SIZE)
+
+    def _fetch(self, student_id, semester, marks):
+        return self.cache.fetch(student_id, semester, {"student": student_id, "sem": semester, "marks": marks},
+                                self.out, self._render)
+
+    def test_hit_after_miss(self):
+        self.assertFalse(self._fetch(1, 1, [90]))
+        self.assertTrue(self._fetch(1, 1, [90]))
+        self.assertEqual(len(self.renders), 1)
+        self.assertEqual(os.path.getsize(self.out), SIZE)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_changed_inputs_supersede_the_old_entry(self):
+        self._fetch(1, 1, [90])
+        self.assertFalse(self._fetch(1, 1, [40]))
+        self.assertEqual(self.cache.stats()["entries"], 1)
+        old = self.cache.path_for(cache_key({"student": 1, "sem": 1, "marks": [90]}))
+        self.assertFalse(os.path.exists(old))
+
+    def test_least_recently_used_is_evicted(self):
+        self._fetch(1, 1, [90])
+        self._fetch(2, 1, [80])
+        self._fetch(1, 1, [90])  # student 1 is now the most recently used
+        self._fetch(3, 1, [70])
+        stats = self.cache.stats()
+        self.assertEqual((stats["entries"], stats["bytes"], stats["evictions"]), (2, 2 * SIZE, 1))
+        self.assertTrue(self._fetch(1, 1, [90]))
+        self.assertFalse(self._fetch(2, 1, [80]))
+
+    def test_invalidate(self):
+        self._fetch(1, 1, [90])
+        self._fetch(1, 2, [80])
+        self.cache.invalidate(1, 2)
+        self.assertEqual(self.cache.stats()["entries"], 1)
+        self.assertTrue(self._fetch(1, 1, [90]))
+        self.cache.invalidate()
+        self.assertEqual(self.cache.stats()["entries"], 0)
+        self.assertEqual(self.cache.stats()["invalidations"], 2)
+        self.assertFalse(self._fetch(1, 1, [90]))
+
+    def test_disabled_cache_always_renders(self):
+        cache = MarksheetCache(os.path.join(self._tmp.name, "off"), max_mb=0)
+        cache.fetch(1, 1, {}, self.out, self._render)
+        cache.fetch(1, 1, {}, self.out, self._render)
+        self.assertEqual(self.renders, [self.out, self.out])
+        self.assertFalse(os.path.exists(os.path.join(self._tmp.name, "off")))
+
+
+if __name__ == "__main__":
+    unittest.main()
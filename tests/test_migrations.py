@@ -0,0 +1,49 @@
+import os
+import sqlite3
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations
+from migrations import LATEST_VERSION, current_version, migrate
+
+
+class MigrateTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _tables(self):
+        return {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+
+    def test_failed_migration_leaves_nothing_behind(self):
+        def create_then_fail(conn):
+            conn.execute("CREATE TABLE half_applied(x)")
+            conn.execute("INSERT INTO no_such_table VALUES (1)")
+
+        steps = migrations.MIGRATIONS[:2] + [(3, "broken", [create_then_fail])]
+        with mock.patch.object(migrations, "MIGRATIONS", steps):
+            with self.assertRaises(sqlite3.OperationalError):
+                migrate(self.conn, target=3)
+        self.assertEqual(current_version(self.conn), 2)
+        self.assertNotIn("half_applied", self._tables())
+        self.assertEqual(migrate(self.conn), list(range(3, LATEST_VERSION + 1)))
+
+    def test_aggregates_are_filled_in_the_migration(self):
+        migrate(self.conn, target=1)
+        self.conn.execute("INSERT INTO teachers (username, password) VALUES ('t', 'x')")
+        self.conn.execute("INSERT INTO students (username, password) VALUES ('s', 'x')")
+        self.conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES ('C', 'C', 4, 1)")
+        self.conn.execute("INSERT INTO marks (student_id, subject_id, semester, marks, grade_point) VALUES (1, 1, 1, 90, 9)")
+        self.conn.commit()
+        migrate(self.conn)
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.conn.execute("SELECT total_credits, total_points FROM student_gpa").fetchone(), (4, 36.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pager import keyset_page
+
+SELECT = "SELECT name, grp, n FROM items"
+# (name, grp) is unique; name repeats across groups so the second key matters.
+KEYS = [("name", 0), ("grp", 1)]
+
+
+class KeysetPageTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE items (name TEXT, grp INTEGER, n INTEGER, PRIMARY KEY(name, grp))")
+        self.rows = sorted((f"item{i // 2:02d}", i % 2, i) for i in range(10))
+        self.conn.executemany("INSERT INTO items VALUES (?, ?, ?)", self.rows)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _page(self, **kwargs):
+        return keyset_page(self.conn, SELECT, [], [], KEYS, page_size=4, **kwargs)
+
+    def test_forward_through_every_page(self):
+        seen = []
+        page = self._page()
+        self.assertFalse(page.has_prev)
+        while True:
+            seen.extend(page.rows)
+            if not page.has_next:
+                break
+            page = self._page(after=page.last_key)
+            self.assertTrue(page.has_prev)
+        self.assertEqual(seen, self.rows)
+        self.assertEqual(len(page.rows), 2)
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        page = keyset_page(self.conn, SELECT, [], [], KEYS, page_size=5)
+        page = keyset_page(self.conn, SELECT, [], [], KEYS, after=page.last_key, page_size=5)
+        self.assertEqual(page.rows, self.rows[5:])
+        self.assertFalse(page.has_next)
+
+    def test_backward_returns_rows_in_order(self):
+        last = self._page(after=self._page(after=self._page().last_key).last_key)
+        previous = self._page(before=last.first_key)
+        self.assertEqual(previous.rows, self.rows[4:8])
+        self.assertTrue(previous.has_prev and previous.has_next)
+        first = self._page(before=previous.first_key)
+        self.assertEqual(first.rows, self.rows[:4])
+        self.assertFalse(first.has_prev)
+
+    def test_filters_and_empty_result(self):
+        page = keyset_page(self.conn, SELECT, ["grp = ?"], [1], KEYS, page_size=10)
+        self.assertEqual(page.rows, [row for row in self.rows if row[1] == 1])
+        empty = keyset_page(self.conn, SELECT, ["n > ?"], [100], KEYS)
+        self.assertEqual((empty.rows, empty.first_key, empty.last_key), ([], None, None))
+        self.assertFalse(empty.has_next)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import publish
+import service
+import utils
+from marksheet_cache import get_marksheet_cache
+from migrations import migrate
+from result_cache import get_result_cache
+from service import Session
+
+
+class PublishedReadsTest(unittest.TestCase):
+    """Student reads use the snapshot only for the semesters and batches it publishes."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The audit log and published/ are written relative to the working directory.
+        os.chdir(self._tmp.name)
+        self.conn = sqlite3.connect(os.path.join(self._tmp.name, "test.db"))
+        migrate(self.conn)
+        self.conn.execute("INSERT INTO teachers (username, password, name, department) VALUES ('t0', x'00', 'T', 'CSE')")
+        self.conn.executemany("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, x'00', ?, ?, ?)",
+                              [("s1", "R1", "Old", "2024"), ("s2", "R2", "New", "2025")])
+        self.conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES ('C1', 'Course', 4, 1)")
+        self.conn.commit()
+        self.teacher = Session(1, "t0", "teacher")
+        for student_id in (1, 2):
+            service.enter_result(self.conn, self.teacher, student_id, 1, 1, 90)
+            service.enter_result(self.conn, self.teacher, student_id, 1, 2, 90)
+        publish.publish_semester(self.conn, 1, batch="2024")
+        get_result_cache().invalidate()
+
+    def tearDown(self):
+        publish.get_published_results().close()
+        self.conn.close()
+        get_marksheet_cache().close()
+        utils.get_audit_writer().close()
+        utils._writer = None
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _view(self, student_id, semester):
+        return service.student_results(self.conn, Session(student_id, f"s{student_id}", "student"), semester)
+
+    def test_published_batch_reads_the_snapshot(self):
+        service.update_result(self.conn, self.teacher, 1, 1, 1, 40)
+        result = self._view(1, 1)
+        self.assertIn("published", result)
+        self.assertEqual(result["rows"][0][3], 90)
+
+    def test_unpublished_batch_and_semester_read_live(self):
+        service.update_result(self.conn, self.teacher, 2, 1, 1, 40)
+        self.assertNotIn("published", self._view(2, 1))
+        self.assertEqual(self._view(2, 1)["rows"][0][3], 40)
+        self.assertNotIn("published", self._view(1, 2))
+
+    def test_cgpa_falls_back_for_students_outside_the_snapshot(self):
+        self.assertIsNone(publish.get_published_results().cgpa(2))
+        cgpa = service.student_cgpa(self.conn, Session(2, "s2", "student"))
+        self.assertEqual(cgpa, service.calculate_cgpa(self.conn, 2))
+        self.assertIsNotNone(publish.get_published_results().cgpa(1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_plans import check_query_plans, seed_database
+
+
+class QueryPlanTest(unittest.TestCase):
+    """Fails when a portal or service query, literal or built at run time, degrades to a full scan."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.conn = seed_database(sqlite3.connect(":memory:"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+
+    def test_no_full_scans(self):
+        failures = check_query_plans(self.conn)
+        self.assertEqual(failures, [], "\n".join(f"{module}:{line} {'; '.join(scans)}"
+                                                 for module, line, _, scans in failures))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_cache import ResultCache
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "test.db")
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("CREATE TABLE marks (student_id INTEGER, marks INTEGER)")
+        self.conn.commit()
+        self.cache = ResultCache(max_entries=3)
+        self.builds = []
+
+    def tearDown(self):
+        self.conn.close()
+        self._tmp.cleanup()
+
+    def _get(self, key, conn=None):
+        def build():
+            self.builds.append(key)
+            return {"key": key}
+        return self.cache.get_or_build(conn or self.conn, key, build)
+
+    def test_hits_and_misses(self):
+        self._get((1, 1))
+        self._get((1, 1))
+        self.assertEqual(self.builds, [(1, 1)])
+        self.assertEqual((self.cache.stats()["hits"], self.cache.stats()["misses"]), (1, 1))
+
+    def test_invalidate_one_student(self):
+        self._get((1, 1))
+        self._get((1, 2))
+        self._get((2, 1))
+        self.cache.invalidate(1)
+        self._get((2, 1))
+        self._get((1, 1))
+        self.assertEqual(self.builds, [(1, 1), (1, 2), (2, 1), (1, 1)])
+
+    def test_least_recently_used_entry_is_dropped(self):
+        for key in [(1, 1), (2, 1), (3, 1)]:
+            self._get(key)
+        self._get((1, 1))
+        self._get((4, 1))
+        self.assertEqual(self.cache.stats()["entries"], 3)
+        self._get((1, 1))
+        self._get((2, 1))
+        self.assertEqual(self.builds[-1], (2, 1))
+        self.assertEqual(self.builds.count((1, 1)), 1)
+
+    def test_value_built_during_an_invalidation_is_not_cached(self):
+        def build():
+            self.builds.append("racing")
+            # A write lands while the value is being read.
+            self.cache.invalidate(1)
+            return "stale"
+
+        self.assertEqual(self.cache.get_or_build(self.conn, (1, 1), build), "stale")
+        self._get((1, 1))
+        self.assertEqual(self.builds, ["racing", (1, 1)])
+
+    def test_commit_on_another_connection_clears_the_cache(self):
+        self._get((1, 1))
+        other = sqlite3.connect(self.path)
+        try:
+            # A commit on the same connection does not change its data_version.
+            self.conn.execute("INSERT INTO marks VALUES (1, 50)")
+            self.conn.commit()
+            self._get((1, 1))
+            self.assertEqual(self.builds, [(1, 1)])
+
+            other.execute("INSERT INTO marks VALUES (2, 60)")
+            other.commit()
+            self._get((1, 1))
+            self.assertEqual(self.builds, [(1, 1), (1, 1)])
+        finally:
+            other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
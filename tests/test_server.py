@@ -0,0 +1,74 @@
+import http.client
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server
+
+
+class ErrorResponseTest(unittest.TestCase):
+    """Every failure comes back as a JSON error instead of a dropped connection."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.httpd = server.make_server(port=0, db_path=os.path.join(self._tmp.name, "test.db"), pool_size=2)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd.writes.close()
+        self.httpd.pool.close()
+        self._tmp.cleanup()
+
+    def _request(self, method, path, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.httpd.server_address[1], timeout=10)
+        try:
+            conn.request(method, path, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def test_malformed_request_is_a_400(self):
+        status, body = self._request("GET", "/stats/cache", {"Content-Length": "abc"})
+        self.assertEqual(status, 400)
+        self.assertIn("error", body)
+
+    def test_negative_content_length_is_a_400(self):
+        status, body = self._request("GET", "/stats/cache", {"Content-Length": "-1"})
+        self.assertEqual(status, 400)
+        self.assertIn("Content-Length", body["error"])
+
+    def test_unexpected_error_is_a_json_500(self):
+        def broken(conn, session, params):
+            raise RuntimeError("boom")
+
+        with mock.patch.dict(server.ROUTES, {("GET", "/stats/cache"): broken}), \
+                mock.patch("sys.stderr", new_callable=io.StringIO):
+            status, body = self._request("GET", "/stats/cache")
+        self.assertEqual(status, 500)
+        self.assertEqual(body, {"error": "Internal server error."})
+
+    def test_programming_errors_are_logged_500s(self):
+        def buggy(conn, session, params):
+            return params["missing"]
+
+        with mock.patch.dict(server.ROUTES, {("GET", "/stats/cache"): buggy}), \
+                mock.patch("sys.stderr", new_callable=io.StringIO) as stderr:
+            status, body = self._request("GET", "/stats/cache")
+        self.assertEqual(status, 500)
+        self.assertEqual(body, {"error": "Internal server error."})
+        self.assertIn("KeyError: 'missing'", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
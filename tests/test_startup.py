@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audit_store import SEGMENT_VERSION, open_segment, segment_path
+from benchmarks.startup_bench import HEAVY_MODULES, _import_main
+
+
+class StartupImportsTest(unittest.TestCase):
+    def test_main_loads_no_heavy_modules(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            _, modules = _import_main(tmp)
+        self.assertIn("main", modules)
+        self.assertEqual([name for name in HEAVY_MODULES if name in modules], [])
+
+
+class SegmentSchemaTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_schema_is_stamped_and_not_reapplied(self):
+        open_segment("audit_2025_03", self._tmp.name).close()
+        conn = sqlite3.connect(segment_path("audit_2025_03", self._tmp.name))
+        self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SEGMENT_VERSION)
+        # A dropped table stays dropped: reopening only checks the stamp.
+        conn.execute("DROP TABLE logs")
+        conn.commit()
+        conn.close()
+        conn = open_segment("audit_2025_03", self._tmp.name)
+        tables = conn.execute("SELECT name FROM sqlite_master WHERE name = 'logs'").fetchall()
+        conn.close()
+        self.assertEqual(tables, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from student_search import search_students
+
+STUDENTS = [
+    ("aarav01", "CS2025001", "Aarav Sharma"),
+    ("diya02", "CS2025002", "Diya Patel"),
+    ("rohan03", "EC2025003", "Rohan Mehta"),
+    ("sharmila", "EC2025004", "Sharmila Iyer"),
+    ("kavya05", "ME2025005", "Kavya Sharma"),
+]
+
+
+class StudentSearchTest(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        migrate(self.conn)
+        with self.conn:
+            self.conn.executemany("INSERT INTO students (username, password, roll_no, name, batch) "
+                                  "VALUES (?, 'x', ?, ?, '2025')", STUDENTS)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _names(self, text, limit=10):
+        return [row[1] for row in search_students(self.conn, text, limit)]
+
+    def test_exact_and_prefix(self):
+        self.assertEqual(self._names("diya02"), ["diya02"])
+        self.assertEqual(self._names("CS2025"), ["aarav01", "diya02"])
+        # Shorter than one trigram: served by the username index alone.
+        self.assertEqual(self._names("ro"), ["rohan03"])
+
+    def test_prefix_is_case_insensitive(self):
+        # Two characters are below one trigram, so only the prefix indexes answer.
+        self.assertEqual(self._names("RO"), ["rohan03"])
+        self.assertEqual(self._names("cs"), ["aarav01", "diya02"])
+        self.assertEqual(self._names("eC"), ["rohan03", "sharmila"])
+
+    def test_substring_on_name_is_case_insensitive(self):
+        # Prefix matches on username and on a word of the name rank alike.
+        self.assertEqual(self._names("sharm"), ["aarav01", "kavya05", "sharmila"])
+        self.assertEqual(self._names("arma"), ["aarav01", "kavya05"])
+        self.assertEqual(self._names("MEHTA"), ["rohan03"])
+
+    def test_fuzzy_match(self):
+        self.assertEqual(self._names("Mehra"), ["rohan03"])
+        self.assertEqual(self._names("zzzzzz"), [])
+
+    def test_index_follows_renames_and_deletes(self):
+        with self.conn:
+            self.conn.execute("UPDATE students SET name = 'Diya Kapoor' WHERE username = 'diya02'")
+            self.conn.execute("DELETE FROM students WHERE username = 'rohan03'")
+        self.assertEqual(self._names("kapoor"), ["diya02"])
+        self.assertEqual(self._names("patel"), [])
+        self.assertEqual(self._names("mehta"), [])
+
+    def test_limit_and_blank(self):
+        self.assertEqual(len(self._names("2025", limit=2)), 2)
+        self.assertEqual(self._names("   "), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
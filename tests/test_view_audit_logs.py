@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import view_audit_logs
+from audit_store import open_segment
+from utils import KEY_FILE, load_fernet
+from view_audit_logs import iter_pages
+
+EVENTS = [
+    ("2025-03-01 09:00:00", "alice", "student", "Logged in."),
+    ("2025-03-01 09:05:00", "bob", "teacher", "Entered marks."),
+    ("2025-03-02 10:00:00", "alice", "student", "Viewed results."),
+    ("2025-03-03 11:00:00", "carol", "admin", "Created backup."),
+    ("2025-03-03 12:00:00", "bob", "teacher", "Updated marks."),
+    ("2025-03-04 08:00:00", "alice", "student", "Downloaded marksheet."),
+    ("2025-03-05 08:00:00", "bob", "teacher", "Logged out."),
+]
+
+
+class AuditViewerTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The viewer reads logs/ relative to the working directory.
+        os.chdir(self._tmp.name)
+        fernet = load_fernet(KEY_FILE)
+        conn = open_segment("audit_2025_03")
+        with conn:
+            conn.executemany("INSERT INTO logs (timestamp, username, role, action) VALUES (?, ?, ?, ?)",
+                             [(ts, user, role, fernet.encrypt(action.encode()).decode())
+                              for ts, user, role, action in EVENTS])
+        conn.close()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _rows(self, **filters):
+        return [(row[1], row[2]) for _, page in iter_pages(**filters) for row in page]
+
+    def test_pages_are_newest_first_and_complete(self):
+        pages = [page for _, page in iter_pages(page_size=3)]
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        ids = [row[0] for page in pages for row in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), len(EVENTS))
+
+    def test_filters(self):
+        self.assertEqual([user for _, user in self._rows(username="alice")], ["alice"] * 3)
+        self.assertEqual(self._rows(role="admin"), [("2025-03-03 11:00:00", "carol")])
+        self.assertEqual([ts for ts, _ in self._rows(since="2025-03-02", until="2025-03-03")],
+                         ["2025-03-03 12:00:00", "2025-03-03 11:00:00", "2025-03-02 10:00:00"])
+
+    def test_export_decrypts(self):
+        out = os.path.join(self._tmp.name, "audit.jsonl")
+        view_audit_logs.main(["--user", "bob", "--export", out, "--workers", "1", "--page-size", "2"])
+        with open(out, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([entry["action"] for entry in entries], ["Logged out.", "Updated marks.", "Entered marks."])
+        self.assertEqual({entry["segment"] for entry in entries}, {"audit_2025_03"})
+
+
+if __name__ == "__main__":
+    unittest.main()
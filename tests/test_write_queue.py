@@ -0,0 +1,138 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import service
+import utils
+from grading import set_relative_grading
+from marksheet_cache import get_marksheet_cache
+from migrations import migrate
+from service import ServiceError, Session
+from storage import WriteQueue
+
+
+class WriteQueueTest(unittest.TestCase):
+    """Group commit on the writer thread: one transaction per batch, one SAVEPOINT per job."""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        # The audit log is written relative to the working directory.
+        os.chdir(self._tmp.name)
+        self.db_path = os.path.join(self._tmp.name, "test.db")
+        conn = sqlite3.connect(self.db_path)
+        migrate(conn)
+        conn.executemany("INSERT INTO teachers (username, password, name, department) VALUES (?, ?, ?, ?)",
+                         [(f"t{i}", b"x", f"Teacher {i}", "CSE") for i in range(4)])
+        conn.executemany("INSERT INTO students (username, password, roll_no, name, batch) VALUES (?, ?, ?, ?, ?)",
+                         [(f"s{i}", b"x", f"R{i}", f"Student {i}", "2025") for i in range(50)])
+        conn.executemany("INSERT INTO subjects (code, name, credits, teacher_id) VALUES (?, ?, ?, ?)",
+                         [(f"C{i}", f"Course {i}", 3, 1 + i) for i in range(4)])
+        conn.commit()
+        conn.close()
+        self.teachers = [Session(1 + i, f"t{i}", "teacher") for i in range(4)]
+
+    def tearDown(self):
+        # The shared audit writer keeps its segment open; start the next test with a fresh one.
+        utils.get_audit_writer().close()
+        utils._writer = None
+        get_marksheet_cache().close()
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _batch(self, jobs):
+        """Runs (fn, *args) jobs in a single batch and returns their futures."""
+        writer = WriteQueue(self.db_path, batch=len(jobs), wait_ms=5000)
+        try:
+            futures = [writer.submit(*job) for job in jobs]
+            for future in futures:
+                future.exception()
+            self.assertEqual(writer.stats()["batches"], 1)
+        finally:
+            writer.close()
+        return futures
+
+    def _read(self, sql, params=()):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def test_failed_job_rolls_back_only_itself(self):
+        teacher = self.teachers[0]
+        futures = self._batch([(service.add_subject, teacher, "A1", "Algebra", 3),
+                               (service.add_subject, teacher, "A1", "Algebra again", 3),
+                               (service.add_subject, teacher, "B1", "Biology", 3)])
+        self.assertIsNone(futures[0].exception())
+        self.assertIsInstance(futures[1].exception(), ServiceError)
+        self.assertIsNone(futures[2].exception())
+        codes = [row[0] for row in self._read("SELECT code FROM subjects WHERE code IN ('A1', 'B1') ORDER BY code")]
+        self.assertEqual(codes, ["A1", "B1"])
+
+    def test_recurve_does_not_commit_the_batch(self):
+        conn = sqlite3.connect(self.db_path)
+        set_relative_grading(conn, 1, 1, "zscore")
+        conn.close()
+        seen = []
+
+        def check_uncommitted(conn):
+            # The first job's mark must not be visible outside the batch yet.
+            seen.append(self._read("SELECT COUNT(*) FROM marks WHERE subject_id = 1")[0][0])
+            raise RuntimeError("discard this job")
+
+        futures = self._batch([(service.enter_result, self.teachers[0], 1, 1, 1, 75),
+                               (check_uncommitted,),
+                               (service.enter_result, self.teachers[0], 2, 1, 1, 40)])
+        self.assertIsNone(futures[0].exception())
+        self.assertIsInstance(futures[1].exception(), RuntimeError)
+        self.assertIsNone(futures[2].exception())
+        self.assertEqual(seen, [0])
+        rows = self._read("SELECT student_id, grade FROM marks WHERE subject_id = 1 ORDER BY student_id")
+        self.assertEqual([row[0] for row in rows], [1, 2])
+        self.assertTrue(all(grade is not None for _, grade in rows))
+
+    def test_with_conn_inside_a_job_stays_in_the_batch(self):
+        def insert_then_fail(conn):
+            with conn:
+                conn.execute("INSERT INTO subjects (code, name, credits, teacher_id) VALUES ('X1', 'X', 3, 1)")
+            raise RuntimeError("after the with block")
+
+        futures = self._batch([(service.add_subject, self.teachers[0], "A1", "Algebra", 3),
+                               (insert_then_fail,)])
+        self.assertIsNone(futures[0].exception())
+        self.assertIsInstance(futures[1].exception(), RuntimeError)
+        self.assertEqual(self._read("SELECT code FROM subjects WHERE code IN ('A1', 'X1')"), [("A1",)])
+
+    def test_concurrent_teachers(self):
+        writer = WriteQueue(self.db_path)
+        errors = []
+
+        def teacher(n):
+            for student_id in range(1, 51):
+                try:
+                    writer.run(service.enter_result, self.teachers[n], student_id, 1 + n, 1, 40 + student_id)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=teacher, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stats = writer.stats()
+        writer.close()
+        self.assertEqual(errors, [])
+        self.assertEqual(stats["jobs"], 200)
+        self.assertEqual(self._read("SELECT COUNT(*) FROM marks")[0][0], 200)
+        # The SGPA aggregates saw every committed write.
+        self.assertEqual(self._read("SELECT SUM(total_credits) FROM student_semester_gpa")[0][0], 600)
+
+
+if __name__ == "__main__":
+    unittest.main()
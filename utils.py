@@ -1,38 +1,165 @@
-import sqlite3
+import atexit
 import os
+import queue
+import sqlite3
+import sys
+import threading
 from datetime import datetime
-from cryptography.fernet import Fernet
-
-def log_event(username, role, action):
-    """Logs all major events (register, login, CRUD, backup, etc.) in encrypted form."""
-    os.makedirs("logs", exist_ok=True)
-    log_db = "audit_logs.db"
-
-    # create log table if not exists
-    with sqlite3.connect(log_db) as conn:
-        cur = conn.cursor()
-        cur.execute("""CREATE TABLE IF NOT EXISTS logs(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT,
-            username TEXT,
-            role TEXT,
-            action TEXT
-        )""")
-
-        # encrypt the action text
-        key_file = "logs/key.key"
-        if not os.path.exists(key_file):
-            key = Fernet.generate_key()
-            with open(key_file, "wb") as f:
-                f.write(key)
-        else:
-            with open(key_file, "rb") as f:
-                key = f.read()
-        fernet = Fernet(key)
-
-        encrypted_action = fernet.encrypt(action.encode()).decode()
+from instrumentation import timed
+from audit_store import SEGMENT_DIR, open_segment, seal_closed_segments, segment_name
+
+KEY_FILE = "logs/key.key"
+
+# Defaults for the background writer; override with configure_audit_writer()
+# or the RMS_AUDIT_FLUSH_INTERVAL / RMS_AUDIT_BATCH_SIZE environment variables.
+FLUSH_INTERVAL = float(os.environ.get("RMS_AUDIT_FLUSH_INTERVAL", "1.0"))
+BATCH_SIZE = int(os.environ.get("RMS_AUDIT_BATCH_SIZE", "100"))
+
+
+def load_fernet(key_file=KEY_FILE):
+    """Returns the audit-log cipher, generating the key file on first use."""
+    from cryptography.fernet import Fernet
+    os.makedirs(os.path.dirname(key_file) or ".", exist_ok=True)
+    if not os.path.exists(key_file):
+        key = Fernet.generate_key()
+        with open(key_file, "wb") as f:
+            f.write(key)
+    else:
+        with open(key_file, "rb") as f:
+            key = f.read()
+    return Fernet(key)
+
+
+class AuditWriter:
+    """Queues audit events and writes them to the current monthly segment in batches.
+
+    A background thread flushes every `flush_interval` seconds or as soon as
+    `batch_size` events are waiting. flush() drains the queue synchronously.
+    When the month rolls over the writer moves to a new segment and seals the
+    closed ones (see audit_store). Events whose write fails are kept and
+    retried on the next flush.
+    """
+
+    def __init__(self, segment_dir=SEGMENT_DIR, key_file=KEY_FILE, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.segment_dir = segment_dir
+        self._fernet = load_fernet(key_file)
+        self._segment = None
+        self._conn = None
+        self._pending = []
+        self._queue = queue.Queue()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def _connection(self):
+        name = segment_name()
+        if name != self._segment:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = open_segment(name, self.segment_dir)
+            self._segment = name
+            try:
+                seal_closed_segments(name, self.segment_dir)
+            except OSError:
+                # Another process may be sealing the same segment; retry next rollover.
+                pass
+        return self._conn
+
+    def _drop_connection(self):
+        """Forgets the segment connection so the next flush opens it again."""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._segment = None
+
+    def log(self, username, role, action, sync=False):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._queue.put((timestamp, username, role, action))
+        if sync or self._stopped.is_set():
+            self.flush()
+        elif self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Writes every queued event in a single transaction.
+
+        On failure the error is raised and the events stay pending for the next flush.
+        """
+        with self._flush_lock:
+            rows = self._pending
+            while True:
+                try:
+                    ts, username, role, action = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                rows.append((ts, username, role, self._fernet.encrypt(action.encode()).decode()))
+            if rows:
+                try:
+                    conn = self._connection()
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO logs (timestamp, username, role, action) VALUES (?, ?, ?, ?)", rows)
+                except (OSError, sqlite3.Error):
+                    self._drop_connection()
+                    raise
+                self._pending = []
+            return len(rows)
+
+    def close(self):
+        """Stops the background thread and flushes anything still queued."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except (OSError, sqlite3.Error) as e:
+                # Keep the thread alive; the events are retried on the next flush.
+                print(f"Could not write audit log: {e}", file=sys.stderr)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AuditWriter()
+            atexit.register(_writer.close)
+        return _writer
+
+
+def configure_audit_writer(flush_interval=None, batch_size=None):
+    """Adjusts the flush interval and batch size of the shared audit writer."""
+    writer = get_audit_writer()
+    if flush_interval is not None:
+        writer.flush_interval = flush_interval
+    if batch_size is not None:
+        writer.batch_size = batch_size
+    return writer
+
+
+@timed
+def log_event(username, role, action, sync=False):
+    """Logs all major events (register, login, CRUD, backup, etc.) in encrypted form.
 
-        cur.execute("INSERT INTO logs (timestamp, username, role, action) VALUES (?, ?, ?, ?)",
-                    (timestamp, username, role, encrypted_action))
-        conn.commit()
+    Events are buffered and written in the background; pass sync=True for
+    events that must be on disk before the call returns.
+    """
+    get_audit_writer().log(username, role, action, sync=sync)
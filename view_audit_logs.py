@@ -1,29 +1,128 @@
-import sqlite3
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from cryptography.fernet import Fernet
+from utils import KEY_FILE
+from audit_store import connect_readonly, segments_for_query, until_bound
 
-# Step 1: Load the encryption key from the 'logs/key.key' file
-with open("logs/key.key", "rb") as f:
-    key = f.read()
-fernet = Fernet(key)
+PAGE_SIZE = 50
+_fernet = None
 
-# Step 2: Connect to the audit_logs.db database
-conn = sqlite3.connect("audit_logs.db")
-cur = conn.cursor()
 
-# Step 3: Fetch all the logged events
-cur.execute("SELECT timestamp, username, role, action FROM logs ORDER BY id DESC")
-rows = cur.fetchall()
+def _init_worker(key):
+    global _fernet
+    _fernet = Fernet(key)
 
-# Step 4: Decrypt and print each log entry
-print("\n=== AUDIT LOGS (Decrypted & Readable) ===\n")
-for ts, user, role, encrypted_action in rows:
+
+def _decrypt(encrypted_action):
     try:
-        # Decrypt the action text
-        action = fernet.decrypt(encrypted_action.encode()).decode()
+        return _fernet.decrypt(encrypted_action.encode()).decode()
     except Exception:
         # If decryption fails (wrong key or corrupted entry)
-        action = "[Error decrypting this entry]"
-    print(f"[{ts}] {user} ({role}) → {action}")
+        return "[Error decrypting this entry]"
+
+
+def build_filters(username=None, role=None, since=None, until=None):
+    """Turns the viewer filters into an SQL WHERE fragment and its parameters."""
+    clauses = []
+    params = []
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        clauses.append("timestamp <= ?")
+        params.append(until_bound(until))
+    return clauses, params
+
+
+def iter_pages(page_size=PAGE_SIZE, username=None, role=None, since=None, until=None):
+    """Yields (segment, page) pairs of encrypted rows (id, timestamp, username, role, action), newest first.
+
+    Only segments that can hold matching rows are opened. Within a segment,
+    pages are fetched by keyset (id < last seen id) so each page costs the
+    same regardless of how deep into the log it is.
+    """
+    clauses, params = build_filters(username, role, since, until)
+    for segment, db_path in segments_for_query(username, since, until_bound(until)):
+        conn = connect_readonly(db_path)
+        try:
+            last_id = None
+            while True:
+                where = list(clauses)
+                page_params = list(params)
+                if last_id is not None:
+                    where.append("id < ?")
+                    page_params.append(last_id)
+                sql = "SELECT id, timestamp, username, role, action FROM logs"
+                if where:
+                    sql += " WHERE " + " AND ".join(where)
+                sql += " ORDER BY id DESC LIMIT ?"
+                page = conn.execute(sql, page_params + [page_size]).fetchall()
+                if not page:
+                    break
+                yield segment, page
+                last_id = page[-1][0]
+        finally:
+            conn.close()
+
+
+def decrypt_page(pool, page, workers):
+    chunksize = max(1, len(page) // (workers * 4))
+    actions = pool.map(_decrypt, [row[4] for row in page], chunksize=chunksize)
+    return [(log_id, ts, user, role, action) for (log_id, ts, user, role, _), action in zip(page, actions)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="View or export the encrypted audit log.")
+    parser.add_argument("--user", help="only entries for this username")
+    parser.add_argument("--role", help="only entries for this role (student/teacher/admin)")
+    parser.add_argument("--since", help="start timestamp, e.g. 2025-01-31 or '2025-01-31 09:00:00'")
+    parser.add_argument("--until", help="end timestamp (a bare date includes the whole day)")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="decryption processes")
+    parser.add_argument("--export", metavar="PATH", help="write matching entries as JSON lines instead of printing")
+    parser.add_argument("--all", action="store_true", help="print every page without pausing")
+    args = parser.parse_args(argv)
+
+    # Step 1: Load the encryption key from the 'logs/key.key' file
+    with open(KEY_FILE, "rb") as f:
+        key = f.read()
+
+    # Step 2: Select the log segments that can hold matching entries
+    pages = iter_pages(args.page_size, args.user, args.role, args.since, args.until)
+    interactive = not args.all and not args.export and sys.stdin.isatty() and sys.stdout.isatty()
+
+    # Step 3: Decrypt each page across the worker pool and stream it out
+    written = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(key,)) as pool:
+        if args.export:
+            with open(args.export, "w", encoding="utf-8") as out:
+                for segment, page in pages:
+                    for log_id, ts, user, role, action in decrypt_page(pool, page, args.workers):
+                        out.write(json.dumps({"segment": segment, "id": log_id, "timestamp": ts,
+                                              "username": user, "role": role, "action": action}) + "\n")
+                        written += 1
+            print(f"Exported {written} entries to {args.export}")
+        else:
+            print("\n=== AUDIT LOGS (Decrypted & Readable) ===\n")
+            for _, page in pages:
+                for log_id, ts, user, role, action in decrypt_page(pool, page, args.workers):
+                    print(f"[{ts}] {user} ({role}) → {action}")
+                    written += 1
+                if interactive and len(page) == args.page_size:
+                    if input("-- Enter for more, q to quit -- ").strip().lower() == "q":
+                        break
+            if not written:
+                print("No matching entries.")
+
 
-# Step 5: Close database connection
-conn.close()
+if __name__ == "__main__":
+    main()